@@ -0,0 +1,62 @@
+"""
+Benchmark for bulk transcript moderation.
+
+Generates a synthetic NDJSON transcript file and moderates it with an
+increasing number of worker processes to show throughput scaling.
+
+Usage:
+    python benchmarks/bench_bulk_moderation.py [conversations]
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "groq_api"))
+
+from bulk_moderation import BulkModerationRunner  # noqa: E402
+
+WORDS = [
+    "project", "deadline", "client", "budget", "timeline", "please", "help", "me",
+    "plan", "the", "website", "mobile", "app", "next", "week", "scope", "invoice",
+]
+
+
+def write_transcripts(path: str, conversations: int, rng: random.Random) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(conversations):
+            messages = []
+            for turn in range(rng.randint(2, 20)):
+                length = rng.randint(5, 60) if turn % 2 == 0 else rng.randint(40, 300)
+                messages.append({
+                    "type": "user" if turn % 2 == 0 else "assistant",
+                    "content": " ".join(rng.choice(WORDS) for _ in range(length)),
+                })
+            f.write(json.dumps({"conversation_id": f"conv-{i}", "messages": messages}) + "\n")
+
+
+def main():
+    conversations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rng = random.Random(42)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "transcripts.ndjson")
+        sink = os.path.join(tmp, "results.ndjson")
+        write_transcripts(source, conversations, rng)
+        print(f"{conversations} conversations, {os.path.getsize(source) / 1e6:.1f} MB")
+
+        print(f"{'workers':>8}{'seconds':>10}{'conv/s':>10}{'speedup':>9}")
+        baseline = None
+        workers = 1
+        while workers <= (os.cpu_count() or 1):
+            summary = BulkModerationRunner(workers=workers).run(source, sink)
+            baseline = baseline or summary["elapsed_seconds"]
+            print(f"{workers:>8}{summary['elapsed_seconds']:>10.2f}"
+                  f"{summary['conversations_per_second']:>10.0f}{baseline / summary['elapsed_seconds']:>8.1f}x")
+            workers *= 2
+
+
+if __name__ == "__main__":
+    main()
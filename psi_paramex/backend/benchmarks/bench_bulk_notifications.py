@@ -0,0 +1,128 @@
+"""
+Benchmark for bulk notification calls.
+
+Sends project update and welcome emails for N items one call at a time
+(one .single() project + user lookup per item) and through the bulk
+methods (one in_() lookup for all items, one outbox transaction). The
+database is an in-memory stand-in for the Supabase client that counts
+round trips and sleeps LATENCY_MS per query to approximate a hosted
+database; the outbox is a temporary SQLite file.
+
+Usage:
+    python benchmarks/bench_bulk_notifications.py
+"""
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "groq_api"))
+os.environ.setdefault("NOTIFICATION_OUTBOX_PATH", os.path.join(tempfile.mkdtemp(), "bench_outbox.db"))
+
+from notification_outbox import NotificationOutbox  # noqa: E402
+from notification_scheduler import NotificationScheduler  # noqa: E402
+
+LATENCY_MS = 20
+
+
+class CountingQuery:
+    def __init__(self, db, rows):
+        self.db = db
+        self.rows = rows
+        self.one = False
+
+    def select(self, *args, **kwargs):
+        return self
+
+    def eq(self, column, value):
+        self.rows = [row for row in self.rows if row[column] == value]
+        return self
+
+    def in_(self, column, values):
+        wanted = set(values)
+        self.rows = [row for row in self.rows if row[column] in wanted]
+        return self
+
+    def single(self):
+        self.one = True
+        return self
+
+    def execute(self):
+        self.db.queries += 1
+        time.sleep(LATENCY_MS / 1000)
+        data = (self.rows[0] if self.rows else None) if self.one else self.rows
+        return type("Response", (), {"data": data})()
+
+
+class CountingDatabase:
+    def __init__(self, tables):
+        self.tables = tables
+        self.queries = 0
+
+    def table(self, name):
+        return CountingQuery(self, self.tables[name])
+
+
+def synthetic_tables(count: int):
+    users = [{"email": f"user{i}@example.com", "name": f"User {i}"} for i in range(count)]
+    projects = [
+        {
+            "project_id": f"p{i}",
+            "project_name": f"Project {i}",
+            "client_name": "Acme",
+            "user_id": f"u{i}",
+            "users": users[i],
+        }
+        for i in range(count)
+    ]
+    return {"projects": projects, "users": users}
+
+
+async def run(count: int, outbox: NotificationOutbox):
+    tables = synthetic_tables(count)
+    updates = [
+        {"project_id": f"p{i}", "old_status": "On-Process", "new_status": f"Done-{count}"}
+        for i in range(count)
+    ]
+    users = [{"user_email": f"user{i}@example.com"} for i in range(count)]
+    timings = {}
+
+    db = CountingDatabase(tables)
+    scheduler = NotificationScheduler(db, email_service=object(), outbox=outbox)
+    started = time.perf_counter()
+    for update in updates:
+        await scheduler.send_project_status_update(update["project_id"], update["old_status"], update["new_status"] + "-single")
+    timings["project-update x1"] = (db.queries, time.perf_counter() - started)
+
+    db.queries = 0
+    started = time.perf_counter()
+    result = await scheduler.send_project_status_updates(updates)
+    assert result["queued"] == count
+    timings["project-update bulk"] = (db.queries, time.perf_counter() - started)
+
+    db.queries = 0
+    started = time.perf_counter()
+    result = await scheduler.send_welcome_emails(users)
+    assert all(item["success"] for item in result["results"])
+    timings["welcome bulk"] = (db.queries, time.perf_counter() - started)
+    return timings
+
+
+def main():
+    outbox = NotificationOutbox()
+    print(f"Simulated database latency: {LATENCY_MS} ms per round trip")
+    print(f"{'items':>6}  {'call':<22}{'round trips':>12}{'ms':>9}")
+    for count in (10, 100, 500):
+        # The scheduler logs every notification; keep that out of the table
+        with contextlib.redirect_stdout(io.StringIO()):
+            timings = asyncio.run(run(count, outbox))
+        for name, (queries, elapsed) in timings.items():
+            print(f"{count:>6}  {name:<22}{queries:>12}{elapsed * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
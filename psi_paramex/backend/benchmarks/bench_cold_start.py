@@ -0,0 +1,66 @@
+"""
+Benchmark for API cold start.
+
+Starts fresh interpreters that import main.py and run the FastAPI lifespan
+startup, reporting the median import time, startup time and which services
+were built during startup (everything else is built on first use or by the
+background warm-up).
+
+Usage:
+    python benchmarks/bench_cold_start.py
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+GROQ_API_DIR = Path(__file__).resolve().parent.parent / "groq_api"
+RUNS = 5
+
+PROBE = """
+import asyncio, json, os, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from services import services
+
+async def run():
+    async with services.lifespan(main.app):
+        ready = time.perf_counter()
+        built = sorted(services.init_ms)
+    return ready, built
+
+ready, built = asyncio.run(run())
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "startup_ms": (ready - imported) * 1000,
+    "built_at_startup": built,
+}))
+"""
+
+
+def main():
+    env = {
+        **os.environ,
+        "SERVICES_WARMUP": "false",
+        "NOTIFICATION_OUTBOX_PATH": os.path.join(tempfile.mkdtemp(), "bench_outbox.db"),
+        "PYTHONPATH": str(GROQ_API_DIR),
+    }
+    results = []
+    for _ in range(RUNS):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE], cwd=GROQ_API_DIR, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"{RUNS} cold starts (median)")
+    print(f"  import main.py: {statistics.median(r['import_ms'] for r in results):8.1f} ms")
+    print(f"  lifespan start: {statistics.median(r['startup_ms'] for r in results):8.1f} ms")
+    print(f"  built at startup: {', '.join(results[-1]['built_at_startup'])}")
+
+
+if __name__ == "__main__":
+    main()
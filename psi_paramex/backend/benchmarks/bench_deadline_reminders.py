@@ -0,0 +1,63 @@
+"""
+Benchmark for the deadline reminder timing wheel.
+
+Schedules reminders for a growing number of open projects and replays 30
+days of minute ticks, reporting the cost per scheduled reminder and per fired
+reminder, both of which should stay flat as the project count grows.
+
+Usage:
+    python benchmarks/bench_deadline_reminders.py
+"""
+import random
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "groq_api"))
+
+from deadline_reminders import DeadlineReminderEngine  # noqa: E402
+
+DAYS = 30
+
+
+def synthetic_projects(count: int, rng: random.Random):
+    today = date.today()
+    for i in range(count):
+        yield {
+            "project_id": f"p{i}",
+            "project_name": f"Project {i}",
+            "deadline": (today + timedelta(days=rng.randint(0, 120))).isoformat(),
+            "status_id": {"status_name": "On-Process"},
+            "users": {"email": f"user{i % 5000}@example.com", "name": "User"},
+        }
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'projects':>9}{'reminders':>11}{'schedule µs':>13}{'tick µs':>9}{'fired':>8}{'µs/fired':>10}")
+
+    for count in (10_000, 100_000, 200_000):
+        projects = list(synthetic_projects(count, rng))
+        engine = DeadlineReminderEngine()
+        now = time.time()
+
+        started = time.perf_counter()
+        for project in projects:
+            engine.upsert_project(project, now=now)
+        schedule_us = (time.perf_counter() - started) / len(engine.wheel) * 1e6
+        reminders = len(engine.wheel)
+
+        ticks = DAYS * 24 * 60
+        fired = 0
+        started = time.perf_counter()
+        for minute in range(1, ticks + 1):
+            fired += len(engine.wheel.advance(now + minute * 60))
+        elapsed = time.perf_counter() - started
+        tick_us = elapsed / ticks * 1e6
+
+        print(f"{count:>9}{reminders:>11}{schedule_us:>13.2f}{tick_us:>9.1f}{fired:>8}{elapsed / fired * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Benchmark for email template rendering.
+
+Compares compiling the template on every send (Environment.from_string, the
+old render path) with rendering the registry's compiled template.
+
+Usage:
+    python benchmarks/bench_email_templates.py
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "groq_api"))
+
+from jinja2 import BaseLoader, Environment  # noqa: E402
+
+from template_registry import EmailTemplateRegistry  # noqa: E402
+
+ITERATIONS = 2000
+TEMPLATES = {
+    "test_email.html": {"user_name": "Ana", "user_email": "ana@example.com", "current_time": "2025-07-01 09:00:00"},
+    "project_update.html": {
+        "user_name": "Ana", "project_name": "Landing page", "client_name": "Acme",
+        "old_status": "On-Process", "new_status": "Done", "update_message": "Delivered",
+        "current_time": "2025-07-01 09:00:00",
+    },
+    "welcome.html": {"user_name": "Ana", "user_email": "ana@example.com"},
+}
+
+
+def per_call_us(fn) -> float:
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        fn()
+    return (time.perf_counter() - started) / ITERATIONS * 1e6
+
+
+def main():
+    registry = EmailTemplateRegistry()
+    registry.set_globals(app_url="http://localhost:5173")
+    inline_env = Environment(loader=BaseLoader())
+
+    print(f"{'template':<22}{'compile+render µs':>19}{'registry µs':>13}{'speedup':>9}")
+    for name, data in TEMPLATES.items():
+        source = (Path(registry.template_dir) / name).read_text(encoding="utf-8")
+        data = {**data, "app_url": "http://localhost:5173"}
+        uncached = per_call_us(lambda: inline_env.from_string(source).render(**data))
+        cached = per_call_us(lambda: registry.render(name, data))
+        print(f"{name:<22}{uncached:>19.1f}{cached:>13.1f}{uncached / cached:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark for LLM record/replay cassettes.
+
+Records streamed (chat advice) and non-streamed (quick advice) completions
+from the load-test Groq stand-in through GroqLlamaClient, then replays
+them with the original timing and instantly. Checks that replays return
+the recorded answers and reports how closely replayed latency and time
+to first chunk follow the recording.
+
+Usage:
+    python benchmarks/bench_llm_cassettes.py
+"""
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "groq_api"))
+
+QUESTIONS = [
+    "How should I prioritize three projects due this month?",
+    "What is a fair way to handle scope creep with a startup client?",
+    "How do I estimate a dashboard project?",
+    "Should I take a fourth project while two are late?",
+]
+QUICK_TOPICS = ["prioritization", "estimation", "pricing"]
+
+
+class FirstChunkChecker:
+    """Stand-in response checker that only notes when the first chunk arrived"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_chunk_ms = None
+        self.aborted = False
+        self.abort_reason = None
+        self.length = 0
+
+    def feed(self, delta: str) -> bool:
+        if self.first_chunk_ms is None:
+            self.first_chunk_ms = (time.perf_counter() - self.started) * 1000
+        self.length += len(delta)
+        return False
+
+
+def run_pass(mode: str, time_scale: float, path: str):
+    os.environ.update({"LLM_CASSETTE_MODE": mode, "LLM_CASSETTE_PATH": path, "LLM_CASSETTE_TIME_SCALE": str(time_scale)})
+    from groq_client import GroqLlamaClient
+
+    client = GroqLlamaClient()
+    answers, totals, first_chunks = [], [], []
+    for question in QUESTIONS:
+        checker = FirstChunkChecker()
+        answers.append(asyncio.run(client.get_project_advice(question, response_checker=checker)))
+        totals.append((time.perf_counter() - checker.started) * 1000)
+        first_chunks.append(checker.first_chunk_ms)
+    for topic in QUICK_TOPICS:
+        started = time.perf_counter()
+        answers.append(asyncio.run(client.get_quick_advice(topic)))
+        totals.append((time.perf_counter() - started) * 1000)
+    return answers, totals, first_chunks
+
+
+def main():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    standin = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "groq_standin:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BENCH_DIR / "loadtest",
+    )
+    path = os.path.join(tempfile.mkdtemp(), "bench_cassettes.db")
+    try:
+        for _ in range(100):
+            try:
+                httpx.get(f"http://127.0.0.1:{port}/docs", timeout=1.0)
+                break
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        os.environ.update({"GROQ_API_KEY": "standin", "GROQ_BASE_URL": f"http://127.0.0.1:{port}"})
+        recorded, recorded_ms, recorded_first = run_pass("record", 1.0, path)
+    finally:
+        standin.terminate()
+        standin.wait()
+
+    # The stand-in is gone: everything below is served from the cassette file
+    del os.environ["GROQ_API_KEY"]
+    replayed, replayed_ms, replayed_first = run_pass("replay", 1.0, path)
+    instant, instant_ms, _ = run_pass("replay", 0.0, path)
+
+    calls = len(recorded)
+    print(f"{calls} completions ({len(QUESTIONS)} streamed), cassette file {os.path.getsize(path) / 1024:.1f} KiB")
+    print(f"  identical answers on replay: {sum(a == b for a, b in zip(recorded, replayed))}/{calls}, "
+          f"instant replay: {sum(a == b for a, b in zip(recorded, instant))}/{calls}")
+    print(f"  {'':22} {'record':>10} {'replay x1':>10} {'replay x0':>10}")
+    print(f"  {'mean latency ms':22} {statistics.fmean(recorded_ms):10.1f} {statistics.fmean(replayed_ms):10.1f} {statistics.fmean(instant_ms):10.2f}")
+    print(f"  {'mean first chunk ms':22} {statistics.fmean(recorded_first):10.1f} {statistics.fmean(replayed_first):10.1f} {'':>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Benchmark for the overhead of the metrics layer.
+
+Times a no-op function bare and wrapped in a stage timer, a counter increment
+through a bound child and through keyword labels, and the rendering of the
+/metrics page once every stage series has data.
+
+Usage:
+    python benchmarks/bench_metrics.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "groq_api"))
+
+from metrics import CACHE_LOOKUPS, metrics, observe_stage, timed  # noqa: E402
+
+CALLS = 200_000
+
+
+def per_call_ns(func, number=CALLS):
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e9
+
+
+def noop():
+    return None
+
+
+def main():
+    timed_noop = timed("bench.noop")(noop)
+    hits = CACHE_LOOKUPS.labels("bench", "hit")
+
+    def with_block():
+        with timed("bench.block"):
+            pass
+
+    baseline = per_call_ns(noop)
+    print(f"{'operation':32} {'ns/call':>10} {'overhead':>10}")
+    for name, func in (
+        ("plain call", noop),
+        ("@timed call", timed_noop),
+        ("with timed(...)", with_block),
+        ("bound counter inc", hits.inc),
+        ("keyword-label counter inc", lambda: CACHE_LOOKUPS.inc(cache="bench", result="miss")),
+    ):
+        cost = per_call_ns(func)
+        print(f"{name:32} {cost:10.0f} {cost - baseline:10.0f}")
+
+    for index in range(30):
+        observe_stage(f"bench.stage_{index}", 0.001 * index)
+    render_ms = min(timeit.repeat(metrics.render, number=100, repeat=5)) / 100 * 1000
+    print(f"\nrender /metrics ({len(metrics.render().splitlines())} lines): {render_ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
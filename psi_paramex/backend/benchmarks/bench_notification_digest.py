@@ -0,0 +1,136 @@
+"""
+Benchmark for windowed notification digests.
+
+Replays a burst of project status changes (several changes per user within
+a few minutes) through the per-event path (NotificationScheduler: one
+project + user lookup and one email per change) and through
+NotificationDigest, counting database round trips and emails written to
+the outbox. The database is an in-memory stand-in for the Supabase client
+that counts queries; the outbox is a temporary SQLite file.
+
+Usage:
+    python benchmarks/bench_notification_digest.py
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "groq_api"))
+os.environ.setdefault("NOTIFICATION_OUTBOX_PATH", os.path.join(tempfile.mkdtemp(), "bench_outbox.db"))
+
+from notification_digest import NotificationDigest  # noqa: E402
+from notification_outbox import NotificationOutbox  # noqa: E402
+from notification_scheduler import NotificationScheduler  # noqa: E402
+
+USERS = 200
+PROJECTS_PER_USER = 10
+EVENTS = 2000
+STATUSES = ["To Do", "On-Plan", "On-Process", "Done"]
+
+
+class CountingQuery:
+    def __init__(self, db, rows):
+        self.db = db
+        self.rows = rows
+        self.one = False
+
+    def select(self, *args, **kwargs):
+        return self
+
+    def eq(self, column, value):
+        self.rows = [row for row in self.rows if row[column] == value]
+        return self
+
+    def in_(self, column, values):
+        wanted = set(values)
+        self.rows = [row for row in self.rows if row[column] in wanted]
+        return self
+
+    def single(self):
+        self.one = True
+        return self
+
+    def execute(self):
+        self.db.queries += 1
+        data = (self.rows[0] if self.rows else None) if self.one else self.rows
+        return type("Response", (), {"data": data})()
+
+
+class CountingDatabase:
+    def __init__(self, projects):
+        self.projects = projects
+        self.queries = 0
+
+    def table(self, name):
+        return CountingQuery(self, self.projects)
+
+
+def synthetic_projects():
+    return [
+        {
+            "project_id": f"p{u}-{i}",
+            "project_name": f"Project {u}-{i}",
+            "client_name": "Acme",
+            "user_id": f"u{u}",
+            "users": {"email": f"user{u}@example.com", "name": f"User {u}"},
+        }
+        for u in range(USERS) for i in range(PROJECTS_PER_USER)
+    ]
+
+
+def synthetic_events(projects, rng):
+    status = {project["project_id"]: 0 for project in projects}
+    for _ in range(EVENTS):
+        project_id = rng.choice(projects)["project_id"]
+        old = status[project_id]
+        status[project_id] = (old + 1) % len(STATUSES)
+        yield project_id, STATUSES[old], STATUSES[status[project_id]]
+
+
+async def run_per_event(projects, events, outbox):
+    db = CountingDatabase(projects)
+    scheduler = NotificationScheduler(db, email_service=object(), outbox=outbox)
+    started = time.perf_counter()
+    written = 0
+    for project_id, old, new in events:
+        result = await scheduler.send_project_status_update(project_id, old, new)
+        written += not result["duplicate"]
+    return db.queries, written, time.perf_counter() - started
+
+
+async def run_digest(projects, events, outbox):
+    db = CountingDatabase(projects)
+    digest = NotificationDigest(db, outbox=outbox, window_seconds=120)
+    now = time.time()
+    started = time.perf_counter()
+    written = 0
+    # Events spread over five minutes with a flush every 30 seconds
+    for i, (project_id, old, new) in enumerate(events):
+        at = now + i * 300 / len(events)
+        digest.add_project_update(project_id, old, new, now=at)
+        if i % (len(events) // 10) == 0:
+            written += await digest.flush(now=at)
+    written += await digest.flush(now=now + 300 + 120)
+    return db.queries, written, time.perf_counter() - started
+
+
+def main():
+    rng = random.Random(7)
+    projects = synthetic_projects()
+    events = list(synthetic_events(projects, rng))
+
+    per_event = asyncio.run(run_per_event(projects, events, NotificationOutbox(os.environ["NOTIFICATION_OUTBOX_PATH"] + ".a")))
+    digest = asyncio.run(run_digest(projects, events, NotificationOutbox(os.environ["NOTIFICATION_OUTBOX_PATH"] + ".b")))
+
+    print(f"{EVENTS} status changes, {USERS} users, {USERS * PROJECTS_PER_USER} projects")
+    print(f"{'path':<12}{'queries':>9}{'emails':>8}{'ms':>9}")
+    for name, (queries, written, elapsed) in (("per-event", per_event), ("digest", digest)):
+        print(f"{name:<12}{queries:>9}{written:>8}{elapsed * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
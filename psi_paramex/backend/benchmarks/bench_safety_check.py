@@ -0,0 +1,78 @@
+"""
+Benchmark for UXSafetyChecker.check_user_input.
+
+Covers ordinary messages up to the 2000-character limit and adversarial
+inputs (long character runs, near-miss keyword prefixes, caps and punctuation
+floods), both uncached and through the verdict cache.
+
+Usage:
+    python benchmarks/bench_safety_check.py
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "groq_api"))
+
+from ux_safety_check import UXSafetyChecker  # noqa: E402
+
+ITERATIONS = 200
+WORDS = [
+    "project", "deadline", "client", "budget", "timeline", "please", "help", "me",
+    "plan", "the", "website", "mobile", "app", "next", "week", "scope", "invoice",
+]
+
+
+def ordinary_message(length: int, rng: random.Random) -> str:
+    words = []
+    while sum(len(word) + 1 for word in words) < length:
+        words.append(rng.choice(WORDS))
+    return " ".join(words)[:length]
+
+
+def adversarial_messages(length: int):
+    return {
+        "char_run": "a" * length,
+        "almost_run": ("a" * 10 + "b") * (length // 11),
+        "caps_flood": "A" * length,
+        "punctuation_flood": "!?" * (length // 2),
+        "keyword_prefixes": ("hac dat discrimina polit relig " * length)[:length],
+        "dense_keywords": ("hack scam drugs hate project " * length)[:length],
+    }
+
+
+def time_call(checker: UXSafetyChecker, message: str, cached: bool) -> float:
+    if not cached:
+        checker._verdict_cache.clear()
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        if not cached:
+            checker._check_user_input_uncached(message)
+        else:
+            checker.check_user_input(message)
+    return (time.perf_counter() - started) / ITERATIONS * 1e6
+
+
+def main():
+    rng = random.Random(42)
+    checker = UXSafetyChecker()
+
+    print(f"{'input':<24}{'chars':>7}{'uncached µs':>14}{'cached µs':>12}")
+    for length in (50, 200, 500, 1000, 2000):
+        message = ordinary_message(length, rng)
+        print(f"{'ordinary':<24}{len(message):>7}"
+              f"{time_call(checker, message, False):>14.1f}{time_call(checker, message, True):>12.1f}")
+
+    for name, message in adversarial_messages(2000).items():
+        print(f"{name:<24}{len(message):>7}"
+              f"{time_call(checker, message, False):>14.1f}{time_call(checker, message, True):>12.1f}")
+
+    # Linear scaling check: 10x the input should cost roughly 10x, not 100x
+    short, long = "a" * 2000, "a" * 20000
+    ratio = time_call(checker, long, False) / time_call(checker, short, False)
+    print(f"\n20000 vs 2000 char run cost ratio: {ratio:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
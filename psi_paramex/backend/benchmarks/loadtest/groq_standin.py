@@ -0,0 +1,94 @@
+"""
+OpenAI/Groq-compatible chat completion stand-in.
+
+Answers POST /openai/v1/chat/completions (the path the groq SDK calls
+under GROQ_BASE_URL), streamed or not, with a canned project-management
+answer. Each response waits the configured time to first token and then
+produces tokens at the configured rate, so the backend sees realistic
+LLM latency without spending quota. Usage is reported like Groq does
+(in the response body, or x_groq on the last stream chunk).
+
+Environment:
+    STANDIN_LLM_TTFT_MS: time to first token (default 250)
+    STANDIN_LLM_TOKENS_PER_SECOND: generation rate (default 400)
+    STANDIN_LLM_COMPLETION_TOKENS: tokens per answer, capped by max_tokens (default 150)
+    STANDIN_LLM_ERROR_RATE: fraction of requests answered with HTTP 500 (default 0)
+
+Usage:
+    python -m uvicorn groq_standin:app --port 54322
+"""
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+ANSWER = (
+    "Decision: proceed with caution. Confidence: 75%. Start with the project that has the closest deadline "
+    "and agree on clear milestones with the client. Block focused time each day, keep a short weekly status "
+    "update, and check that the budget covers revisions. Key insights: your completion rate is healthy, "
+    "current workload leaves limited slack, and similar past projects finished close to their deadlines. "
+)
+STREAM_CHUNK_TOKENS = 8
+
+ttft = float(os.getenv("STANDIN_LLM_TTFT_MS", "250")) / 1000
+tokens_per_second = float(os.getenv("STANDIN_LLM_TOKENS_PER_SECOND", "400"))
+completion_tokens = int(os.getenv("STANDIN_LLM_COMPLETION_TOKENS", "150"))
+error_rate = float(os.getenv("STANDIN_LLM_ERROR_RATE", "0"))
+
+app = FastAPI(title="Groq stand-in")
+
+
+def _tokens(count: int):
+    words = ANSWER.split()
+    return [words[index % len(words)] + " " for index in range(count)]
+
+
+def _usage(body: dict, count: int) -> dict:
+    prompt_tokens = sum(len(str(message.get("content", "")).split()) for message in body.get("messages", []))
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": count, "total_tokens": prompt_tokens + count}
+
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    if error_rate and random.random() < error_rate:
+        return JSONResponse({"error": {"message": "stand-in failure", "type": "server_error"}}, status_code=500)
+
+    tokens = _tokens(min(completion_tokens, body.get("max_tokens") or completion_tokens))
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    created = int(time.time())
+    model = body.get("model", "standin")
+
+    if not body.get("stream"):
+        await asyncio.sleep(ttft + len(tokens) / tokens_per_second)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens).strip()}, "finish_reason": "stop"}],
+            "usage": _usage(body, len(tokens)),
+        }
+
+    async def events():
+        await asyncio.sleep(ttft)
+        for start in range(0, len(tokens), STREAM_CHUNK_TOKENS):
+            chunk = tokens[start:start + STREAM_CHUNK_TOKENS]
+            yield "data: " + json.dumps({
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": {"content": "".join(chunk)}, "finish_reason": None}],
+            }) + "\n\n"
+            await asyncio.sleep(len(chunk) / tokens_per_second)
+        yield "data: " + json.dumps({
+            "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "x_groq": {"id": completion_id, "usage": _usage(body, len(tokens))},
+        }) + "\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
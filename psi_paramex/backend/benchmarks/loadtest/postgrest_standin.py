@@ -0,0 +1,158 @@
+"""
+PostgREST-compatible stand-in for the Supabase projects store.
+
+Serves /rest/v1/projects from memory, seeded with synthetic users
+(user-0000, user-0001, ...) whose projects carry the embedded type and
+status objects the backend selects. Supports the subset of PostgREST the
+backend uses: eq/neq/in/gt/gte/lt/lte/is filters (including embedded
+columns such as status_id.status_name), order, limit/offset and
+Prefer: count=exact.
+
+Environment:
+    STANDIN_USERS: number of synthetic users (default 200)
+    STANDIN_PROJECTS_PER_USER: "min,max" projects per user (default "5,30")
+    STANDIN_SEED: random seed (default 42)
+    STANDIN_DB_LATENCY_MS: added latency per query (default 5)
+
+Usage:
+    python -m uvicorn postgrest_standin:app --port 54321
+"""
+import asyncio
+import os
+import random
+import re
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+PROJECT_TYPES = ["Web Development", "Mobile App", "UI/UX Design", "Data Analysis", "Content Writing"]
+STATUSES = ["To Do", "On-Plan", "On-Process", "Done", "Done", "Done"]
+DIFFICULTIES = ["Low", "Medium", "High"]
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+def seed_projects(users: int, per_user: tuple, seed: int) -> Dict[str, List[Dict[str, Any]]]:
+    """Synthetic projects per user, in the shape the Supabase projects table returns"""
+    rng = random.Random(seed)
+    today = date.today()
+    tables: Dict[str, List[Dict[str, Any]]] = {"projects": [], "users": []}
+    for user_index in range(users):
+        user_id = f"user-{user_index:04d}"
+        tables["users"].append({"user_id": user_id, "email": f"{user_id}@loadtest.local", "name": f"Load Test {user_index}"})
+        for project_index in range(rng.randint(*per_user)):
+            start = today - timedelta(days=rng.randint(0, 365))
+            difficulty = rng.choice(DIFFICULTIES)
+            tables["projects"].append({
+                "project_id": f"{user_id}-p{project_index:03d}",
+                "user_id": user_id,
+                "project_name": f"{rng.choice(PROJECT_TYPES)} #{project_index}",
+                "client_name": f"Client {rng.randint(1, 40)}",
+                "start_date": start.isoformat(),
+                "deadline": (start + timedelta(days=rng.randint(7, 120))).isoformat(),
+                "payment_amount": rng.randrange(500_000, 50_000_000, 50_000),
+                "difficulty_level": difficulty,
+                "created_at": datetime.combine(start, datetime.min.time()).isoformat(),
+                "type_id": {"type_name": rng.choice(PROJECT_TYPES)},
+                "status_id": {"status_name": rng.choice(STATUSES)},
+                "users": {"email": f"{user_id}@loadtest.local", "name": f"Load Test {user_index}"},
+            })
+    return tables
+
+
+def _select_keys(select: str) -> List[str]:
+    """Top-level keys of a PostgREST select, e.g. 'a, b:b ( c ), d!inner ( e )' -> a, b, d"""
+    keys, depth, item = [], 0, ""
+    for char in select + ",":
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            name = re.split(r"[:!(]", item.strip(), maxsplit=1)[0].strip()
+            if name:
+                keys.append(name)
+            item = ""
+            continue
+        if depth == 0:
+            item += char
+    return keys
+
+
+def _value(row: Dict[str, Any], column: str) -> Any:
+    for part in column.split("."):
+        row = row.get(part) if isinstance(row, dict) else None
+    return row
+
+
+def _matches(row: Dict[str, Any], column: str, condition: str) -> bool:
+    operator, _, expected = condition.partition(".")
+    value = _value(row, column)
+    if operator == "in":
+        return str(value) in {item.strip().strip('"') for item in expected.strip("()").split(",")}
+    if operator == "is":
+        return value is None if expected == "null" else str(value).lower() == expected
+    if value is None:
+        return False
+    if operator == "eq":
+        return str(value) == expected
+    if operator == "neq":
+        return str(value) != expected
+    compare = {"gt": lambda a, b: a > b, "gte": lambda a, b: a >= b, "lt": lambda a, b: a < b, "lte": lambda a, b: a <= b}
+    if operator in compare:
+        try:
+            return compare[operator](float(value), float(expected))
+        except ValueError:
+            return compare[operator](str(value), expected)
+    raise ValueError(f"Unsupported filter operator: {operator}")
+
+
+tables = seed_projects(
+    int(os.getenv("STANDIN_USERS", "200")),
+    tuple(int(n) for n in os.getenv("STANDIN_PROJECTS_PER_USER", "5,30").split(",")),
+    int(os.getenv("STANDIN_SEED", "42")),
+)
+latency = float(os.getenv("STANDIN_DB_LATENCY_MS", "5")) / 1000
+
+app = FastAPI(title="PostgREST stand-in")
+
+
+@app.get("/rest/v1/{table}")
+async def select_rows(table: str, request: Request):
+    if latency:
+        await asyncio.sleep(latency)
+    if table not in tables:
+        return JSONResponse({"message": f"relation \"{table}\" does not exist"}, status_code=404)
+
+    params = request.query_params
+    rows = tables[table]
+    for column, condition in params.multi_items():
+        if column not in RESERVED_PARAMS:
+            rows = [row for row in rows if _matches(row, column, condition)]
+
+    for order in reversed(params.get("order", "").split(",") if params.get("order") else []):
+        column, _, direction = order.partition(".")
+        rows = sorted(rows, key=lambda row: str(_value(row, column)), reverse=direction.startswith("desc"))
+
+    total = len(rows)
+    offset = int(params.get("offset", 0))
+    limit = int(params.get("limit", total))
+    rows = rows[offset:offset + limit]
+
+    keys = _select_keys(params.get("select", "*"))
+    if keys and keys != ["*"] and keys != ["count"]:
+        rows = [{key: row.get(key) for key in keys} for row in rows]
+    elif keys == ["count"]:
+        rows = [{"count": total}]
+
+    headers = {}
+    if "count=" in request.headers.get("prefer", ""):
+        end = offset + len(rows) - 1
+        headers["Content-Range"] = f"{offset}-{end}/{total}" if rows else f"*/{total}"
+    return JSONResponse(rows, headers=headers)
+
+
+@app.get("/health")
+async def health():
+    return {"tables": {name: len(rows) for name, rows in tables.items()}}
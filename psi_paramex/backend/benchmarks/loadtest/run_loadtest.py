@@ -0,0 +1,323 @@
+"""
+Offline load test for the advisor API.
+
+Starts the PostgREST and Groq stand-ins and the FastAPI app (under
+uvicorn, pointed at the stand-ins through VITE_SUPABASE_URL and
+GROQ_BASE_URL, with rate limiting off), then drives each endpoint with
+a closed-loop load generator: --concurrency clients send requests for
+synthetic users back to back for --duration seconds. Reports throughput,
+error rate, p50/p95/p99 latency and the mean Server-Timing stages per
+endpoint, and compares them with a stored baseline; the exit status is 1
+when an endpoint regressed by more than --tolerance.
+
+Nothing leaves the machine: no Groq quota is used and no real database
+is touched.
+
+Usage:
+    python benchmarks/loadtest/run_loadtest.py
+    python benchmarks/loadtest/run_loadtest.py --endpoints chat --concurrency 32 --duration 30
+    python benchmarks/loadtest/run_loadtest.py --update-baseline
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+
+LOADTEST_DIR = Path(__file__).resolve().parent
+GROQ_API_DIR = LOADTEST_DIR.parent.parent / "groq_api"
+DEFAULT_BASELINE = LOADTEST_DIR / "baseline.json"
+
+# Stand-in settings recorded with the results; a baseline only compares against the same settings
+STANDIN_DEFAULTS = {
+    "STANDIN_USERS": "200",
+    "STANDIN_PROJECTS_PER_USER": "5,30",
+    "STANDIN_DB_LATENCY_MS": "5",
+    "STANDIN_LLM_TTFT_MS": "250",
+    "STANDIN_LLM_TOKENS_PER_SECOND": "400",
+    "STANDIN_LLM_COMPLETION_TOKENS": "150",
+}
+
+
+def chat_payload(rng: random.Random, user_id: str) -> Dict[str, Any]:
+    return {
+        "message": rng.choice([
+            "What should I focus on this week?",
+            "Which of my projects are overdue?",
+            "How is my workload looking?",
+            "Apa prioritas project saya hari ini?",
+        ]),
+        "user_id": user_id,
+        "conversation_history": [],
+    }
+
+
+def analyze_project_payload(rng: random.Random, user_id: str) -> Dict[str, Any]:
+    start = date.today() + timedelta(days=rng.randint(0, 14))
+    return {
+        "title": "Company profile website",
+        "description": "Responsive company profile with CMS, contact form and basic SEO",
+        "timeline": f"{rng.randint(2, 8)} weeks",
+        "budget": f"Rp {rng.randint(5, 40)}.000.000",
+        "client_type": rng.choice(["Startup", "SME", "Enterprise"]),
+        "complexity": rng.choice(["Low", "Medium", "High"]),
+        "user_id": user_id,
+        "difficulty_level": rng.choice(["Low", "Medium", "High"]),
+        "project_type": "Web Development",
+        "start_date": start.isoformat(),
+        "deadline": (start + timedelta(days=rng.randint(14, 60))).isoformat(),
+    }
+
+
+def project_analysis_payload(rng: random.Random, user_id: str) -> Dict[str, Any]:
+    completed = rng.randint(2, 20)
+    return {
+        "user_id": user_id,
+        "project_history": {
+            "totalProjects": completed + rng.randint(0, 8),
+            "completedProjects": [{} for _ in range(completed)],
+            "averagePayment": rng.randint(2, 30) * 1_000_000,
+            "projectTypes": ["Web Development", "UI/UX Design"],
+        },
+        "completion_rate": rng.uniform(50, 100),
+        "current_workload": rng.randint(0, 7),
+    }
+
+
+ENDPOINTS = {
+    "chat": ("/api/chat", chat_payload),
+    "analyze-project": ("/api/analyze-project", analyze_project_payload),
+    "project-analysis": ("/api/project-analysis", project_analysis_payload),
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(module: str, port: int, cwd: Path, env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{module}:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=cwd, env=env, stdout=subprocess.DEVNULL,
+    )
+
+
+def wait_until_up(url: str, process: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server for {url} exited with status {process.returncode}")
+        try:
+            if httpx.get(url, timeout=2.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    stages = {}
+    for entry in header.split(","):
+        name, *params = entry.strip().split(";")
+        for param in params:
+            if param.startswith("dur="):
+                stages[name] = float(param[4:])
+    return stages
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a sorted list"""
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+async def drive(client: httpx.AsyncClient, name: str, users: int, concurrency: int, duration: float, warmup: int, seed: int):
+    path, make_payload = ENDPOINTS[name]
+    rng = random.Random(seed)
+
+    for _ in range(warmup):
+        await client.post(path, json=make_payload(rng, f"user-{rng.randrange(users):04d}"))
+
+    latencies: List[float] = []
+    errors = 0
+    stage_totals: Dict[str, float] = defaultdict(float)
+    deadline = time.perf_counter() + duration
+
+    async def worker(worker_rng: random.Random):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            payload = make_payload(worker_rng, f"user-{worker_rng.randrange(users):04d}")
+            started = time.perf_counter()
+            try:
+                response = await client.post(path, json=payload)
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                response, ok = None, False
+            latencies.append((time.perf_counter() - started) * 1000)
+            if not ok:
+                errors += 1
+            elif "server-timing" in response.headers:
+                for stage, ms in parse_server_timing(response.headers["server-timing"]).items():
+                    stage_totals[stage] += ms
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(random.Random(seed * 1000 + index)) for index in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    succeeded = len(ordered) - errors
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "error_rate": round(errors / len(ordered), 4) if ordered else 0.0,
+        "throughput_rps": round(len(ordered) / elapsed, 2),
+        "p50_ms": round(percentile(ordered, 0.50), 1) if ordered else None,
+        "p95_ms": round(percentile(ordered, 0.95), 1) if ordered else None,
+        "p99_ms": round(percentile(ordered, 0.99), 1) if ordered else None,
+        "mean_ms": round(statistics.fmean(ordered), 1) if ordered else None,
+        "server_timing_mean_ms": {
+            stage: round(total / succeeded, 1) for stage, total in sorted(stage_totals.items())
+        } if succeeded else {},
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions of results against baseline, as readable lines"""
+    regressions = []
+    for name, current in results["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if not previous:
+            continue
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            if previous.get(key) and current[key] is not None and current[key] > previous[key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {current[key]} > {previous[key]} (+{tolerance:.0%})")
+        if current["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {current['throughput_rps']} < {previous['throughput_rps']} (-{tolerance:.0%})")
+        if current["error_rate"] > previous["error_rate"] + 0.01:
+            regressions.append(f"{name}: error rate {current['error_rate']:.2%} > {previous['error_rate']:.2%} + 1%")
+    return regressions
+
+
+def print_report(results: Dict[str, Any]) -> None:
+    print(f"\n{'endpoint':18} {'reqs':>6} {'err%':>6} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}  server timing (mean ms)")
+    for name, result in results["endpoints"].items():
+        stages = ", ".join(f"{stage} {ms:g}" for stage, ms in result["server_timing_mean_ms"].items())
+        print(
+            f"{name:18} {result['requests']:6d} {result['error_rate'] * 100:6.1f} {result['throughput_rps']:8.2f} "
+            f"{result['p50_ms']:8.1f} {result['p95_ms']:8.1f} {result['p99_ms']:8.1f}  {stages}"
+        )
+
+
+async def run(args) -> Dict[str, Any]:
+    standin_env = {key: os.environ.get(key, value) for key, value in STANDIN_DEFAULTS.items()}
+    env = {**os.environ, **standin_env}
+    db_port, llm_port, app_port = free_port(), free_port(), free_port()
+    app_env = {
+        **env,
+        "VITE_SUPABASE_URL": f"http://127.0.0.1:{db_port}",
+        "VITE_SUPABASE_ANON_KEY": "standin.standin.standin",
+        "GROQ_API_KEY": "standin",
+        "GROQ_BASE_URL": f"http://127.0.0.1:{llm_port}",
+        "RATE_LIMIT_ENABLED": "false",
+        "NOTIFICATION_OUTBOX_PATH": os.path.join(tempfile.mkdtemp(), "loadtest_outbox.db"),
+        "LOG_LEVEL": "WARNING",
+        "PROFILER_ENABLED": "false",
+    }
+
+    processes = []
+    try:
+        processes.append(start_server("postgrest_standin", db_port, LOADTEST_DIR, env))
+        processes.append(start_server("groq_standin", llm_port, LOADTEST_DIR, env))
+        processes.append(start_server("main", app_port, GROQ_API_DIR, app_env))
+        wait_until_up(f"http://127.0.0.1:{db_port}/health", processes[0])
+        wait_until_up(f"http://127.0.0.1:{app_port}/ready", processes[2])
+
+        results = {
+            "config": {
+                "concurrency": args.concurrency,
+                "duration_seconds": args.duration,
+                "standins": standin_env,
+            },
+            "endpoints": {},
+        }
+        users = int(standin_env["STANDIN_USERS"])
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{app_port}", timeout=60.0, limits=limits) as client:
+            for index, name in enumerate(args.endpoints):
+                print(f"▶ {name}: {args.concurrency} clients for {args.duration:g}s")
+                results["endpoints"][name] = await drive(
+                    client, name, users, args.concurrency, args.duration, args.warmup, args.seed + index
+                )
+        return results
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), type=lambda value: value.split(","))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per endpoint")
+    parser.add_argument("--warmup", type=int, default=3, help="unmeasured requests per endpoint")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--output", type=Path, help="also write the results as JSON")
+    args = parser.parse_args()
+
+    unknown = set(args.endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))} (choose from {', '.join(ENDPOINTS)})")
+
+    results = asyncio.run(run(args))
+    print_report(results)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"\n✅ Baseline written to {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"\n⚠️ No baseline at {args.baseline}; run with --update-baseline to create one")
+        return
+
+    baseline = json.loads(args.baseline.read_text())
+    if baseline.get("config") != results["config"]:
+        print("\n⚠️ Baseline was recorded with different settings; comparison skipped")
+        print(f"   baseline: {json.dumps(baseline.get('config'))}")
+        return
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("\n❌ Regressions against baseline:")
+        for line in regressions:
+            print(f"   {line}")
+        sys.exit(1)
+    print(f"\n✅ Within {args.tolerance:.0%} of baseline")
+
+
+if __name__ == "__main__":
+    main()
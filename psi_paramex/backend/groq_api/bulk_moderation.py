@@ -0,0 +1,272 @@
+"""
+Bulk moderation of stored advisor transcripts.
+
+Input is NDJSON with one conversation per line:
+
+    {"conversation_id": "abc", "messages": [{"type": "user", "content": "..."}, ...]}
+
+Each output line carries the conversation moderation result plus a check for
+every message (user messages through check_user_input, assistant messages
+through check_ai_response), in input order.
+
+Usage:
+    python bulk_moderation.py transcripts.ndjson results.ndjson --workers 8
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ux_safety_check import ux_safety_checker
+
+Batch = List[Tuple[int, bytes]]
+
+
+def moderate_transcript(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Moderate one conversation record"""
+    messages = record.get("messages") or []
+    checks = []
+    flagged = False
+
+    for index, message in enumerate(messages):
+        content = message.get("content", "")
+        if message.get("type") == "user":
+            check = ux_safety_checker.check_user_input(content)
+        else:
+            check = ux_safety_checker.check_ai_response(content)
+        flagged = flagged or not check["is_safe"]
+        checks.append({
+            "index": index,
+            "type": message.get("type"),
+            "is_safe": check["is_safe"],
+            "issues": check["issues"],
+            "severity": check["severity"],
+        })
+
+    moderation = ux_safety_checker.moderate_conversation(messages)
+    return {
+        "conversation_id": record.get("conversation_id"),
+        "flagged": flagged or not moderation["is_safe"],
+        "moderation": moderation,
+        "messages": checks,
+    }
+
+
+def moderate_batch(batch: Batch) -> Tuple[List[str], int]:
+    """
+    Worker entry point: parse, moderate and serialize a batch of lines
+
+    Returns:
+        Output NDJSON lines and the number of flagged conversations
+    """
+    lines = []
+    flagged = 0
+    for line_number, raw in batch:
+        try:
+            result = moderate_transcript(json.loads(raw))
+        except (ValueError, AttributeError, TypeError) as e:
+            result = {"line": line_number, "error": f"Invalid transcript: {str(e)}"}
+        else:
+            result["line"] = line_number
+            flagged += result["flagged"]
+        lines.append(json.dumps(result, ensure_ascii=False))
+    return lines, flagged
+
+
+class BulkModerationRunner:
+    """
+    Streams an NDJSON transcript file through a process pool.
+
+    Lines are read lazily and handed to workers in batches; at most
+    ``max_in_flight`` batches are queued at a time, so memory stays bounded no
+    matter how large the file is. Results are written as they complete, in
+    input order.
+    """
+
+    def __init__(self, workers: Optional[int] = None, batch_size: int = 200, max_in_flight: Optional[int] = None):
+        # More processes than cores only adds memory and scheduling overhead
+        cpus = os.cpu_count() or 1
+        self.workers = max(1, min(workers or cpus, cpus))
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight or self.workers * 2
+
+    def run(
+        self,
+        input_path: str,
+        output_path: str,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Moderate every conversation in input_path and write results to output_path
+
+        Args:
+            input_path: NDJSON transcript file
+            output_path: NDJSON results file (overwritten)
+            progress: Optional callback receiving progress dicts after each batch
+
+        Returns:
+            Summary with line, flagged and throughput counts
+        """
+        # Opening the output for writing would truncate the input before it is read
+        if os.path.realpath(output_path) == os.path.realpath(input_path):
+            raise ValueError("output_path must differ from input_path")
+        total_bytes = os.path.getsize(input_path)
+        stats = {"lines": 0, "flagged": 0, "bytes_read": 0, "total_bytes": total_bytes}
+        started = time.perf_counter()
+
+        # Spawned workers: forking a threaded server process is unsafe
+        context = multiprocessing.get_context("spawn")
+        with open(input_path, "rb") as source, open(output_path, "w", encoding="utf-8") as sink, \
+                ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as pool:
+            pending = deque()
+
+            def drain_head():
+                lines, flagged = pending.popleft().result()
+                if lines:
+                    sink.write("\n".join(lines))
+                    sink.write("\n")
+                stats["lines"] += len(lines)
+                stats["flagged"] += flagged
+                if progress:
+                    progress(self._progress(stats, started))
+
+            for batch, bytes_read in self._batches(source):
+                if len(pending) >= self.max_in_flight:
+                    drain_head()
+                pending.append(pool.submit(moderate_batch, batch))
+                stats["bytes_read"] = bytes_read
+
+            while pending:
+                drain_head()
+
+        return self._progress(stats, started)
+
+    def _batches(self, source):
+        batch: Batch = []
+        bytes_read = 0
+        for line_number, raw in enumerate(source, 1):
+            bytes_read += len(raw)
+            if not raw.strip():
+                continue
+            batch.append((line_number, raw))
+            if len(batch) >= self.batch_size:
+                yield batch, bytes_read
+                batch = []
+        if batch:
+            yield batch, bytes_read
+
+    def _progress(self, stats: Dict[str, Any], started: float) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - started
+        return {
+            **stats,
+            "percent": round(100 * stats["bytes_read"] / stats["total_bytes"], 1) if stats["total_bytes"] else 100.0,
+            "elapsed_seconds": round(elapsed, 2),
+            "conversations_per_second": round(stats["lines"] / elapsed, 1) if elapsed > 0 else 0.0,
+            "workers": self.workers,
+        }
+
+
+class TooManyJobsError(Exception):
+    """The maximum number of bulk moderation jobs is already running"""
+
+
+class BulkModerationJobs:
+    """
+    Background bulk moderation jobs for the API.
+
+    Paths are resolved inside MODERATION_DATA_DIR so the endpoint can only
+    read and write transcript files there. At most MODERATION_MAX_JOBS jobs
+    (default 1) run at a time, each with at most one worker per CPU.
+    """
+
+    def __init__(self, data_dir: Optional[str] = None, max_jobs: Optional[int] = None):
+        self.data_dir = Path(data_dir or os.getenv("MODERATION_DATA_DIR", "moderation_data")).resolve()
+        self.max_jobs = max_jobs or int(os.getenv("MODERATION_MAX_JOBS", "1"))
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, relative_path: str) -> Path:
+        path = (self.data_dir / relative_path).resolve()
+        if self.data_dir not in path.parents:
+            raise ValueError(f"Path must be inside {self.data_dir}")
+        return path
+
+    def start(self, input_path: str, output_path: Optional[str] = None, workers: Optional[int] = None) -> Dict[str, Any]:
+        source = self.resolve(input_path)
+        if not source.is_file():
+            raise FileNotFoundError(f"Transcript file not found: {input_path}")
+        sink = self.resolve(output_path or f"{source.stem}.moderation.ndjson")
+        if sink == source:
+            raise ValueError("output_path must differ from input_path")
+
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "input_path": str(source),
+            "output_path": str(sink),
+            "state": "running",
+            "progress": {},
+            "error": None,
+        }
+        with self._lock:
+            running = sum(1 for existing in self._jobs.values() if existing["state"] == "running")
+            if running >= self.max_jobs:
+                raise TooManyJobsError(f"{running} bulk moderation job(s) already running; try again later")
+            self._jobs[job_id] = job
+
+        runner = BulkModerationRunner(workers=workers)
+        threading.Thread(target=self._run, args=(job, runner), daemon=True).start()
+        return dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _run(self, job: Dict[str, Any], runner: BulkModerationRunner) -> None:
+        def report(progress: Dict[str, Any]) -> None:
+            job["progress"] = progress
+
+        try:
+            job["progress"] = runner.run(job["input_path"], job["output_path"], progress=report)
+            job["state"] = "completed"
+            print(f"✅ Bulk moderation {job['job_id']} finished: {job['progress']['lines']} conversations, "
+                  f"{job['progress']['flagged']} flagged")
+        except Exception as e:
+            job["state"] = "failed"
+            job["error"] = str(e)
+            print(f"❌ Bulk moderation {job['job_id']} failed: {str(e)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Moderate an NDJSON transcript file in parallel")
+    parser.add_argument("input", help="NDJSON transcript file, one conversation per line")
+    parser.add_argument("output", help="NDJSON results file")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=200, help="conversations per worker task")
+    args = parser.parse_args()
+
+    def report(progress: Dict[str, Any]) -> None:
+        print(f"\r{progress['percent']:5.1f}%  {progress['lines']} conversations  "
+              f"{progress['flagged']} flagged  {progress['conversations_per_second']}/s",
+              end="", file=sys.stderr)
+
+    runner = BulkModerationRunner(workers=args.workers, batch_size=args.batch_size)
+    summary = runner.run(args.input, args.output, progress=report)
+    print(file=sys.stderr)
+    print(json.dumps(summary))
+
+
+# Global instance
+bulk_moderation_jobs = BulkModerationJobs()
+
+if __name__ == "__main__":
+    main()
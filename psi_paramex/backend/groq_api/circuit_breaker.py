@@ -0,0 +1,245 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from metrics import CIRCUIT_REJECTED, CIRCUIT_STATE, CIRCUIT_TRANSITIONS, HEDGED_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+LATENCY_SAMPLES = 200
+
+
+class CircuitOpenError(Exception):
+    """An LLM call was refused because its circuit is open"""
+
+    def __init__(self, breaker: str, retry_after: float):
+        super().__init__(f"Circuit {breaker} is open; retry in {retry_after:.0f}s")
+        self.breaker = breaker
+        self.retry_after = retry_after
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one model and endpoint class.
+
+    Closed: calls go through and their outcomes fill a sliding window. Once
+    the window has min_calls outcomes and the failure rate or the share of
+    slow calls (>= slow_call_seconds) reaches its threshold, the circuit
+    opens and callers get CircuitOpenError immediately, so endpoints serve
+    their local fallback instead of waiting for a struggling API. After
+    open_seconds one probe call is let through (half-open); it closes the
+    circuit if it succeeds in time and reopens it otherwise.
+
+    The successful call latencies also drive hedging: when enabled, a
+    second identical request is started if the first has not answered
+    after the recent p95 latency, and whichever answers first wins.
+    Hedges are capped at hedge_budget of all calls.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.window = int(_env_float("LLM_BREAKER_WINDOW", 20))
+        self.min_calls = int(_env_float("LLM_BREAKER_MIN_CALLS", 5))
+        self.failure_rate = _env_float("LLM_BREAKER_FAILURE_RATE", 0.5)
+        self.slow_call_seconds = _env_float("LLM_BREAKER_SLOW_SECONDS", 10.0)
+        self.slow_rate = _env_float("LLM_BREAKER_SLOW_RATE", 0.8)
+        self.open_seconds = _env_float("LLM_BREAKER_OPEN_SECONDS", 30.0)
+        self.hedge_enabled = os.getenv("LLM_HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+        self.hedge_percentile = _env_float("LLM_HEDGE_PERCENTILE", 0.95)
+        self.hedge_min_delay = _env_float("LLM_HEDGE_MIN_DELAY_SECONDS", 0.5)
+        self.hedge_budget = _env_float("LLM_HEDGE_BUDGET", 0.1)
+
+        self.state = CLOSED
+        self._outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=self.window)
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "failures": 0, "slow": 0, "rejected": 0, "hedged": 0, "hedges_won": 0}
+        self._state_gauge = CIRCUIT_STATE.labels(name)
+        self._rejected = CIRCUIT_REJECTED.labels(name)
+        self._state_gauge.set(STATE_VALUES[CLOSED])
+
+    def acquire(self, now: Optional[float] = None) -> str:
+        """
+        Ask to make a call
+
+        Returns:
+            "call" or "probe" (the single half-open trial call)
+
+        Raises:
+            CircuitOpenError: while the circuit is open or a probe is in flight
+        """
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            if self.state == OPEN and now - self._opened_at >= self.open_seconds:
+                self._transition(HALF_OPEN)
+            if self.state == CLOSED:
+                return "call"
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return "probe"
+            self.counters["rejected"] += 1
+        self._rejected.inc()
+        raise CircuitOpenError(self.name, max(self._opened_at + self.open_seconds - now, 0.0))
+
+    def record(self, permit: str, success: bool, seconds: float) -> None:
+        """Report the outcome of a call made under a permit from acquire()"""
+        slow = seconds >= self.slow_call_seconds
+        with self._lock:
+            self.counters["calls"] += 1
+            self.counters["failures"] += not success
+            self.counters["slow"] += slow
+            if success:
+                self._latencies.append(seconds)
+
+            if permit == "probe":
+                self._probe_in_flight = False
+                if success and not slow:
+                    self._outcomes.clear()
+                    self._transition(CLOSED)
+                else:
+                    self._transition(OPEN)
+                return
+            if self.state != CLOSED:
+                return  # A call from before the circuit opened
+
+            self._outcomes.append((success, slow))
+            if len(self._outcomes) >= self.min_calls:
+                failures = sum(not ok for ok, _ in self._outcomes) / len(self._outcomes)
+                slow_share = sum(was_slow for _, was_slow in self._outcomes) / len(self._outcomes)
+                if failures >= self.failure_rate or slow_share >= self.slow_rate:
+                    self._transition(OPEN)
+
+    def release(self, permit: str) -> None:
+        """Give back a permit whose call was cancelled; it says nothing about the API's health"""
+        if permit == "probe":
+            with self._lock:
+                # The next caller gets to probe instead of the circuit staying half-open
+                self._probe_in_flight = False
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging a call, or None when this call should not be hedged"""
+        with self._lock:
+            if not self.hedge_enabled or self.state != CLOSED or len(self._latencies) < self.min_calls:
+                return None
+            if self.counters["hedged"] >= self.hedge_budget * max(self.counters["calls"], 1):
+                return None
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(self.hedge_percentile * len(ordered)))
+        return max(ordered[index], self.hedge_min_delay)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            ordered = sorted(self._latencies)
+            return {
+                "state": self.state,
+                "window_calls": len(self._outcomes),
+                "window_failures": sum(not ok for ok, _ in self._outcomes),
+                "p95_seconds": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 3) if ordered else None,
+                "hedging": self.hedge_enabled,
+                **self.counters,
+            }
+
+    def _transition(self, state: str) -> None:
+        if state == self.state:
+            return
+        previous, self.state = self.state, state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        self._state_gauge.set(STATE_VALUES[state])
+        CIRCUIT_TRANSITIONS.labels(self.name, state).inc()
+        log = logger.warning if state == OPEN else logger.info
+        log("LLM circuit %s: %s -> %s", self.name, previous, state)
+
+
+class CircuitBreakerRegistry:
+    """One breaker per (model, endpoint class), created on first use"""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model: str, endpoint: str) -> CircuitBreaker:
+        name = f"{endpoint}:{model}"
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(name, CircuitBreaker(name))
+        return breaker
+
+    async def call(self, model: str, endpoint: str, func: Callable[[], Any], hedge: bool = True) -> Any:
+        """
+        Run a blocking LLM call in a worker thread under the endpoint's breaker
+
+        Args:
+            model: Model the call uses
+            endpoint: Endpoint class (chat, insights, decision, ...)
+            func: The blocking call; it may run twice when hedged
+            hedge: Allow a hedged second request (not for streams)
+
+        Returns:
+            The call's result
+
+        Raises:
+            CircuitOpenError: when the circuit is open (no call is made)
+        """
+        breaker = self.get(model, endpoint)
+        permit = breaker.acquire()
+        started = time.perf_counter()
+        try:
+            delay = breaker.hedge_delay() if hedge and permit == "call" else None
+            if delay is None:
+                result = await asyncio.to_thread(func)
+            else:
+                result = await self._hedged(breaker, func, delay)
+        except Exception:
+            breaker.record(permit, False, time.perf_counter() - started)
+            raise
+        except BaseException:
+            # Cancelled, e.g. the client disconnected: a half-open probe must not hold its slot
+            breaker.release(permit)
+            raise
+        breaker.record(permit, True, time.perf_counter() - started)
+        return result
+
+    async def _hedged(self, breaker: CircuitBreaker, func: Callable[[], Any], delay: float) -> Any:
+        primary = asyncio.ensure_future(asyncio.to_thread(func))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+
+        breaker.counters["hedged"] += 1
+        hedge = asyncio.ensure_future(asyncio.to_thread(func))
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    winner = "hedge" if task is hedge else "primary"
+                    breaker.counters["hedges_won"] += winner == "hedge"
+                    HEDGED_REQUESTS.labels(breaker.name, winner).inc()
+                    # The other thread cannot be interrupted; its result is dropped when it finishes
+                    for loser in pending:
+                        loser.add_done_callback(lambda task: task.cancelled() or task.exception())
+                    return task.result()
+                error = task.exception()
+        raise error
+
+    def status(self) -> Dict[str, Any]:
+        return {name: breaker.status() for name, breaker in sorted(self._breakers.items())}
+
+
+# Global breaker registry
+circuit_breakers = CircuitBreakerRegistry()
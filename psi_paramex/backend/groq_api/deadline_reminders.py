@@ -0,0 +1,417 @@
+import asyncio
+import math
+import os
+import time
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING, Any, Dict, Hashable, List, Optional, Tuple
+
+import pytz
+
+from notification_outbox import NotificationOutbox, OutboxDrainer
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+REMINDER_TEMPLATE = "deadline_reminder.html"
+PAGE_SIZE = 1000
+
+REMINDER_COLUMNS = """
+    project_id,
+    project_name,
+    client_name,
+    deadline,
+    user_id,
+    status_id:status_id ( status_name ),
+    users!inner ( email, name )
+"""
+
+
+class TimingWheel:
+    """
+    Hierarchical timing wheel keyed by entry id.
+
+    Level 0 has one slot per tick; each higher level has slots covering a
+    whole lower wheel. An entry goes into the lowest level whose span covers
+    its delay and is moved down when its higher-level slot comes up, so
+    schedule and cancel are O(1) and advancing one tick only touches the
+    entries that are due (plus an occasional cascade), independent of how
+    many entries are scheduled.
+    """
+
+    def __init__(self, tick_seconds: float = 60.0, slot_bits: int = 6, levels: int = 4, now: Optional[float] = None):
+        self.tick_seconds = tick_seconds
+        self.slot_bits = slot_bits
+        self.mask = (1 << slot_bits) - 1
+        self.levels = levels
+        self.current = int((now if now is not None else time.time()) // tick_seconds)
+
+        self._wheels: List[List[Dict[Hashable, Tuple[int, Any]]]] = [
+            [{} for _ in range(1 << slot_bits)] for _ in range(levels)
+        ]
+        self._overflow: Dict[Hashable, Tuple[int, Any]] = {}
+        self._ready: Dict[Hashable, Tuple[int, Any]] = {}
+        # key -> (tick, level, slot); level -1 is ready, level == levels is overflow
+        self._entries: Dict[Hashable, Tuple[int, int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def schedule(self, key: Hashable, when: float, payload: Any = None) -> None:
+        """Schedule (or reschedule) key to fire at the unix timestamp when"""
+        self.cancel(key)
+        self._place(key, math.ceil(when / self.tick_seconds), payload)
+
+    def cancel(self, key: Hashable) -> bool:
+        location = self._entries.pop(key, None)
+        if location is None:
+            return False
+
+        _, level, slot = location
+        if level < 0:
+            del self._ready[key]
+        elif level == self.levels:
+            del self._overflow[key]
+        else:
+            del self._wheels[level][slot][key]
+        return True
+
+    def advance(self, now: float) -> List[Tuple[Hashable, Any]]:
+        """Move the wheel to now and return the (key, payload) entries that came due"""
+        target = int(now // self.tick_seconds)
+        if target - self.current > (1 << (2 * self.slot_bits)):
+            # Long pause (e.g. suspended host): re-placing everything is cheaper than ticking through
+            self._rebuild(target)
+
+        fired: List[Tuple[Hashable, Any]] = []
+        while self.current < target:
+            self.current += 1
+            tick = self.current
+
+            for level in range(self.levels - 1, 0, -1):
+                if tick & ((1 << (self.slot_bits * level)) - 1) == 0:
+                    self._cascade(self._wheels[level], (tick >> (self.slot_bits * level)) & self.mask)
+            if self._overflow and tick & ((1 << (self.slot_bits * self.levels)) - 1) == 0:
+                overflow, self._overflow = self._overflow, {}
+                for key, (due, payload) in overflow.items():
+                    self._place(key, due, payload)
+
+            bucket = self._wheels[0][tick & self.mask]
+            if bucket:
+                self._wheels[0][tick & self.mask] = {}
+                for key, (_, payload) in bucket.items():
+                    del self._entries[key]
+                    fired.append((key, payload))
+
+        if self._ready:
+            ready, self._ready = self._ready, {}
+            for key, (_, payload) in ready.items():
+                del self._entries[key]
+                fired.append((key, payload))
+        return fired
+
+    def _place(self, key: Hashable, due: int, payload: Any) -> None:
+        delay = due - self.current
+        if delay <= 0:
+            self._ready[key] = (due, payload)
+            self._entries[key] = (due, -1, 0)
+            return
+
+        for level in range(self.levels):
+            if delay < 1 << (self.slot_bits * (level + 1)):
+                slot = (due >> (self.slot_bits * level)) & self.mask
+                self._wheels[level][slot][key] = (due, payload)
+                self._entries[key] = (due, level, slot)
+                return
+
+        self._overflow[key] = (due, payload)
+        self._entries[key] = (due, self.levels, 0)
+
+    def _cascade(self, wheel: List[Dict[Hashable, Tuple[int, Any]]], slot: int) -> None:
+        bucket = wheel[slot]
+        if bucket:
+            wheel[slot] = {}
+            for key, (due, payload) in bucket.items():
+                self._place(key, due, payload)
+
+    def _rebuild(self, target: int) -> None:
+        entries = list(self._ready.items()) + list(self._overflow.items())
+        for wheel in self._wheels:
+            for slot in wheel:
+                entries.extend(slot.items())
+
+        self._wheels = [[{} for _ in range(self.mask + 1)] for _ in range(self.levels)]
+        self._overflow, self._ready, self._entries = {}, {}, {}
+        self.current = target
+        for key, (due, payload) in entries:
+            self._place(key, due, payload)
+
+
+class DeadlineReminderEngine:
+    """
+    Background deadline reminders for open projects.
+
+    Upcoming deadlines are loaded once with a paged batch query and each
+    (project, offset) reminder is kept in a timing wheel. Project changes are
+    applied one project at a time through upsert_project / remove_project /
+    refresh_project instead of re-reading the table. Due reminders are
+    re-checked against the database in one query per batch and written to the
+    notification outbox, whose idempotency key stops repeats across restarts.
+    """
+
+    def __init__(
+        self,
+        supabase_client: "Client" = None,
+        outbox: NotificationOutbox = None,
+        drainer: OutboxDrainer = None,
+        tick_seconds: Optional[float] = None,
+    ):
+        self.supabase = supabase_client
+        self.outbox = outbox
+        self.drainer = drainer
+        self.timezone = pytz.timezone(os.getenv("DEADLINE_REMINDER_TIMEZONE", "Asia/Jakarta"))
+        self.reminder_hour = int(os.getenv("DEADLINE_REMINDER_HOUR", "9"))
+        self.catchup_seconds = float(os.getenv("DEADLINE_REMINDER_CATCHUP_HOURS", "24")) * 3600
+        self.offsets = parse_offsets(os.getenv("DEADLINE_REMINDER_OFFSETS", "7d,1d,overdue"))
+        self.wheel = TimingWheel(tick_seconds or float(os.getenv("DEADLINE_REMINDER_TICK_SECONDS", "60")))
+
+        self._project_keys: Dict[str, List[str]] = {}
+        self._fire_times: Dict[Tuple[date, int], float] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.counters = {"loaded_projects": 0, "fired": 0, "skipped_stale": 0, "duplicates": 0, "load_ms": 0.0}
+
+    async def start(self) -> None:
+        if self._task is not None or not self.supabase:
+            return
+        projects = await asyncio.to_thread(self._fetch_open_projects)
+        started = time.perf_counter()
+        for project in projects:
+            self.upsert_project(project)
+        self.counters["loaded_projects"] = len(projects)
+        self.counters["load_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        self._task = asyncio.create_task(self._run())
+        print(f"✅ Deadline reminders scheduled: {len(self.wheel)} for {len(projects)} open projects")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def upsert_project(self, project: Dict[str, Any], now: Optional[float] = None) -> int:
+        """
+        (Re)schedule reminders for one project row
+
+        Returns:
+            Number of reminders scheduled for the project
+        """
+        project_id = str(project["project_id"])
+        self.remove_project(project_id)
+
+        deadline = _parse_date(project.get("deadline"))
+        if deadline is None or _status(project) == "Done" or not _user(project).get("email"):
+            return 0
+
+        now = now if now is not None else time.time()
+        keys = []
+        for label, days_before in self.offsets:
+            fire_at = self._fire_time(deadline, days_before)
+            if fire_at < now - self.catchup_seconds:
+                continue
+            key = f"{project_id}:{deadline.isoformat()}:{label}"
+            self.wheel.schedule(key, max(fire_at, now), {
+                "project": project,
+                "label": label,
+                "days_left": days_before,
+            })
+            keys.append(key)
+
+        if keys:
+            self._project_keys[project_id] = keys
+        return len(keys)
+
+    def remove_project(self, project_id: str) -> int:
+        keys = self._project_keys.pop(str(project_id), [])
+        for key in keys:
+            self.wheel.cancel(key)
+        return len(keys)
+
+    async def refresh_project(self, project_id: str) -> int:
+        """Re-read one project and reschedule its reminders"""
+        return await self.refresh_projects([project_id])
+
+    async def refresh_projects(self, project_ids: List[str]) -> int:
+        """Re-read many projects with one query and reschedule their reminders"""
+        if not self.supabase or not project_ids:
+            return 0
+        project_ids = list(dict.fromkeys(str(project_id) for project_id in project_ids))
+        rows = await asyncio.to_thread(self._fetch_projects_by_id, project_ids)
+        current = {str(row["project_id"]): row for row in rows}
+
+        scheduled = 0
+        for project_id in project_ids:
+            if project_id in current:
+                scheduled += self.upsert_project(current[project_id])
+            else:
+                self.remove_project(project_id)
+        return scheduled
+
+    async def fire_due(self, now: Optional[float] = None) -> int:
+        """Send every reminder that is due; returns the number written to the outbox"""
+        due = self.wheel.advance(now if now is not None else time.time())
+        if not due:
+            return 0
+
+        for key, payload in due:
+            project_id = str(payload["project"]["project_id"])
+            keys = self._project_keys.get(project_id)
+            if keys and key in keys:
+                keys.remove(key)
+                if not keys:
+                    del self._project_keys[project_id]
+
+        # Re-check due projects in one query; without a database trust the scheduled snapshot
+        if self.supabase:
+            ids = list({str(payload["project"]["project_id"]) for _, payload in due})
+            rows = await asyncio.to_thread(self._fetch_projects_by_id, ids)
+            current = {str(row["project_id"]): row for row in rows}
+        else:
+            current = {str(payload["project"]["project_id"]): payload["project"] for _, payload in due}
+
+        written = 0
+        for key, payload in due:
+            project = current.get(str(payload["project"]["project_id"]))
+            if (
+                project is None
+                or _status(project) == "Done"
+                or _parse_date(project.get("deadline")) != _parse_date(payload["project"].get("deadline"))
+            ):
+                self.counters["skipped_stale"] += 1
+                continue
+
+            _, created = self.outbox.add(f"deadline_reminder:{key}", self._message(project, payload))
+            if created:
+                written += 1
+            else:
+                self.counters["duplicates"] += 1
+
+        self.counters["fired"] += written
+        if written and self.drainer is not None:
+            self.drainer.wake()
+        return written
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "scheduled_reminders": len(self.wheel),
+            "tracked_projects": len(self._project_keys),
+            "offsets": [label for label, _ in self.offsets],
+            **self.counters,
+        }
+
+    async def _run(self) -> None:
+        tick = self.wheel.tick_seconds
+        while True:
+            await asyncio.sleep(tick - time.time() % tick)
+            try:
+                await self.fire_due()
+            except Exception as e:
+                print(f"❌ Deadline reminder tick failed: {str(e)}")
+
+    def _fire_time(self, deadline: date, days_before: int) -> float:
+        # Many projects share a deadline, so localized fire times are memoized
+        fire_at = self._fire_times.get((deadline, days_before))
+        if fire_at is None:
+            day = deadline - timedelta(days=days_before)
+            fire_at = self.timezone.localize(datetime(day.year, day.month, day.day, self.reminder_hour)).timestamp()
+            if len(self._fire_times) > 100000:
+                self._fire_times.clear()
+            self._fire_times[(deadline, days_before)] = fire_at
+        return fire_at
+
+    def _message(self, project: Dict[str, Any], payload: Dict[str, Any]) -> Dict[str, Any]:
+        user = _user(project)
+        overdue = payload["days_left"] < 0
+        subject = (
+            f"🚨 {project['project_name']} is past its deadline" if overdue
+            else f"⏰ {project['project_name']} is due in {payload['days_left']} day{'s' if payload['days_left'] != 1 else ''}"
+        )
+        return {
+            "to_email": user["email"],
+            "to_name": user.get("name") or "",
+            "subject": subject,
+            "template": REMINDER_TEMPLATE,
+            "template_data": {
+                "user_name": user.get("name") or "there",
+                "project_name": project["project_name"],
+                "client_name": project.get("client_name"),
+                "deadline": str(project["deadline"])[:10],
+                "status": _status(project),
+                "days_left": payload["days_left"],
+                "overdue": overdue,
+            },
+            "email_type": "deadline_reminder",
+        }
+
+    def _fetch_open_projects(self) -> List[Dict[str, Any]]:
+        # Overdue reminders fire the day after the deadline, so include deadlines from yesterday on
+        cutoff = (date.today() - timedelta(days=max(-min(days for _, days in self.offsets), 0) + 1)).isoformat()
+        projects = []
+        offset = 0
+        while True:
+            # Offset pages need a stable order, or rows can be skipped or repeated between pages
+            response = self.supabase.table("projects").select(REMINDER_COLUMNS).gte(
+                "deadline", cutoff
+            ).order("project_id").range(offset, offset + PAGE_SIZE - 1).execute()
+            page = response.data or []
+            projects.extend(project for project in page if _status(project) != "Done")
+            if len(page) < PAGE_SIZE:
+                return projects
+            offset += PAGE_SIZE
+
+    def _fetch_projects_by_id(self, project_ids: List[str]) -> List[Dict[str, Any]]:
+        rows = []
+        for start in range(0, len(project_ids), PAGE_SIZE):
+            response = self.supabase.table("projects").select(REMINDER_COLUMNS).in_(
+                "project_id", project_ids[start:start + PAGE_SIZE]
+            ).execute()
+            rows.extend(response.data or [])
+        return rows
+
+
+def parse_offsets(spec: str) -> List[Tuple[str, int]]:
+    """Parse "7d,1d,overdue" into (label, days before deadline); overdue is the day after"""
+    offsets = []
+    for token in (part.strip().lower() for part in spec.split(",")):
+        if not token:
+            continue
+        if token == "overdue":
+            offsets.append((token, -1))
+        elif token.endswith("d") and token[:-1].isdigit():
+            offsets.append((token, int(token[:-1])))
+        else:
+            raise ValueError(f"Invalid reminder offset '{token}' (use e.g. 7d, 1d, overdue)")
+    return offsets
+
+
+def _parse_date(value: Any) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def _status(project: Dict[str, Any]) -> str:
+    status = project.get("status") or project.get("status_id")
+    if isinstance(status, dict):
+        status = status.get("status_name")
+    return status or "Unknown"
+
+
+def _user(project: Dict[str, Any]) -> Dict[str, Any]:
+    user = project.get("users") or {}
+    return user if isinstance(user, dict) else {}
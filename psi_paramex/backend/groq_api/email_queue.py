@@ -0,0 +1,347 @@
+import asyncio
+import logging
+import os
+import random
+import smtplib
+import time
+import uuid
+from collections import OrderedDict, deque
+from email.message import EmailMessage
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+# Provider status codes worth retrying; other 4xx responses are permanent
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+logger = logging.getLogger(__name__)
+
+
+class LoggingTransport:
+    """Local stand-in that records deliveries instead of sending them"""
+
+    name = "log"
+
+    def __init__(self, max_sent: int = 1000):
+        self.sent: deque = deque(maxlen=max_sent)
+
+    async def send_batch(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        results = []
+        for message in messages:
+            message_id = f"log_{uuid.uuid4().hex[:12]}"
+            self.sent.append({"message_id": message_id, **message})
+            logger.info("Email to %s: %s (%d chars)", message['to_email'], message['subject'], len(message['html_content']))
+            results.append({"success": True, "message_id": message_id})
+        return results
+
+
+class ResendTransport:
+    """Resend HTTP API; a batch goes out in one request to /emails/batch"""
+
+    name = "resend"
+    API_URL = "https://api.resend.com/emails/batch"
+
+    def __init__(self, api_key: str, from_email: str, timeout: float = 10.0):
+        self.from_email = from_email
+        self.client = httpx.AsyncClient(timeout=timeout, headers={"Authorization": f"Bearer {api_key}"})
+
+    async def send_batch(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        payload = [
+            {"from": self.from_email, "to": [message["to_email"]], "subject": message["subject"], "html": message["html_content"]}
+            for message in messages
+        ]
+        try:
+            response = await self.client.post(self.API_URL, json=payload)
+        except httpx.HTTPError as e:
+            return [{"success": False, "error": str(e), "retryable": True}] * len(messages)
+
+        if response.status_code >= 400:
+            error = f"Resend returned {response.status_code}: {response.text[:200]}"
+            retryable = response.status_code in RETRYABLE_STATUS
+            return [{"success": False, "error": error, "retryable": retryable}] * len(messages)
+
+        ids = [item.get("id") for item in response.json().get("data", [])]
+        return [{"success": True, "message_id": message_id} for message_id in ids]
+
+
+class EdgeFunctionTransport:
+    """Supabase edge function send-email.js; one request per message, sent concurrently"""
+
+    name = "edge_function"
+
+    def __init__(self, supabase_url: str, supabase_key: str, timeout: float = 15.0):
+        self.url = f"{supabase_url.rstrip('/')}/functions/v1/send-email"
+        self.client = httpx.AsyncClient(timeout=timeout, headers={"Authorization": f"Bearer {supabase_key}"})
+
+    async def send_batch(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return await asyncio.gather(*(self._send(message) for message in messages))
+
+    async def _send(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            response = await self.client.post(self.url, json={
+                "to_email": message["to_email"],
+                "subject": message["subject"],
+                "html_content": message["html_content"],
+                "email_type": message.get("email_type", "notification"),
+            })
+        except httpx.HTTPError as e:
+            return {"success": False, "error": str(e), "retryable": True}
+
+        if response.status_code >= 400:
+            return {
+                "success": False,
+                "error": f"Edge function returned {response.status_code}: {response.text[:200]}",
+                "retryable": response.status_code in RETRYABLE_STATUS,
+            }
+        return {"success": True, "message_id": response.json().get("message_id")}
+
+
+class SmtpTransport:
+    """Plain SMTP, e.g. a local debugging server for tests; one connection per batch"""
+
+    name = "smtp"
+
+    def __init__(self, host: str, port: int, from_email: str):
+        self.host = host
+        self.port = port
+        self.from_email = from_email
+
+    async def send_batch(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self._send_batch, messages)
+
+    def _send_batch(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        try:
+            connection = smtplib.SMTP(self.host, self.port, timeout=10)
+        except OSError as e:
+            return [{"success": False, "error": str(e), "retryable": True}] * len(messages)
+
+        results = []
+        with connection:
+            for message in messages:
+                email = EmailMessage()
+                email["From"] = self.from_email
+                email["To"] = message["to_email"]
+                email["Subject"] = message["subject"]
+                email.set_content(message["html_content"], subtype="html")
+                try:
+                    connection.send_message(email)
+                    results.append({"success": True, "message_id": email.get("Message-ID") or f"smtp_{uuid.uuid4().hex[:12]}"})
+                except smtplib.SMTPException as e:
+                    results.append({"success": False, "error": str(e), "retryable": not isinstance(e, smtplib.SMTPRecipientsRefused)})
+        return results
+
+
+def create_transport(name: Optional[str] = None):
+    """Build the transport named by EMAIL_TRANSPORT (log, resend, edge_function or smtp)"""
+    name = name or os.getenv("EMAIL_TRANSPORT", "log")
+    from_email = os.getenv("FROM_EMAIL", "ParameX <notifications@paramex.dev>")
+
+    if name == "resend":
+        return ResendTransport(os.environ["RESEND_API_KEY"], from_email)
+    if name == "edge_function":
+        return EdgeFunctionTransport(os.environ["VITE_SUPABASE_URL"], os.environ["VITE_SUPABASE_ANON_KEY"])
+    if name == "smtp":
+        return SmtpTransport(os.getenv("SMTP_HOST", "localhost"), int(os.getenv("SMTP_PORT", "1025")), from_email)
+    return LoggingTransport()
+
+
+class EmailQueue:
+    """
+    Asynchronous outbound email pipeline.
+
+    Endpoints enqueue messages and get a job id back immediately. A bounded
+    pool of worker tasks pulls up to ``batch_size`` messages at a time,
+    renders their templates and hands the batch to the transport. Failed
+    retryable sends are re-queued with exponential backoff and jitter; jobs
+    that run out of attempts land in a bounded dead-letter list.
+    """
+
+    def __init__(self, templates, transport=None):
+        self.templates = templates
+        self.transport = transport
+        self.workers = int(os.getenv("EMAIL_QUEUE_WORKERS", "4"))
+        self.batch_size = int(os.getenv("EMAIL_QUEUE_BATCH_SIZE", "20"))
+        self.batch_wait = float(os.getenv("EMAIL_QUEUE_BATCH_WAIT_MS", "50")) / 1000
+        self.max_attempts = int(os.getenv("EMAIL_QUEUE_MAX_ATTEMPTS", "5"))
+        self.backoff_base = float(os.getenv("EMAIL_QUEUE_BACKOFF_SECONDS", "2"))
+        self.backoff_max = float(os.getenv("EMAIL_QUEUE_BACKOFF_MAX_SECONDS", "300"))
+        self.max_size = int(os.getenv("EMAIL_QUEUE_MAX_SIZE", "10000"))
+        self.max_jobs = int(os.getenv("EMAIL_QUEUE_JOB_HISTORY", "10000"))
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.dead_letters: deque = deque(maxlen=int(os.getenv("EMAIL_QUEUE_DEAD_LETTER_SIZE", "1000")))
+        self.in_flight = 0
+        self.delayed = 0
+        self.counters = {"enqueued": 0, "sent": 0, "retried": 0, "dead_lettered": 0, "batches": 0}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        if self.transport is None:
+            self.transport = create_transport()
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info("Email queue started (%d workers, transport: %s)", self.workers, self.transport.name)
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Give queued messages a chance to go out, then cancel the workers"""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Email queue stopped with %d messages pending", self._queue.qsize())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def enqueue(self, message: Dict[str, Any]) -> str:
+        """
+        Queue one email for delivery
+
+        Args:
+            message: to_email, subject and either html_content or template + template_data
+
+        Returns:
+            Job id to poll with get_job
+
+        Raises:
+            RuntimeError: if the queue is not running or is full
+        """
+        if not self.running:
+            raise RuntimeError("Email queue is not running")
+
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "state": "queued",
+            "attempts": 0,
+            "to_email": message["to_email"],
+            "subject": message["subject"],
+            "message_id": None,
+            "error": None,
+            "created_at": time.time(),
+            "message": message,
+        }
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise RuntimeError("Email queue is full, try again later")
+
+        self._jobs[job_id] = job
+        while len(self._jobs) > self.max_jobs:
+            self._jobs.popitem(last=False)
+        self.counters["enqueued"] += 1
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        return {key: value for key, value in job.items() if key != "message"}
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "transport": self.transport.name if self.transport else None,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "in_flight": self.in_flight,
+            "delayed_retries": self.delayed,
+            "dead_letters": len(self.dead_letters),
+            "workers": self.workers,
+            **self.counters,
+        }
+
+    async def _worker(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            self.in_flight += len(batch)
+            try:
+                await self._deliver(batch)
+            except Exception as e:
+                logger.error("Email batch failed: %s", e)
+                for job in batch:
+                    if job["state"] == "sending":
+                        self._fail(job, str(e), retryable=True)
+            finally:
+                self.in_flight -= len(batch)
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _deliver(self, batch: List[Dict[str, Any]]) -> None:
+        ready, messages = [], []
+        for job in batch:
+            job["state"] = "sending"
+            job["attempts"] += 1
+            try:
+                messages.append(self._render(job["message"]))
+                ready.append(job)
+            except Exception as e:
+                # A template error won't fix itself on retry
+                self._fail(job, f"Render failed: {str(e)}", retryable=False)
+
+        if not messages:
+            return
+
+        self.counters["batches"] += 1
+        results = await self.transport.send_batch(messages)
+        for job, result in zip(ready, results):
+            if result.get("success"):
+                job["state"] = "sent"
+                job["message_id"] = result.get("message_id")
+                job["error"] = None
+                job.pop("message", None)
+                self.counters["sent"] += 1
+            else:
+                self._fail(job, result.get("error", "Unknown error"), result.get("retryable", True))
+        # A transport that returned fewer results than messages left the rest unconfirmed
+        for job in ready[len(results):]:
+            self._fail(job, f"No delivery result ({len(results)} of {len(ready)} returned)", retryable=True)
+
+    def _render(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        if message.get("html_content") is None:
+            html_content = self.templates.render(message["template"], message.get("template_data", {}))
+            message = {**message, "html_content": html_content}
+        return message
+
+    def _fail(self, job: Dict[str, Any], error: str, retryable: bool) -> None:
+        job["error"] = error
+        if retryable and job["attempts"] < self.max_attempts:
+            job["state"] = "retrying"
+            delay = min(self.backoff_base * 2 ** (job["attempts"] - 1), self.backoff_max)
+            delay *= random.uniform(0.5, 1.0)
+            self.counters["retried"] += 1
+            self.delayed += 1
+            asyncio.get_running_loop().call_later(delay, self._requeue, job)
+            return
+
+        job["state"] = "dead_letter"
+        self.dead_letters.append({key: value for key, value in job.items() if key != "message"})
+        self.counters["dead_lettered"] += 1
+        logger.error("Email to %s moved to dead letters after %d attempts: %s", job['to_email'], job['attempts'], error)
+
+    def _requeue(self, job: Dict[str, Any]) -> None:
+        self.delayed -= 1
+        job["state"] = "queued"
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self._fail(job, "Email queue full on retry", retryable=job["attempts"] < self.max_attempts)
+
@@ -1,11 +1,56 @@
 import os
+import time
 from groq import Groq
 from typing import List, Dict, Any
 import json
-from dotenv import load_dotenv
+import logging
+from llm_cassettes import cassette_http_client, cassette_mode
+from circuit_breaker import circuit_breakers
+from metrics import LLM_REQUESTS, LLM_ROUTE_SECONDS, observe_stage, record_llm_usage, timed
+from model_router import RouteDecision, model_router
+
+logger = logging.getLogger(__name__)
+
+# Model profiles by name. Simple chat turns go to a small, fast model with a
+# short answer budget; LLM_MODEL_PROFILES (JSON) overrides fields or adds
+# profiles, e.g. {"fast": {"model": "llama-3.1-8b-instant", "max_tokens": 200}}
+MODEL_PROFILES = {
+    "fast": {
+        "model": "llama-3.1-8b-instant",
+        "max_tokens": 300,
+        "temperature": 0.6,
+        "top_p": 0.7,
+        "history_length": 2,
+    },
+    "balanced": {
+        "model": "meta-llama/llama-4-scout-17b-16e-instruct",
+        "max_tokens": 500,
+        "temperature": 0.7,
+        "top_p": 0.8,
+        "history_length": 4,
+    },
+    "quality": {
+        "model": "meta-llama/llama-4-scout-17b-16e-instruct",
+        "max_tokens": 800,
+        "temperature": 0.8,
+        "top_p": 0.9,
+        "history_length": 6,
+    },
+}
+
+
+def load_model_profiles() -> Dict[str, Dict[str, Any]]:
+    """MODEL_PROFILES with the LLM_MODEL_PROFILES overrides applied"""
+    profiles = {name: dict(settings) for name, settings in MODEL_PROFILES.items()}
+    overrides = os.getenv("LLM_MODEL_PROFILES")
+    if overrides:
+        try:
+            for name, settings in json.loads(overrides).items():
+                profiles[name] = {**profiles.get(name, MODEL_PROFILES["balanced"]), **settings}
+        except (ValueError, AttributeError) as e:
+            logger.warning("Ignoring invalid LLM_MODEL_PROFILES: %s", e)
+    return profiles
 
-# Load environment variables
-load_dotenv()
 
 class GroqLlamaClient:
     def __init__(self, performance_mode="balanced"):
@@ -17,29 +62,23 @@ class GroqLlamaClient:
         """
         self.api_key = os.getenv("GROQ_API_KEY")
         if not self.api_key:
-            raise ValueError("GROQ_API_KEY environment variable is required")
-        
-        self.client = Groq(api_key=self.api_key)
-        
-        # Configure model and parameters based on performance mode
-        if performance_mode == "fast":
-            self.model = "meta-llama/llama-4-scout-17b-16e-instruct"
-            self.max_tokens = 300
-            self.temperature = 0.6
-            self.top_p = 0.7
-            self.history_length = 2
-        elif performance_mode == "quality":
-            self.model = "meta-llama/llama-4-scout-17b-16e-instruct"
-            self.max_tokens = 800
-            self.temperature = 0.8
-            self.top_p = 0.9
-            self.history_length = 6
-        else:  # balanced (default)
-            self.model = "meta-llama/llama-4-scout-17b-16e-instruct"
-            self.max_tokens = 500
-            self.temperature = 0.7
-            self.top_p = 0.8
-            self.history_length = 4
+            if cassette_mode() != "replay":
+                raise ValueError("GROQ_API_KEY environment variable is required")
+            self.api_key = "cassette-replay"  # Replays never reach the API
+        
+        # Record/replay LLM calls at the HTTP layer when LLM_CASSETTE_MODE is set (see llm_cassettes.py)
+        self.client = Groq(api_key=self.api_key, http_client=cassette_http_client())
+        
+        # Model table; performance_mode picks the default profile and the chat
+        # model router can pick another one per request
+        self.profiles = load_model_profiles()
+        self.performance_mode = performance_mode if performance_mode in self.profiles else "balanced"
+        default = self.profiles[self.performance_mode]
+        self.model = default["model"]
+        self.max_tokens = default["max_tokens"]
+        self.temperature = default["temperature"]
+        self.top_p = default["top_p"]
+        self.history_length = default["history_length"]
         
         # System prompt for project advisory
         self.system_prompt = """You are a helpful AI Project Advisor who can help with freelance project management topics. 
@@ -88,46 +127,192 @@ IMPORTANT:
 - If you see [USER'S PROJECT DATA] in the message, you DO have access to their actual project information and should use it to provide personalized advice.
 - If you see [CURRENT TIME CONTEXT] in the message, you DO have access to real-time time information and should use it when asked about current time/date."""
 
-    async def get_project_advice(self, user_message: str, conversation_history: List[Dict] = None) -> str:
+    async def get_project_advice(self, user_message: str, conversation_history: List[Dict] = None, response_checker=None,
+                                 route: RouteDecision = None) -> str:
         """
         Get project advice from Meta Llama model
         
         Args:
             user_message: The user's question or request
             conversation_history: Previous conversation context
+            response_checker: Optional StreamingResponseChecker; when given the
+                completion is streamed through it and cancelled as soon as it
+                reports a certain violation
+            route: Optional model_router decision; its profile selects the
+                model and answer budget, and latency and tokens are recorded
+                under its tier
             
         Returns:
             AI-generated project advice
+            
+        Raises:
+            CircuitOpenError: while the chat circuit is open; API errors are
+                raised as well so the caller can answer from local data
         """
+        settings = self.profile_settings(route.profile if route else None)
+        tier = route.tier if route else None
+        
+        # Prepare messages for the API
+        messages = [{"role": "system", "content": self.system_prompt}]
+        
+        # Add conversation history if provided (reduced context for speed)
+        if conversation_history:
+            for msg in conversation_history[-settings["history_length"]:]:
+                role = "user" if msg["type"] == "user" else "assistant"
+                messages.append({"role": role, "content": msg["content"]})
+        
+        # Add current user message
+        messages.append({"role": "user", "content": user_message})
+        
+        if route is not None:
+            model_router.record(route, settings["model"])
+        started = time.perf_counter()
+        outcome = "error"
         try:
-            # Prepare messages for the API
-            messages = [{"role": "system", "content": self.system_prompt}]
-            
-            # Add conversation history if provided (reduced context for speed)
-            if conversation_history:
-                for msg in conversation_history[-self.history_length:]:
-                    role = "user" if msg["type"] == "user" else "assistant"
-                    messages.append({"role": role, "content": msg["content"]})
+            if response_checker is not None:
+                # A stream is not hedged: the checker sees one response
+                response = await circuit_breakers.call(
+                    settings["model"], "chat",
+                    lambda: self._stream_checked_completion(messages, response_checker, settings, tier), hedge=False
+                )
+            else:
+                response = await self.complete_guarded(
+                    "chat", messages, model=settings["model"], temperature=settings["temperature"],
+                    max_tokens=settings["max_tokens"], top_p=settings["top_p"], tier=tier
+                )
+            outcome = "success"
+        finally:
+            if route is not None:
+                seconds = time.perf_counter() - started
+                LLM_ROUTE_SECONDS.labels(tier).observe(seconds)
+                logger.info("Chat routed to %s tier (%s, score %d): %s in %.0f ms",
+                            tier, settings["model"], route.score, outcome, seconds * 1000,
+                            extra={"route": route.as_dict(), "model": settings["model"], "outcome": outcome,
+                                   "duration_ms": round(seconds * 1000, 1)})
+        
+        # Clean the response from any markdown formatting
+        return self._clean_markdown_formatting(response)
+
+    def profile_settings(self, profile: str = None) -> Dict[str, Any]:
+        """
+        Settings of a model profile
+        
+        Args:
+            profile: Name in the model table; None or an unknown name gives the performance mode's profile
             
-            # Add current user message
-            messages.append({"role": "user", "content": user_message})
+        Returns:
+            Dict with model, max_tokens, temperature, top_p and history_length
+        """
+        return self.profiles.get(profile) or self.profiles[self.performance_mode]
+
+    def register_profile(self, name: str, **settings) -> None:
+        """Add a model profile or change fields of an existing one (missing fields come from the default profile)"""
+        self.profiles[name] = {**self.profiles.get(name, self.profiles[self.performance_mode]), **settings}
+
+    def complete_chat(self, messages: List[Dict], model: str = None, temperature: float = None,
+                      max_tokens: int = None, top_p: float = None, tier: str = None) -> str:
+        """
+        Run a non-streaming completion, recording latency, outcome and token usage
+        
+        Args:
+            messages: Chat messages including the system prompt
+            model, temperature, max_tokens, top_p: Overrides of the performance mode settings
+            tier: Routing tier the token usage is also counted under
             
-            # Call Groq API with optimized parameters
+        Returns:
+            Raw completion text
+        """
+        model = model or self.model
+        started = time.perf_counter()
+        try:
             completion = self.client.chat.completions.create(
-                model=self.model,
+                model=model,
                 messages=messages,
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-                top_p=self.top_p,
+                temperature=self.temperature if temperature is None else temperature,
+                max_tokens=max_tokens or self.max_tokens,
+                top_p=self.top_p if top_p is None else top_p,
                 stream=False
             )
+        except Exception:
+            LLM_REQUESTS.inc(model=model, outcome="error")
+            raise
+        finally:
+            observe_stage("llm.completion", time.perf_counter() - started)
+        
+        LLM_REQUESTS.inc(model=model, outcome="success")
+        record_llm_usage(model, getattr(completion, "usage", None), tier)
+        return completion.choices[0].message.content
+
+    async def complete_guarded(self, endpoint: str, messages: List[Dict], model: str = None, **params) -> str:
+        """
+        complete_chat in a worker thread behind the circuit breaker of model and endpoint class
+        
+        Args:
+            endpoint: Endpoint class the breaker is kept for (chat, insights, decision, ...)
+            messages: Chat messages including the system prompt
+            model, params: Overrides passed on to complete_chat
             
-            # Clean response from any markdown formatting
-            response = completion.choices[0].message.content
-            return self._clean_markdown_formatting(response)
+        Returns:
+            Raw completion text
             
-        except Exception as e:
-            return f"I apologize, but I'm experiencing some technical difficulties. Please try again later. Error: {str(e)}"
+        Raises:
+            CircuitOpenError: while the circuit is open (no request is made)
+        """
+        model = model or self.model
+        return await circuit_breakers.call(model, endpoint, lambda: self.complete_chat(messages, model=model, **params))
+
+    def _stream_checked_completion(self, messages: List[Dict], response_checker,
+                                   settings: Dict[str, Any] = None, tier: str = None) -> str:
+        """
+        Stream a completion through an incremental safety checker
+        
+        Closing the stream drops the HTTP connection, which stops generation
+        (and billing) for the rest of a response that would be discarded anyway.
+        """
+        settings = settings or self.profile_settings()
+        model = settings["model"]
+        started = time.perf_counter()
+        try:
+            stream = self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=settings["temperature"],
+                max_tokens=settings["max_tokens"],
+                top_p=settings["top_p"],
+                stream=True
+            )
+        except Exception:
+            LLM_REQUESTS.inc(model=model, outcome="error")
+            observe_stage("llm.completion", time.perf_counter() - started)
+            raise
+        
+        parts = []
+        outcome = "error"
+        try:
+            for chunk in stream:
+                # Groq reports usage on the final chunk of a stream
+                x_groq = getattr(chunk, "x_groq", None)
+                if x_groq is not None:
+                    record_llm_usage(model, getattr(x_groq, "usage", None), tier)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                if not parts:
+                    observe_stage("llm.first_token", time.perf_counter() - started)
+                parts.append(delta)
+                if response_checker.feed(delta):
+                    logger.info("Streamed response aborted (%s) after %d chars",
+                                response_checker.abort_reason, response_checker.length)
+                    break
+            outcome = "aborted" if response_checker.aborted else "success"
+        finally:
+            stream.close()
+            LLM_REQUESTS.inc(model=model, outcome=outcome)
+            observe_stage("llm.completion", time.perf_counter() - started)
+        
+        return "".join(parts)
 
     async def get_project_insights(self, project_data: Dict[str, Any]) -> str:
         """
@@ -138,10 +323,13 @@ IMPORTANT:
             
         Returns:
             AI-generated project insights and recommendations
+            
+        Raises:
+            CircuitOpenError: while the insights circuit is open; API errors are
+                raised as well so the caller can fall back to the local scores
         """
-        try:
-            # Create a prompt based on project data
-            prompt = f"""
+        # Create a prompt based on project data
+        prompt = f"""
             Analyze this project and provide insights and recommendations:
             
             Project Details:
@@ -160,27 +348,15 @@ IMPORTANT:
             4. Key success factors
             5. Potential challenges and mitigation strategies
             """
-            
-            messages = [
-                {"role": "system", "content": self.system_prompt},
-                {"role": "user", "content": prompt}
-            ]
-            
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-                top_p=self.top_p,
-                stream=False
-            )
-            
-            # Clean response from any markdown formatting
-            response = completion.choices[0].message.content
-            return self._clean_markdown_formatting(response)
-            
-        except Exception as e:
-            return f"Unable to analyze project data at the moment. Error: {str(e)}"
+        
+        messages = [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+        
+        # Call Groq API and clean the response from any markdown formatting
+        response = await self.complete_guarded("insights", messages)
+        return self._clean_markdown_formatting(response)
 
     async def get_quick_advice(self, question_type: str) -> str:
         """
@@ -191,6 +367,10 @@ IMPORTANT:
             
         Returns:
             Targeted advice for the specific scenario
+            
+        Raises:
+            CircuitOpenError: while the quick advice circuit is open; API errors are
+                raised as well so the caller can answer with its local tips
         """
         quick_prompts = {
             "prioritization": "How should I prioritize multiple urgent projects as a freelancer?",
@@ -203,28 +383,16 @@ IMPORTANT:
         
         prompt = quick_prompts.get(question_type, question_type)
         
-        try:
-            messages = [
-                {"role": "system", "content": self.system_prompt},
-                {"role": "user", "content": prompt}
-            ]
-            
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-                top_p=self.top_p,
-                stream=False
-            )
-            
-            # Clean response from any markdown formatting
-            response = completion.choices[0].message.content
-            return self._clean_markdown_formatting(response)
-            
-        except Exception as e:
-            return f"Unable to provide quick advice at the moment. Error: {str(e)}"
+        messages = [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+        
+        # Call Groq API and clean the response from any markdown formatting
+        response = await self.complete_guarded("quick_advice", messages)
+        return self._clean_markdown_formatting(response)
 
+    @timed("llm.clean_markdown")
     def _clean_markdown_formatting(self, text: str) -> str:
         """
         Remove markdown formatting from AI response
@@ -268,5 +436,5 @@ IMPORTANT:
         
         return text
 
-# Singleton instance
-groq_client = GroqLlamaClient()
+# Global client instance (created lazily by the service container in services.py)
+groq_client = None
@@ -0,0 +1,242 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+MODES = ("off", "record", "replay", "auto")
+
+# Prompt parts that change on every call and would otherwise make each request unique
+DEFAULT_SCRUB = r"\[CURRENT TIME CONTEXT: [^\]]*\]|Current Date & Time: [^\n]*"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cassettes (
+    fingerprint TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    timings TEXT NOT NULL,
+    recorded_at REAL NOT NULL,
+    replays INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class CassetteMiss(httpx.TransportError):
+    """Replay mode found no recording for a request"""
+
+
+class CassetteStore:
+    """
+    Recorded LLM responses in one SQLite file.
+
+    A row holds the response status and headers, the zlib-compressed body
+    and the timing of each body chunk as [milliseconds since the request
+    started, bytes], plus the time the headers arrived. Streamed completions
+    therefore replay with their original first-token and inter-chunk
+    timing.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.executescript(SCHEMA)
+
+    def get(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, status, headers, body, timings FROM cassettes WHERE fingerprint = ?", (fingerprint,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE cassettes SET replays = replays + 1 WHERE fingerprint = ?", (fingerprint,))
+        timings = json.loads(row[4])
+        return {
+            "url": row[0],
+            "status": row[1],
+            "headers": json.loads(row[2]),
+            "body": zlib.decompress(row[3]),
+            "headers_ms": timings["headers_ms"],
+            "chunks": timings["chunks"],
+        }
+
+    def put(self, fingerprint: str, url: str, status: int, headers: List[Tuple[str, str]],
+            body: bytes, headers_ms: float, chunks: List[List[float]]) -> None:
+        timings = json.dumps({"headers_ms": round(headers_ms, 2), "chunks": chunks}, separators=(",", ":"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cassettes (fingerprint, url, status, headers, body, timings, recorded_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (fingerprint, url, status, json.dumps(headers), zlib.compress(body, 6), timings, time.time()),
+            )
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            count, replays, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(replays), 0), COALESCE(SUM(LENGTH(body)), 0) FROM cassettes"
+            ).fetchone()
+        return {"path": self.path, "recordings": count, "replays": replays, "compressed_bytes": size}
+
+
+class _RecordingStream(httpx.SyncByteStream):
+    def __init__(self, stream: httpx.SyncByteStream, started: float, on_complete):
+        self._stream = stream
+        self._started = started
+        self._on_complete = on_complete
+        self._chunks: List[List[float]] = []
+        self._body: List[bytes] = []
+        self._complete = False
+
+    def __iter__(self):
+        for chunk in self._stream:
+            self._chunks.append([round((time.perf_counter() - self._started) * 1000, 2), len(chunk)])
+            self._body.append(chunk)
+            yield chunk
+        self._complete = True
+
+    def close(self) -> None:
+        self._stream.close()
+        # A stream the caller abandoned (e.g. an aborted unsafe answer) is not a full recording
+        if self._complete:
+            self._on_complete(b"".join(self._body), self._chunks)
+
+
+class _ReplayStream(httpx.SyncByteStream):
+    def __init__(self, body: bytes, chunks: List[List[float]], started: float, time_scale: float):
+        self._body = body
+        self._chunks = chunks
+        self._started = started
+        self._time_scale = time_scale
+
+    def __iter__(self):
+        position = 0
+        for offset_ms, size in self._chunks:
+            if self._time_scale:
+                delay = offset_ms * self._time_scale / 1000 - (time.perf_counter() - self._started)
+                if delay > 0:
+                    time.sleep(delay)
+            size = int(size)
+            yield self._body[position:position + size]
+            position += size
+
+
+class CassetteTransport(httpx.BaseTransport):
+    """
+    httpx transport that records or replays LLM API calls
+
+    Requests are fingerprinted by method, path and canonical JSON body with
+    volatile prompt text (the current time context) scrubbed out. In record
+    mode successful (2xx) responses go to the store as they stream through;
+    in replay mode they are served from it, sleeping time_scale times the
+    recorded timings (0 replays instantly). auto replays what is recorded and
+    records the rest.
+    """
+
+    def __init__(self, store: CassetteStore, mode: str, time_scale: float = 1.0,
+                 scrub: str = DEFAULT_SCRUB, inner: httpx.BaseTransport = None):
+        if mode not in MODES[1:]:
+            raise ValueError(f"Cassette mode must be one of {', '.join(MODES[1:])}")
+        self.store = store
+        self.mode = mode
+        self.time_scale = time_scale
+        self.scrub = re.compile(scrub) if scrub else None
+        self.inner = inner or httpx.HTTPTransport()
+        self.counters = {"recorded": 0, "not_recorded": 0, "replayed": 0, "misses": 0}
+
+    def fingerprint(self, request: httpx.Request) -> str:
+        body = request.read()
+        try:
+            canonical = json.dumps(json.loads(body), sort_keys=True, separators=(",", ":"))
+        except ValueError:
+            canonical = body.decode("utf-8", "replace")
+        if self.scrub is not None:
+            canonical = self.scrub.sub("", canonical)
+        return hashlib.sha256(f"{request.method} {request.url.path}\n{canonical}".encode()).hexdigest()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        fingerprint = self.fingerprint(request)
+
+        if self.mode in ("replay", "auto"):
+            recording = self.store.get(fingerprint)
+            if recording is not None:
+                self.counters["replayed"] += 1
+                if self.time_scale:
+                    time.sleep(recording["headers_ms"] * self.time_scale / 1000)
+                return httpx.Response(
+                    recording["status"],
+                    headers=recording["headers"],
+                    stream=_ReplayStream(recording["body"], recording["chunks"], started, self.time_scale),
+                    request=request,
+                )
+            if self.mode == "replay":
+                self.counters["misses"] += 1
+                raise CassetteMiss(f"No recording for {request.method} {request.url.path} ({fingerprint[:12]})")
+
+        response = self.inner.handle_request(request)
+        headers_ms = (time.perf_counter() - started) * 1000
+
+        def save(body: bytes, chunks: List[List[float]]) -> None:
+            # Only successful responses are kept: a replayed 401/404/429 would fail every later run
+            if not 200 <= response.status_code < 300:
+                self.counters["not_recorded"] += 1
+                return
+            self.store.put(fingerprint, request.url.path, response.status_code,
+                           response.headers.multi_items(), body, headers_ms, chunks)
+            self.counters["recorded"] += 1
+
+        return httpx.Response(
+            response.status_code,
+            headers=response.headers,
+            stream=_RecordingStream(response.stream, started, save),
+            request=request,
+            extensions=response.extensions,
+        )
+
+    def close(self) -> None:
+        self.inner.close()
+
+    def status(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "time_scale": self.time_scale, **self.counters, **self.store.status()}
+
+
+def cassette_mode() -> str:
+    mode = os.getenv("LLM_CASSETTE_MODE", "off").lower()
+    return mode if mode in MODES else "off"
+
+
+def cassette_http_client() -> Optional[httpx.Client]:
+    """
+    httpx client for the Groq SDK when LLM_CASSETTE_MODE is record, replay or auto
+
+    Environment:
+        LLM_CASSETTE_MODE: off (default), record, replay or auto
+        LLM_CASSETTE_PATH: SQLite store (default llm_cassettes.db)
+        LLM_CASSETTE_TIME_SCALE: replay timing factor; 1 original, 0 instant (default 1)
+        LLM_CASSETTE_SCRUB: regex of prompt text ignored when matching requests
+
+    Returns:
+        Client with a CassetteTransport, or None when cassettes are off
+    """
+    mode = cassette_mode()
+    if mode == "off":
+        return None
+    transport = CassetteTransport(
+        CassetteStore(os.getenv("LLM_CASSETTE_PATH", "llm_cassettes.db")),
+        mode,
+        time_scale=float(os.getenv("LLM_CASSETTE_TIME_SCALE", "1")),
+        scrub=os.getenv("LLM_CASSETTE_SCRUB", DEFAULT_SCRUB),
+    )
+    logger.info("LLM cassettes in %s mode (%s)", mode, transport.store.path)
+    return httpx.Client(transport=transport, timeout=httpx.Timeout(60.0, connect=5.0))
@@ -0,0 +1,227 @@
+import os
+import re
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from metrics import CHAT_ANSWERS
+
+ID_DAYS = ["Senin", "Selasa", "Rabu", "Kamis", "Jumat", "Sabtu", "Minggu"]
+ID_MONTHS = ["Januari", "Februari", "Maret", "April", "Mei", "Juni", "Juli",
+             "Agustus", "September", "Oktober", "November", "Desember"]
+
+# Longer messages are rarely plain lookups; they go to the LLM
+MAX_WORDS = 12
+
+# Any of these means the user wants advice, not a fact
+ADVICE = re.compile(
+    r"\b(how (should|do|can|to)|should i|why|advice|advise|tips?|help me|plan|prioriti[sz]e|handle|manage|"
+    r"bagaimana|gimana|kenapa|mengapa|saran|sebaiknya|harus|bantu|strategi|cara|tolong)\b"
+)
+
+INDONESIAN = re.compile(
+    r"\b(berapa|jam|pukul|tanggal|hari|kapan|saya|aku|proyek|terdekat|berikutnya|selanjutnya|terlambat|telat|apa|ada|sekarang|yang)\b"
+)
+
+# The user's own projects: "my projects", "projects do I have", "project saya", "proyekku"
+OWN_PROJECTS = re.compile(
+    r"\b(i|my|me|saya|aku|ku)\b.*\b(projects?|proyek)\b|\b(projects?|proyek)(ku)?\b.*\b(i|my|me|saya|aku|ku)\b|"
+    r"\b(project|proyek)ku\b"
+)
+
+# Questions about prices, effort, durations or payments mention projects without asking
+# for a count of the user's own; they go to the LLM
+NOT_PORTFOLIO = re.compile(
+    r"\b(price\w*|cost\w*|rates?|fees?|budget|invoice\w*|pay\w*|bill\w*|hours?|days?|weeks?|months?|long|duration|"
+    r"harga|biaya|tarif|anggaran|tagihan|bayar\w*|lama|durasi|jam|hari|minggu|bulan)\b"
+)
+
+# Checked in order; the first match wins. The flag marks intents that count the user's
+# own projects, which also need OWN_PROJECTS and no NOT_PORTFOLIO wording.
+INTENT_PATTERNS = [
+    ("current_time", False, re.compile(
+        r"\b(what time is it|what s the time|what is the time|current time|time now|"
+        r"jam berapa|pukul berapa|sekarang jam)\b"
+    )),
+    ("current_date", False, re.compile(
+        r"\b(what s the date|what is the date|what date is it|today s date|what day is (it|today)|current date|"
+        r"tanggal berapa|hari apa|hari ini tanggal|tanggal hari ini)\b"
+    )),
+    ("overdue_count", True, re.compile(
+        r"\b(how many|which|any|do i have)\b.*\b(overdue|late|past due)\b|"
+        r"\b(berapa|ada|mana)\b.*\b(overdue|terlambat|telat|lewat deadline|melewati deadline)\b"
+    )),
+    ("next_deadline", False, re.compile(
+        r"\b(next|nearest|upcoming|closest) deadline\b|\bwhen is my next\b|"
+        r"\bdeadline\b.*\b(terdekat|berikutnya|selanjutnya)\b|\bkapan\b.*\bdeadline\b"
+    )),
+    ("project_count", True, re.compile(
+        r"\bhow many\b.*\bprojects?\b|\bberapa\b.*\b(project|proyek)(ku)?\b"
+    )),
+]
+
+PORTFOLIO_INTENTS = {"overdue_count", "next_deadline", "project_count"}
+
+
+@dataclass
+class Intent:
+    name: str
+    language: str  # "en" or "id"
+
+    @property
+    def needs_projects(self) -> bool:
+        return self.name in PORTFOLIO_INTENTS
+
+
+class LocalIntentRouter:
+    """
+    Answers plain factual chat questions without the LLM.
+
+    A message is classified with a handful of English and Indonesian
+    patterns (current time and date, overdue projects, next deadline,
+    project counts) after normalizing case and punctuation. Only short
+    messages without advice wording qualify, so "how many overdue
+    projects do I have and how should I handle them?" still goes to the
+    model. Answers are templated from the Jakarta clock and the user's
+    formatted projects; anything unrecognized falls through to the LLM.
+    Counting intents must name the user's own projects and must not be
+    about prices, effort or payments: "how many hours does a website
+    project take?" and "do I have a late fee clause?" are not lookups.
+    CHAT_LOCAL_INTENTS_ENABLED=false turns the fast path off.
+    """
+
+    def __init__(self):
+        self.counters: Dict[str, int] = {"messages": 0, "local_answers": 0}
+        self.configure()
+
+    def configure(self) -> None:
+        """(Re)read settings; called again once the service container has loaded .env"""
+        self.enabled = os.getenv("CHAT_LOCAL_INTENTS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+    def classify(self, message: str) -> Optional[Intent]:
+        """
+        Recognize a factual intent
+
+        Args:
+            message: Raw chat message
+
+        Returns:
+            The intent and reply language, or None when the LLM should answer
+        """
+        self.counters["messages"] += 1
+        if not self.enabled:
+            return None
+        text = " ".join(re.sub(r"[^\w\s]", " ", message.lower()).split())
+        if not text or len(text.split()) > MAX_WORDS or ADVICE.search(text):
+            return None
+        for name, own_projects, pattern in INTENT_PATTERNS:
+            if not pattern.search(text):
+                continue
+            if own_projects and (not OWN_PROJECTS.search(text) or NOT_PORTFOLIO.search(text)):
+                return None
+            return Intent(name, "id" if INDONESIAN.search(text) else "en")
+        return None
+
+    def answer(self, intent: Intent, now: datetime, projects: Optional[List[Dict[str, Any]]] = None) -> Optional[str]:
+        """
+        Build the templated reply for an intent
+
+        Args:
+            intent: Result of classify()
+            now: Current Jakarta time
+            projects: The user's projects as returned by /api/user-projects (portfolio intents)
+
+        Returns:
+            Reply text, or None when the intent needs project data that is not available
+        """
+        if intent.needs_projects and projects is None:
+            return None
+        reply = getattr(self, f"_{intent.name}")(intent.language, now, projects)
+        self.counters["local_answers"] += 1
+        self.counters[intent.name] = self.counters.get(intent.name, 0) + 1
+        CHAT_ANSWERS.labels("local", intent.name).inc()
+        return reply
+
+    def status(self) -> Dict[str, Any]:
+        messages = self.counters["messages"]
+        return {
+            "enabled": self.enabled,
+            "local_answer_rate": round(self.counters["local_answers"] / messages, 4) if messages else 0.0,
+            **self.counters,
+        }
+
+    # Templates
+
+    def _current_time(self, language: str, now: datetime, projects) -> str:
+        if language == "id":
+            return f"Sekarang pukul {now.strftime('%H.%M')} WIB, {self._format_date(now.date(), language)}."
+        return f"It's {now.strftime('%I:%M %p').lstrip('0')} in Jakarta (GMT+7), {self._format_date(now.date(), language)}."
+
+    def _current_date(self, language: str, now: datetime, projects) -> str:
+        if language == "id":
+            return f"Hari ini {self._format_date(now.date(), language)}."
+        return f"Today is {self._format_date(now.date(), language)} (Jakarta time)."
+
+    def _overdue_count(self, language: str, now: datetime, projects) -> str:
+        overdue = [(days, project) for days, project in self._dated(projects, now) if days < 0]
+        if not overdue:
+            return "Tidak ada project yang melewati deadline. Mantap!" if language == "id" else "You have no overdue projects. Nice work!"
+        unit = "hari" if language == "id" else "days"
+        names = ", ".join(f"{project['name']} ({-days} {unit})" for days, project in overdue[:5])
+        more = len(overdue) - 5
+        if language == "id":
+            return f"Ada {len(overdue)} project yang melewati deadline: {names}" + (f", dan {more} lainnya." if more > 0 else ".")
+        return (f"You have {len(overdue)} overdue project{'s' if len(overdue) != 1 else ''}: {names}"
+                + (f", and {more} more." if more > 0 else "."))
+
+    def _next_deadline(self, language: str, now: datetime, projects) -> str:
+        upcoming = [(days, project) for days, project in self._dated(projects, now) if days >= 0]
+        if not upcoming:
+            if language == "id":
+                return "Tidak ada deadline mendatang di project aktif kamu."
+            return "You have no upcoming deadlines among your active projects."
+        days, project = upcoming[0]
+        deadline = self._format_date(date.fromisoformat(project["deadline"][:10]), language)
+        if language == "id":
+            when = "hari ini" if days == 0 else "besok" if days == 1 else f"{days} hari lagi"
+            return f"Deadline terdekat kamu: {project['name']} untuk {project['client']}, {deadline} ({when})."
+        when = "today" if days == 0 else "tomorrow" if days == 1 else f"in {days} days"
+        return f"Your next deadline is {project['name']} for {project['client']} on {deadline} ({when})."
+
+    def _project_count(self, language: str, now: datetime, projects) -> str:
+        active = len(self._active(projects))
+        done = len(projects) - active
+        if language == "id":
+            return f"Kamu punya {len(projects)} project: {active} aktif dan {done} selesai."
+        return f"You have {len(projects)} project{'s' if len(projects) != 1 else ''}: {active} active and {done} done."
+
+    @classmethod
+    def _dated(cls, projects: List[Dict[str, Any]], now: datetime) -> List[Tuple[int, Dict[str, Any]]]:
+        """Active projects with a readable deadline as (days left, project), earliest first"""
+        dated = []
+        for project in cls._active(projects):
+            days = cls._days_left(project, now)
+            if days is not None:
+                dated.append((days, project))
+        return sorted(dated, key=lambda item: item[0])
+
+    @staticmethod
+    def _active(projects: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [project for project in projects if project["status"] != "Done"]
+
+    @staticmethod
+    def _days_left(project: Dict[str, Any], now: datetime) -> Optional[int]:
+        try:
+            return (date.fromisoformat(str(project["deadline"])[:10]) - now.date()).days
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _format_date(day: date, language: str) -> str:
+        if language == "id":
+            return f"{ID_DAYS[day.weekday()]}, {day.day} {ID_MONTHS[day.month - 1]} {day.year}"
+        return day.strftime("%A, %B ") + f"{day.day}, {day.year}"
+
+
+# Global router instance
+local_intent_router = LocalIntentRouter()
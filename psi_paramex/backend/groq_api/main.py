@@ -1,102 +1,38 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 import uvicorn
 
 from scoring_logic import project_scorer
-from ux_safety_check import ux_safety_checker
-from supabase_email_service import SupabaseEmailService, EmailData
-from notification_scheduler import NotificationScheduler
-import os
-from supabase import create_client, Client
-from dotenv import load_dotenv
+from scoring_config import scoring_config_store
+from schedule_optimizer import schedule_optimizer
+from rate_limiter import rate_limit, rate_limiter
+from notification_scheduler import BULK_MAX_ITEMS
+from services import services
+from metrics import metrics, timed, observe_stage, request_timings, server_timing_header, CHAT_ANSWERS, FALLBACKS, HTTP_REQUEST_SECONDS
+from request_profiler import request_profiler
+from circuit_breaker import CircuitOpenError, circuit_breakers
+from local_intents import local_intent_router
+from model_router import model_router
+from structured_logging import request_id_var
 from datetime import datetime
+import logging
 import pytz
-from groq_client import GroqLlamaClient
+import time
+import uuid
 
-# Load environment variables from parent directory (psi_paramex/.env)
+# Add parent directory to path for imports
 import sys
 from pathlib import Path
-
-# Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
-# Try multiple locations for .env file
-env_paths = [
-    "../../.env",  # Original path
-    "../../../.env",  # One level up
-    ".env",  # Current directory
-]
-
-env_loaded = False
-for env_path in env_paths:
-    if Path(env_path).exists():
-        load_dotenv(dotenv_path=env_path)
-        print(f"✅ Environment variables loaded from: {env_path}")
-        env_loaded = True
-        break
-
-if not env_loaded:
-    print("⚠️ Warning: .env file not found in any expected location")
-    print("   Please make sure .env file exists with required variables:")
-    print("   - GROQ_API_KEY")
-    print("   - VITE_SUPABASE_URL")
-    print("   - VITE_SUPABASE_ANON_KEY")
-
-# Initialize FastAPI app
-app = FastAPI(title="ParameX PSI - AI Project Advisor API", version="1.0.0")
-
-# Initialize Supabase client
-supabase_url = os.getenv("VITE_SUPABASE_URL")
-supabase_key = os.getenv("VITE_SUPABASE_ANON_KEY")
-groq_api_key = os.getenv("GROQ_API_KEY")
-
-print(f"🔍 Environment variables status:")
-print(f"   GROQ_API_KEY: {'✅ Set' if groq_api_key else '❌ Missing'}")
-print(f"   VITE_SUPABASE_URL: {'✅ Set' if supabase_url else '❌ Missing'}")
-print(f"   VITE_SUPABASE_ANON_KEY: {'✅ Set' if supabase_key else '❌ Missing'}")
-
-supabase: Client = None
-notification_scheduler = None
-email_service = None
-
-try:
-    if supabase_url and supabase_key:
-        supabase = create_client(supabase_url, supabase_key)
-        print("✅ Supabase client initialized successfully")
-        
-        # Test database connection
-        try:
-            test_response = supabase.table("projects").select("count", count="exact").limit(1).execute()
-            print(f"✅ Database connection test successful")
-        except Exception as db_error:
-            print(f"⚠️ Database connection test failed: {db_error}")
-        
-        # Initialize email service
-        email_service = SupabaseEmailService(supabase)
-        print("✅ Email service initialized successfully")
-        
-        # Initialize notification scheduler
-        notification_scheduler = NotificationScheduler(supabase, email_service)
-        print("✅ Notification scheduler initialized successfully")
-    else:
-        print("❌ Supabase credentials missing - project context features will be disabled")
-except Exception as e:
-    print(f"⚠️ Warning: Could not initialize Supabase client: {e}")
-    print("Project context features will be disabled")
-
-# Initialize optimized Groq client with balanced performance
-groq_client = None
-try:
-    if groq_api_key:
-        groq_client = GroqLlamaClient(performance_mode="balanced")  # Better for project context analysis
-        print("✅ Groq AI client initialized successfully")
-    else:
-        print("❌ GROQ_API_KEY missing - AI features will be disabled")
-except Exception as e:
-    print(f"⚠️ Warning: Could not initialize Groq client: {e}")
-    print("AI features will be disabled")
+logger = logging.getLogger(__name__)
+
+# Initialize FastAPI app; .env loading and the Supabase/Groq clients are deferred to the
+# service container, which builds each of them once on first use
+app = FastAPI(title="ParameX PSI - AI Project Advisor API", version="1.0.0", lifespan=services.lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -111,8 +47,57 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Request-ID", "X-Profile-Id"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template, not the raw path, to keep the series count bounded
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=status
+        )
+
+@app.middleware("http")
+async def bind_request_id(request: Request, call_next):
+    # Reuse the caller's id (e.g. from the frontend or a proxy) so logs can be joined across services
+    request_id = request.headers.get("x-request-id", "")[:64] or uuid.uuid4().hex
+    token = request_id_var.set(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+@app.middleware("http")
+async def add_server_timing(request: Request, call_next):
+    # Stage timers add into this dict; to_thread calls share it through the copied context
+    started = time.perf_counter()
+    timings = {}
+    token = request_timings.set(timings)
+    try:
+        reason = request_profiler.wants_profile(request.headers)
+        if reason:
+            response = await request_profiler.profile(request, call_next, reason)
+        else:
+            response = await call_next(request)
+    finally:
+        request_timings.reset(token)
+    if metrics.server_timing:
+        response.headers["Server-Timing"] = server_timing_header(timings, time.perf_counter() - started)
+    return response
+
 # Pydantic models for request/response
 class ChatMessage(BaseModel):
     type: str
@@ -123,6 +108,7 @@ class ChatRequest(BaseModel):
     message: str
     conversation_history: Optional[List[ChatMessage]] = []
     user_id: Optional[str] = None  # Add user_id to get project context
+    conversation_id: Optional[str] = None  # Enables incremental conversation moderation
 
 class ChatResponse(BaseModel):
     response: str
@@ -135,6 +121,41 @@ class ProjectAnalysisRequest(BaseModel):
     budget: Optional[str] = None
     client_type: Optional[str] = None
     complexity: Optional[str] = None
+    user_id: Optional[str] = None  # Enables per-user pricing calibration
+    difficulty_level: Optional[str] = None
+    project_type: Optional[str] = None
+    start_date: Optional[str] = None
+    deadline: Optional[str] = None
+    similar_projects_limit: Optional[int] = 3
+
+class SimulationRequest(ProjectAnalysisRequest):
+    samples: Optional[int] = None
+    seed: Optional[int] = None
+    hours_per_day: Optional[float] = None
+
+class ScheduleRequest(BaseModel):
+    user_id: Optional[str] = None  # Active projects are loaded from the database when projects is omitted
+    projects: Optional[List[Dict[str, Any]]] = None
+    daily_capacity_hours: Optional[float] = None
+    new_project: Optional[Dict[str, Any]] = None  # Candidate project: deadline, difficulty or effort_hours
+
+class SimilarProjectUpsertRequest(BaseModel):
+    user_id: str
+    project: Dict[str, Any]
+
+class CalibrationRefitRequest(BaseModel):
+    user_id: Optional[str] = None  # Refit a single user; all users when omitted
+
+class ProjectCompletedRequest(BaseModel):
+    project_id: str
+
+class BulkModerationRequest(BaseModel):
+    input_path: str  # NDJSON transcript, relative to MODERATION_DATA_DIR
+    output_path: Optional[str] = None
+    workers: Optional[int] = None
+
+class ReminderRefreshRequest(BaseModel):
+    project_id: str
 
 class QuickAdviceRequest(BaseModel):
     question_type: str
@@ -149,11 +170,22 @@ class ProjectUpdateRequest(BaseModel):
     old_status: str
     new_status: str
     update_message: Optional[str] = ""
+    request_id: Optional[str] = None  # Client id of this change; retries with the same id send one email
 
 class WelcomeEmailRequest(BaseModel):
     user_email: str
     user_name: Optional[str] = "New User"
 
+class BulkProjectUpdateRequest(BaseModel):
+    updates: List[ProjectUpdateRequest]
+
+class BulkWelcomeRecipient(BaseModel):
+    user_email: str
+    user_name: Optional[str] = None  # Looked up from the users table when missing
+
+class BulkWelcomeEmailRequest(BaseModel):
+    users: List[BulkWelcomeRecipient]
+
 # Health check endpoint
 @app.get("/")
 async def root():
@@ -163,6 +195,55 @@ async def root():
 async def health_check():
     return {"status": "healthy", "service": "AI Project Advisor API"}
 
+@app.get("/live")
+async def liveness_probe():
+    """
+    Liveness probe: the process is up and the event loop answers
+    """
+    return {"status": "alive", **services.liveness()}
+
+@app.get("/ready")
+async def readiness_probe():
+    """
+    Readiness probe: startup finished and configured dependencies respond
+    """
+    readiness = await services.readiness()
+    if not readiness["ready"]:
+        return JSONResponse(status_code=503, content={"status": "not_ready", **readiness})
+    return {"status": "ready", **readiness}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Stage latencies, request latencies, LLM usage, cache and fallback counters (Prometheus text format)
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/profiles")
+async def list_request_profiles(request: Request):
+    """
+    Stored request profiles (newest first); enable with PROFILER_ENABLED=true.
+    When PROFILER_TOKEN is set the X-Profile-Token header must match it.
+    """
+    if not request_profiler.enabled:
+        raise HTTPException(status_code=404, detail="Request profiler is disabled")
+    if not request_profiler.authorized(request.headers):
+        raise HTTPException(status_code=403, detail="Invalid or missing X-Profile-Token")
+    return {"profiler": request_profiler.status(), "profiles": request_profiler.list_profiles(), "status": "success"}
+
+@app.get("/api/profiles/{name}")
+async def download_request_profile(name: str, request: Request):
+    """
+    Download a stored profile (.html from pyinstrument, .prof for pstats/snakeviz);
+    needs the X-Profile-Token header when PROFILER_TOKEN is set
+    """
+    if request_profiler.enabled and not request_profiler.authorized(request.headers):
+        raise HTTPException(status_code=403, detail="Invalid or missing X-Profile-Token")
+    path = request_profiler.profile_path(name) if request_profiler.enabled else None
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, filename=name)
+
 # New endpoint to get user projects for AI context
 @app.get("/api/user-projects/{user_id}")
 async def get_user_projects(user_id: str):
@@ -170,23 +251,24 @@ async def get_user_projects(user_id: str):
     Get user projects for AI context
     """
     try:
-        if not supabase:
+        if not services.supabase:
             raise HTTPException(status_code=500, detail="Database connection not configured")
         
         # Get projects with related data
-        response = supabase.table("projects").select(
-            """
-            project_id,
-            project_name,
-            client_name,
-            start_date,
-            deadline,
-            payment_amount,
-            difficulty_level,
-            type_id:type_id ( type_name ),
-            status_id:status_id ( status_name )
-            """
-        ).eq("user_id", user_id).order("created_at", desc=True).execute()
+        with timed("supabase.user_projects"):
+            response = services.supabase.table("projects").select(
+                """
+                project_id,
+                project_name,
+                client_name,
+                start_date,
+                deadline,
+                payment_amount,
+                difficulty_level,
+                type_id:type_id ( type_name ),
+                status_id:status_id ( status_name )
+                """
+            ).eq("user_id", user_id).order("created_at", desc=True).execute()
         
         if response.data:
             # Format projects for AI context
@@ -204,6 +286,9 @@ async def get_user_projects(user_id: str):
                     "status": project["status_id"]["status_name"] if project["status_id"] else "Unknown"
                 })
             
+            # Rebuild the similar-project index only when it is missing or the projects changed
+            services.similarity_index.sync(user_id, formatted_projects)
+            
             return {"projects": formatted_projects, "status": "success"}
         else:
             return {"projects": [], "status": "success"}
@@ -212,7 +297,7 @@ async def get_user_projects(user_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to fetch projects: {str(e)}")
 
 # Chat endpoint for project advice
-@app.post("/api/chat", response_model=ChatResponse)
+@app.post("/api/chat", response_model=ChatResponse, dependencies=[Depends(rate_limit("llm"))])
 async def chat_with_advisor(request: ChatRequest):
     """
     Chat with AI Project Advisor using Meta Llama model with safety checks and project context
@@ -221,9 +306,19 @@ async def chat_with_advisor(request: ChatRequest):
         if not request.message.strip():
             raise HTTPException(status_code=400, detail="Message cannot be empty")
         
+        # Conversation-level moderation, updated incrementally per message
+        if request.conversation_id:
+            with timed("chat.conversation_moderation"):
+                moderation = services.ux_safety_checker.observe_conversation_message(
+                    request.conversation_id, {"type": "user", "content": request.message}
+                )
+            if not moderation['is_safe']:
+                logger.warning("Conversation %s flagged: %s", request.conversation_id, ", ".join(moderation['issues']))
+        
         # Safety check for user input
-        safety_check = ux_safety_checker.check_user_input(request.message)
+        safety_check = services.ux_safety_checker.check_user_input(request.message)
         if not safety_check['is_safe']:
+            FALLBACKS.inc(endpoint="chat", reason="unsafe_input")
             return ChatResponse(
                 response=f"I understand you're looking for help, but I can only assist with project management topics. {safety_check['suggestion']}"
             )
@@ -233,7 +328,28 @@ async def chat_with_advisor(request: ChatRequest):
         current_datetime = datetime.now(jakarta_tz)
         current_date_context = f"\n\nCurrent Date & Time: {current_datetime.strftime('%A, %B %d, %Y at %I:%M %p')} (Jakarta Time)\n"
         
+        # Plain factual questions (time, date, deadlines, project counts) are answered
+        # from templates; anything else, or missing project data, goes to the LLM
+        with timed("chat.local_intent"):
+            intent = local_intent_router.classify(request.message)
+        if intent is not None:
+            projects = None
+            if intent.needs_projects and request.user_id and services.supabase:
+                try:
+                    projects = (await get_user_projects(request.user_id)).get("projects", [])
+                except Exception as e:
+                    logger.warning("Local intent %s skipped, no project data: %s", intent.name, e)
+            local_answer = local_intent_router.answer(intent, current_datetime, projects)
+            if local_answer is not None:
+                logger.debug("Chat answered by local intent %s (%s)", intent.name, intent.language)
+                if request.conversation_id:
+                    services.ux_safety_checker.observe_conversation_message(
+                        request.conversation_id, {"type": "assistant", "content": local_answer}
+                    )
+                return ChatResponse(response=local_answer)
+        
         # Enhanced project context with better keyword detection
+        stage_started = time.perf_counter()
         project_context = ""
         project_keywords = [
             "project", "deadline", "workload", "client", "status", "timeline", 
@@ -245,7 +361,7 @@ async def chat_with_advisor(request: ChatRequest):
         
         # Check if user is asking about projects (more flexible detection)
         should_fetch_projects = (
-            request.user_id and supabase and 
+            request.user_id and services.supabase and 
             (any(keyword in request.message.lower() for keyword in project_keywords) or
              len(request.message.split()) <= 5 or  # Short questions often about status
              "?" in request.message or  # Questions often need project context
@@ -253,24 +369,25 @@ async def chat_with_advisor(request: ChatRequest):
         )
         
         if should_fetch_projects:
-            matched_keywords = [kw for kw in project_keywords if kw in request.message.lower()]
-            print(f"🔍 Project context triggered - Keywords: {matched_keywords if matched_keywords else 'short question/question mark'}")
+            if logger.isEnabledFor(logging.DEBUG):
+                matched_keywords = tuple(kw for kw in project_keywords if kw in request.message.lower())
+                logger.debug("Project context triggered for user %s - keywords: %s",
+                             request.user_id, matched_keywords or "short question/question mark")
             
             try:
-                print(f"🔍 Getting project context for user: {request.user_id}")
                 projects_response = await get_user_projects(request.user_id)
                 
                 if projects_response.get("projects") and len(projects_response["projects"]) > 0:
                     projects = projects_response["projects"]
-                    print(f"📊 Found {len(projects)} projects for user")
                     
                     # Enhanced context with key project details - FIXED STATUS LOGIC
                     active_projects = [p for p in projects if p['status'] != 'Done']  # Only exclude "Done" projects
                     urgent_projects = []
                     overdue_projects = []
                     
-                    print(f"🔍 Active projects: {len(active_projects)} (excluding Done status)")
-                    print(f"🔍 Project statuses: {[p['status'] for p in projects]}")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Found %d projects, %d active; statuses: %s",
+                                     len(projects), len(active_projects), tuple(p['status'] for p in projects))
                     
                     # Calculate urgency and overdue status - ONLY FOR ACTIVE PROJECTS
                     for project in active_projects:
@@ -281,13 +398,14 @@ async def chat_with_advisor(request: ChatRequest):
                                 
                                 if days_until < 0:
                                     overdue_projects.append(project['name'])
-                                    print(f"📍 Overdue project: {project['name']} (deadline: {project['deadline']}, days past: {abs(days_until)})")
+                                    logger.debug("Overdue project: %s (deadline: %s, days past: %d)",
+                                                 project['name'], project['deadline'], -days_until)
                                 elif days_until <= 7:
                                     urgent_projects.append(project['name'])
-                                    print(f"⚠️ Urgent project: {project['name']} (deadline: {project['deadline']}, days left: {days_until})")
+                                    logger.debug("Urgent project: %s (deadline: %s, days left: %d)",
+                                                 project['name'], project['deadline'], days_until)
                         except Exception as e:
-                            print(f"⚠️ Date parsing error for project {project['name']}: {e}")
-                            pass
+                            logger.warning("Date parsing error for project %s: %s", project['name'], e)
                     
                     # Build informative context
                     context_parts = [
@@ -300,28 +418,38 @@ async def chat_with_advisor(request: ChatRequest):
                     if overdue_projects:
                         context_parts.append(f"Overdue: {', '.join(overdue_projects[:3])}")
                     
+                    # Suggested work order from the capacity-aware schedule
+                    if active_projects:
+                        schedule_summary = schedule_optimizer.optimize(active_projects)
+                        suggested_order = [entry['name'] for entry in schedule_summary['schedule'][:3]]
+                        context_parts.append(f"Suggested work order: {' → '.join(suggested_order)}")
+                        if schedule_summary['summary']['late_projects']:
+                            context_parts.append(
+                                f"Projected late at current capacity: {', '.join(schedule_summary['summary']['late_project_names'][:3])}"
+                            )
+                    
                     # Add project types if diverse
                     project_types = list(set([p['type'] for p in projects if p['type'] != 'Unknown']))
                     if len(project_types) > 1:
                         context_parts.append(f"Types: {', '.join(project_types[:3])}")
                     
                     project_context = ". ".join(context_parts) + "."
-                    print(f"✅ Project context built: {project_context}")
+                    logger.debug("Project context built: %s", project_context)
                     
                 else:
                     project_context = "User has no projects in the system yet."
-                    print(f"📭 No projects found for user")
+                    logger.debug("No projects found for user %s", request.user_id)
                     
             except Exception as e:
-                print(f"❌ Failed to get project context: {str(e)}")
+                logger.error("Failed to get project context: %s", e)
                 project_context = ""
         else:
-            print(f"⏭️ Skipping project context - No relevant keywords or conditions met")
-            print(f"   Message: '{request.message}'")
-            print(f"   User ID: {request.user_id}")
-            print(f"   Supabase: {supabase is not None}")
+            logger.debug("Skipping project context (user: %s, supabase: %s)", request.user_id, services.supabase is not None)
+        
+        observe_stage("chat.project_context", time.perf_counter() - stage_started)
         
         # Convert conversation history to the format expected by groq_client
+        stage_started = time.perf_counter()
         history = []
         if request.conversation_history:
             for msg in request.conversation_history:
@@ -342,6 +470,7 @@ async def chat_with_advisor(request: ChatRequest):
             enhanced_message += f"\n\n[Project Status: {project_context.strip()}]"
             
         # ALWAYS include full project data if available for better AI understanding
+        attached_projects = 0
         if should_fetch_projects:
             try:
                 projects_response = await get_user_projects(request.user_id)
@@ -357,49 +486,69 @@ async def chat_with_advisor(request: ChatRequest):
                         project_details += f"   Difficulty: {project['difficulty']}\n\n"
                     
                     enhanced_message += project_details
-                    print(f"✅ Added detailed project data to AI prompt ({len(projects)} projects)")
+                    attached_projects = min(len(projects), 10)
+                    logger.debug("Added detailed project data to AI prompt (%d projects)", len(projects))
                 else:
                     enhanced_message += "\n\n[USER'S PROJECT DATA]: No projects found in database."
-                    print(f"📭 No projects found for user context")
             except Exception as e:
-                print(f"❌ Failed to get detailed project data: {str(e)}")
+                logger.error("Failed to get detailed project data: %s", e)
                 enhanced_message += f"\n\n[PROJECT DATA ERROR]: Could not retrieve project details from database."
         
-        print(f"🤖 Sending message to AI: {request.message[:100]}...")
-        print(f"🔍 Enhanced message length: {len(enhanced_message)} characters")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Sending message to AI (%d chars, %d with context, project data: %s)",
+                         len(request.message), len(enhanced_message), "[USER'S PROJECT DATA]" in enhanced_message)
+        
+        observe_stage("chat.prompt_assembly", time.perf_counter() - stage_started)
         
-        # Debug: Show what's being sent to AI
-        if "[USER'S PROJECT DATA]" in enhanced_message:
-            print(f"✅ Project data included in AI prompt")
-        else:
-            print(f"❌ No project data in AI prompt")
-            
         # Check if Groq client is available
-        if not groq_client:
+        if not services.groq_client:
+            FALLBACKS.inc(endpoint="chat", reason="llm_unavailable")
+            CHAT_ANSWERS.inc(source="fallback", intent="none")
             return ChatResponse(
                 response="I apologize, but the AI service is currently unavailable. Please make sure the GROQ_API_KEY is configured correctly and the backend server is running properly."
             )
         
-        # Get AI response from Groq with enhanced project context
-        ai_response = await groq_client.get_project_advice(
-            user_message=enhanced_message,
-            conversation_history=history
-        )
+        # Simple turns go to the fast model profile, complex ones to the quality profile
+        route = model_router.score(request.message, history_length=len(history), project_count=attached_projects)
         
-        # Safety check for AI response
-        response_safety = ux_safety_checker.check_ai_response(ai_response)
-        if not response_safety['is_safe']:
-            ai_response = "I apologize, but I need to provide a more appropriate response. Let me help you with your project management question in a different way. Could you please rephrase your question focusing on specific project challenges you're facing?"
+        # Get AI response from Groq with enhanced project context; the response is
+        # checked while it streams so an unsafe or runaway answer is cut off early
+        response_checker = services.ux_safety_checker.streaming_response_checker()
+        try:
+            ai_response = await services.groq_client.get_project_advice(
+                user_message=enhanced_message,
+                conversation_history=history,
+                response_checker=response_checker,
+                route=route
+            )
+        except Exception as llm_error:
+            # Open circuit or failed call: answer from the project context built above
+            logger.warning("Chat answered locally: %s", llm_error)
+            FALLBACKS.inc(endpoint="chat", reason="circuit_open" if isinstance(llm_error, CircuitOpenError) else "llm_error")
+            ai_response = generate_chat_fallback(project_context)
+            CHAT_ANSWERS.inc(source="fallback", intent="none")
+        else:
+            # Safety check for AI response
+            response_safety = services.ux_safety_checker.check_ai_response(ai_response)
+            if response_checker.aborted or not response_safety['is_safe']:
+                FALLBACKS.inc(endpoint="chat", reason="aborted_stream" if response_checker.aborted else "unsafe_response")
+                ai_response = "I apologize, but I need to provide a more appropriate response. Let me help you with your project management question in a different way. Could you please rephrase your question focusing on specific project challenges you're facing?"
+            CHAT_ANSWERS.inc(source="llm", intent="none")
+        
+        if request.conversation_id:
+            services.ux_safety_checker.observe_conversation_message(
+                request.conversation_id, {"type": "assistant", "content": ai_response}
+            )
         
-        print(f"✅ AI response generated successfully")
+        logger.debug("AI response generated (%d chars)", len(ai_response))
         return ChatResponse(response=ai_response)
         
     except Exception as e:
-        print(f"❌ Error in chat endpoint: {str(e)}")
+        logger.exception("Error in chat endpoint: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to get AI response: {str(e)}")
 
 # Project analysis endpoint
-@app.post("/api/analyze-project")
+@app.post("/api/analyze-project", dependencies=[Depends(rate_limit("llm"))])
 async def analyze_project(request: ProjectAnalysisRequest):
     """
     Analyze project data and get AI insights with scoring
@@ -407,26 +556,56 @@ async def analyze_project(request: ProjectAnalysisRequest):
     try:
         project_data = request.dict()
         
+        # Pin one scoring config snapshot so a hot reload mid-request can't mix versions
+        scoring_config = project_scorer.config
+        
         # Get complexity analysis
-        complexity_analysis = project_scorer.analyze_project_complexity(project_data)
+        complexity_analysis = project_scorer.analyze_project_complexity(project_data, scoring_config)
         
         # Get risk assessment
-        risk_assessment = project_scorer.assess_project_risks(project_data)
+        risk_assessment = project_scorer.assess_project_risks(project_data, scoring_config)
+        
+        # Use the user's calibrated pricing model when their history allows it
+        calibration = None
+        if request.user_id and services.pricing_calibrator:
+            try:
+                calibration = services.pricing_calibrator.predict(request.user_id, project_data)
+            except Exception as e:
+                logger.warning("Pricing calibration unavailable for user %s: %s", request.user_id, e)
         
         # Get pricing recommendations
         pricing_recommendations = project_scorer.generate_pricing_recommendation(
-            project_data, complexity_analysis['overall_complexity']
+            project_data, complexity_analysis['overall_complexity'], scoring_config, calibration
         )
         
-        # Get AI analysis from Groq
-        ai_analysis = await groq_client.get_project_insights(project_data)
+        # How the user's own most similar past projects actually went
+        similar_projects = []
+        if request.user_id and request.similar_projects_limit:
+            try:
+                similar_projects = services.similarity_index.find_similar(
+                    request.user_id, project_data, k=request.similar_projects_limit
+                )
+            except Exception as e:
+                logger.warning("Similar project lookup failed for user %s: %s", request.user_id, e)
+        
+        # Get AI analysis from Groq, or summarize the local scores when it is unavailable
+        insights_source = "ai"
+        try:
+            ai_analysis = await services.groq_client.get_project_insights(project_data)
+        except Exception as llm_error:
+            logger.warning("Project insights answered locally: %s", llm_error)
+            FALLBACKS.inc(endpoint="analyze-project", reason="circuit_open" if isinstance(llm_error, CircuitOpenError) else "llm_error")
+            ai_analysis = generate_local_insights(complexity_analysis, risk_assessment, pricing_recommendations)
+            insights_source = "fallback"
         
         # Combine all analyses
         comprehensive_analysis = {
             "ai_insights": ai_analysis,
+            "insights_source": insights_source,
             "complexity_analysis": complexity_analysis,
             "risk_assessment": risk_assessment,
             "pricing_recommendations": pricing_recommendations,
+            "similar_projects": similar_projects,
             "summary": {
                 "complexity_level": complexity_analysis['complexity_level'],
                 "risk_level": risk_assessment['risk_level'],
@@ -435,24 +614,287 @@ async def analyze_project(request: ProjectAnalysisRequest):
             }
         }
         
-        return {"analysis": comprehensive_analysis, "status": "success"}
+        return {"analysis": comprehensive_analysis, "config_version": scoring_config.version, "status": "success"}
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to analyze project: {str(e)}")
 
-# Quick advice endpoint
-@app.post("/api/quick-advice")
-async def get_quick_advice(request: QuickAdviceRequest):
+def generate_chat_fallback(project_context: str) -> str:
     """
-    Get quick advice for common project management scenarios
+    Answer a chat message from the locally built project context when the AI is unavailable
+    """
+    reply = "The AI advisor is busy right now, so here is a quick look based on your project data. "
+    if project_context.strip():
+        reply += project_context.strip() + " "
+    reply += "Please ask again in a minute for detailed advice."
+    return reply
+
+def generate_local_insights(complexity_analysis: dict, risk_assessment: dict, pricing_recommendations: dict) -> str:
+    """
+    Plain-text insights from the local scores, used when the AI analysis is unavailable
+    """
+    lines = [
+        f"Complexity: {complexity_analysis['complexity_level']} ({complexity_analysis['overall_complexity']}/10).",
+        f"Risk level: {risk_assessment['risk_level']} with {risk_assessment['total_risks']} identified risk(s)."
+    ]
+    for risk in risk_assessment['risks'][:3]:
+        lines.append(f"{risk['description']}. Mitigation: {risk['mitigation']}.")
+    lines.extend(recommendation + "." for recommendation in complexity_analysis['recommendations'][:3])
+    lines.append(
+        f"Suggested pricing: {pricing_recommendations['pricing_strategy']}, about "
+        f"{pricing_recommendations['estimated_hours']} hours at {pricing_recommendations['hourly_rate_recommendation']:,} per hour."
+    )
+    return "\n".join(lines)
+
+# Canned tips for /api/quick-advice when the AI is unavailable
+LOCAL_QUICK_ADVICE = {
+    "prioritization": "Rank projects by deadline and by what is at stake for each client, finish the ones that block others first, and tell clients early when a date has to move.",
+    "estimation": "Break the work into tasks of a day or less, estimate each one, add 20-30% for reviews and surprises, and compare with how long similar past projects really took.",
+    "communication": "Agree on a fixed update rhythm, send short written summaries after calls, and raise risks as soon as you see them instead of at the deadline.",
+    "scope_creep": "Write down the agreed scope, log every new request, and answer each one with its cost and timeline impact before starting it.",
+    "deadlines": "Check the deadline against your estimate right away, propose a reduced first delivery or a later date with reasons, and confirm the agreement in writing.",
+    "pricing": "Start from your target hourly rate times the estimated hours plus a buffer, check it against the value to the client, and ask for a deposit on larger projects.",
+}
+
+def generate_local_quick_advice(question_type: str) -> str:
+    """
+    Quick advice from canned tips, used when the AI is unavailable
+    """
+    tip = LOCAL_QUICK_ADVICE.get(question_type)
+    if tip is None:
+        return "The AI advisor is busy right now. Please ask again in a minute."
+    return f"The AI advisor is busy right now, so here is a quick tip: {tip}"
+
+# Monte Carlo risk and pricing simulation endpoint
+@app.post("/api/simulate-project", dependencies=[Depends(rate_limit("default"))])
+def simulate_project(request: SimulationRequest):
+    """
+    Simulate cost and finish-date spread for a project (runs in the threadpool)
+    """
+    project_fields = set(ProjectAnalysisRequest.__fields__)
+    project_data = request.dict(include=project_fields, exclude_none=True)
+    
+    try:
+        simulation = services.risk_simulator.simulate(
+            project_data,
+            samples=request.samples,
+            seed=request.seed,
+            start_date=request.start_date,
+            deadline=request.deadline,
+            hours_per_day=request.hours_per_day
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to simulate project: {str(e)}")
+    
+    return {"simulation": simulation, "status": "success"}
+
+# Similar project index endpoint
+@app.post("/api/similarity/projects")
+async def upsert_similar_project(request: SimilarProjectUpsertRequest):
+    """
+    Add or update a project in the user's similar-project index
+    """
+    if "id" not in request.project and "project_id" not in request.project:
+        raise HTTPException(status_code=400, detail="Project must include id or project_id")
+    
+    services.similarity_index.upsert_project(request.user_id, request.project)
+    return {"index": services.similarity_index.status(), "status": "success"}
+
+# Schedule optimizer endpoint
+@app.post("/api/schedule/optimize", dependencies=[Depends(rate_limit("default"))])
+async def optimize_schedule(request: ScheduleRequest):
+    """
+    Compute a priority schedule for active projects and check capacity for one more
     """
     try:
-        advice = await groq_client.get_quick_advice(request.question_type)
+        projects = request.projects
+        if projects is None:
+            if not request.user_id:
+                raise HTTPException(status_code=400, detail="Provide either projects or user_id")
+            projects = await get_active_projects(request.user_id)
         
-        return {"advice": advice, "status": "success"}
+        optimized = schedule_optimizer.optimize(
+            projects,
+            daily_capacity_hours=request.daily_capacity_hours,
+            new_project=request.new_project
+        )
+        optimized["summary"]["workload_status"] = schedule_optimizer.workload_status(optimized["summary"])
+        
+        return {"optimization": optimized, "status": "success"}
         
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to optimize schedule: {str(e)}")
+
+async def get_active_projects(user_id: str) -> List[Dict[str, Any]]:
+    """
+    Get the user's projects that are not Done yet
+    """
+    projects_response = await get_user_projects(user_id)
+    return [project for project in projects_response.get("projects", []) if project["status"] != "Done"]
+
+# Pricing calibration endpoints
+@app.post("/api/pricing-calibration/refit")
+def refit_pricing_calibration(request: CalibrationRefitRequest):
+    """
+    Refit per-user pricing models from completed projects (runs in the threadpool)
+    """
+    if not services.supabase or not services.pricing_calibrator:
+        raise HTTPException(status_code=503, detail="Database connection not configured")
+    
+    try:
+        if request.user_id:
+            model = services.pricing_calibrator.refit_user(request.user_id)
+            return {"refit": {"users": 1, "projects": model.samples}, "status": "success"}
+        
+        return {"refit": services.pricing_calibrator.refit_all(), "status": "success"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to refit pricing calibration: {str(e)}")
+
+@app.post("/api/pricing-calibration/project-completed")
+async def observe_completed_project(request: ProjectCompletedRequest):
+    """
+    Fold a newly completed project into its owner's pricing model
+    """
+    if not services.supabase or not services.pricing_calibrator:
+        raise HTTPException(status_code=503, detail="Database connection not configured")
+    
+    try:
+        model = services.pricing_calibrator.observe_completed_project(request.project_id)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get quick advice: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to update pricing calibration: {str(e)}")
+    
+    if model is None:
+        raise HTTPException(status_code=404, detail="Completed project not found")
+    
+    return {"user_id": model.user_id, "samples": model.samples, "status": "success"}
+
+# Scoring configuration endpoints
+@app.get("/api/scoring-config")
+async def get_scoring_config_status():
+    """
+    Get the active scoring configuration version and reload status
+    """
+    return {"config": scoring_config_store.status(), "status": "success"}
+
+@app.post("/api/scoring-config/reload")
+async def reload_scoring_config():
+    """
+    Force a reload of the scoring configuration file
+    """
+    reloaded = scoring_config_store.reload(force=True)
+    config_status = scoring_config_store.status()
+    
+    if not reloaded:
+        raise HTTPException(status_code=422, detail=f"Scoring config not reloaded: {config_status['last_error']}")
+    
+    return {"config": config_status, "status": "success"}
+
+# LLM circuit breaker status endpoint
+@app.get("/api/llm/circuit-breakers")
+async def get_circuit_breakers():
+    """
+    State, window and hedging counters of each LLM circuit breaker
+    """
+    return {"circuit_breakers": circuit_breakers.status(), "status": "success"}
+
+@app.get("/api/chat/local-intents")
+async def get_local_intent_status():
+    """
+    Chat messages answered by local intents instead of the LLM
+    """
+    return {"local_intents": local_intent_router.status(), "status": "success"}
+
+@app.get("/api/llm/routing")
+async def get_model_routing():
+    """
+    Chat routing tiers, their share of requests and the client's model profiles
+    """
+    profiles = services.groq_client.profiles if services.groq_client else {}
+    return {"routing": model_router.status(), "profiles": profiles, "status": "success"}
+
+# Rate limiter status endpoint
+@app.get("/api/rate-limits")
+async def get_rate_limit_status():
+    """
+    Get configured rate limits and limiter counters
+    """
+    return {"rate_limits": rate_limiter.status(), "status": "success"}
+
+# Deadline reminder endpoints
+@app.post("/api/reminders/refresh")
+async def refresh_deadline_reminders(request: ReminderRefreshRequest):
+    """
+    Reschedule deadline reminders for one created, edited or deleted project
+    """
+    try:
+        scheduled = await services.deadline_reminders.refresh_project(request.project_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to refresh deadline reminders: {str(e)}")
+    
+    return {"project_id": request.project_id, "scheduled_reminders": scheduled, "status": "success"}
+
+@app.get("/api/reminders/status")
+async def get_deadline_reminder_status():
+    """
+    Get deadline reminder engine status
+    """
+    return {"reminders": services.deadline_reminders.status(), "status": "success"}
+
+# Bulk transcript moderation endpoints
+@app.post("/api/moderation/bulk", dependencies=[Depends(rate_limit("default"))])
+async def start_bulk_moderation(request: BulkModerationRequest):
+    """
+    Start moderating an NDJSON transcript file in a background process pool
+    """
+    from bulk_moderation import TooManyJobsError
+    
+    try:
+        job = services.bulk_moderation_jobs.start(request.input_path, request.output_path, request.workers)
+    except TooManyJobsError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to start bulk moderation: {str(e)}")
+    
+    return {"job": job, "status": "success"}
+
+@app.get("/api/moderation/bulk/{job_id}")
+async def get_bulk_moderation_job(job_id: str):
+    """
+    Get progress of a bulk moderation job
+    """
+    job = services.bulk_moderation_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Bulk moderation job not found")
+    return {"job": job, "status": "success"}
+
+# Quick advice endpoint
+@app.post("/api/quick-advice", dependencies=[Depends(rate_limit("llm"))])
+async def get_quick_advice(request: QuickAdviceRequest):
+    """
+    Get quick advice for common project management scenarios
+    """
+    if not services.groq_client:
+        FALLBACKS.inc(endpoint="quick-advice", reason="llm_unavailable")
+        return {"advice": generate_local_quick_advice(request.question_type), "advice_source": "fallback", "status": "success"}
+    
+    try:
+        advice = await services.groq_client.get_quick_advice(request.question_type)
+    except Exception as llm_error:
+        logger.warning("Quick advice answered locally: %s", llm_error)
+        FALLBACKS.inc(endpoint="quick-advice", reason="circuit_open" if isinstance(llm_error, CircuitOpenError) else "llm_error")
+        return {"advice": generate_local_quick_advice(request.question_type), "advice_source": "fallback", "status": "success"}
+    
+    return {"advice": advice, "advice_source": "ai", "status": "success"}
 
 # Endpoint to get available quick question types
 @app.get("/api/quick-questions")
@@ -472,81 +914,203 @@ async def get_quick_questions():
     return {"questions": questions, "status": "success"}
 
 # Email endpoints
-@app.post("/api/email/test")
+@app.post("/api/email/test", status_code=202, dependencies=[Depends(rate_limit("email"))])
 async def send_test_email(request: EmailTestRequest):
     """
     Send a test email to verify email functionality
     """
     try:
-        if not email_service or not email_service.enabled:
+        if not services.email_service or not services.email_service.enabled:
             raise HTTPException(status_code=503, detail="Email service not configured. Please check Supabase connection.")
         
-        result = await email_service.send_test_email(
+        result = await services.email_service.send_test_email(
             to_email=request.user_email,
             user_name=request.user_name
         )
         
         if result["success"]:
-            return {"message": "Test email sent successfully", "status": "success", "email_id": result.get("message_id")}
+            return {"message": "Test email queued", "status": "success", "email_id": result.get("message_id"), "job_id": result.get("job_id")}
         else:
             raise HTTPException(status_code=500, detail=f"Failed to send test email: {result.get('error')}")
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to send test email: {str(e)}")
 
-@app.post("/api/email/project-update")
+@app.post("/api/email/project-update", status_code=202, dependencies=[Depends(rate_limit("email"))])
 async def send_project_update_email(request: ProjectUpdateRequest):
     """
     Send project status update email notification
     """
     try:
-        if not email_service or not email_service.enabled:
+        if not services.email_service or not services.email_service.enabled:
             raise HTTPException(status_code=503, detail="Supabase email service not configured")
         
-        if not notification_scheduler:
+        if not services.notification_scheduler:
             raise HTTPException(status_code=503, detail="Notification scheduler not available")
         
-        result = await notification_scheduler.send_project_status_update(
+        # A project moving to Done is new calibration data for its owner
+        if request.new_status == "Done" and services.pricing_calibrator:
+            try:
+                services.pricing_calibrator.observe_completed_project(request.project_id)
+            except Exception as e:
+                logger.warning("Could not update pricing calibration: %s", e)
+        
+        # Status changes (e.g. Done) affect which deadline reminders are still due
+        try:
+            await services.deadline_reminders.refresh_project(request.project_id)
+        except Exception as e:
+            logger.warning("Could not refresh deadline reminders: %s", e)
+        
+        if services.notification_digest.enabled:
+            result = services.notification_digest.add_project_update(
+                project_id=request.project_id,
+                old_status=request.old_status,
+                new_status=request.new_status,
+                update_message=request.update_message,
+                request_id=request.request_id
+            )
+            return {"message": "Project update queued for digest", "status": "success", "digest": True, "duplicate": result["duplicate"], "pending_events": result["pending_events"], "flush_after_seconds": result["flush_after_seconds"]}
+        
+        result = await services.notification_scheduler.send_project_status_update(
             project_id=request.project_id,
             old_status=request.old_status,
             new_status=request.new_status,
-            update_message=request.update_message
+            update_message=request.update_message,
+            request_id=request.request_id
         )
         
         if result["success"]:
-            return {"message": "Project update email sent successfully", "status": "success", "email_id": result.get("message_id")}
+            return {"message": "Project update email queued", "status": "success", "email_id": result.get("message_id"), "outbox_id": result.get("outbox_id"), "duplicate": result.get("duplicate", False)}
         else:
             raise HTTPException(status_code=500, detail=f"Failed to send project update email: {result.get('error')}")
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to send project update email: {str(e)}")
 
-@app.post("/api/email/welcome")
+@app.post("/api/email/project-update/bulk", status_code=202, dependencies=[Depends(rate_limit("email"))])
+async def send_bulk_project_update_emails(request: BulkProjectUpdateRequest):
+    """
+    Send project status update emails for many projects in one call
+    """
+    if len(request.updates) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ITEMS} updates per request")
+    
+    try:
+        if not services.email_service or not services.email_service.enabled:
+            raise HTTPException(status_code=503, detail="Supabase email service not configured")
+        
+        if not services.notification_scheduler:
+            raise HTTPException(status_code=503, detail="Notification scheduler not available")
+        
+        project_ids = [update.project_id for update in request.updates]
+        done_ids = [update.project_id for update in request.updates if update.new_status == "Done"]
+        if done_ids and services.pricing_calibrator:
+            try:
+                services.pricing_calibrator.observe_completed_projects(done_ids)
+            except Exception as e:
+                logger.warning("Could not update pricing calibration: %s", e)
+        
+        try:
+            await services.deadline_reminders.refresh_projects(project_ids)
+        except Exception as e:
+            logger.warning("Could not refresh deadline reminders: %s", e)
+        
+        if services.notification_digest.enabled:
+            results = []
+            for update in request.updates:
+                result = services.notification_digest.add_project_update(
+                    project_id=update.project_id,
+                    old_status=update.old_status,
+                    new_status=update.new_status,
+                    update_message=update.update_message,
+                    request_id=update.request_id
+                )
+                results.append({"project_id": update.project_id, "success": True, "digest": True, "duplicate": result["duplicate"]})
+            return {"message": f"{len(results)} project updates queued for digest", "status": "success", "digest": True, "results": results, "pending_events": services.notification_digest.status()["pending_events"]}
+        
+        result = await services.notification_scheduler.send_project_status_updates(
+            [update.dict() for update in request.updates]
+        )
+        
+        if result["success"]:
+            return {"message": f"{result['queued']} project update emails queued", "status": "success", "results": result["results"], "queued": result["queued"], "duplicates": result["duplicates"], "failed": result["failed"]}
+        else:
+            raise HTTPException(status_code=500, detail=f"Failed to send project update emails: {result.get('error')}")
+            
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to send project update emails: {str(e)}")
+
+@app.post("/api/email/welcome", status_code=202, dependencies=[Depends(rate_limit("email"))])
 async def send_welcome_email(request: WelcomeEmailRequest):
     """
     Send welcome email to new users
     """
     try:
-        if not email_service or not email_service.enabled:
+        if not services.email_service or not services.email_service.enabled:
             raise HTTPException(status_code=503, detail="Supabase email service not configured")
         
-        if not notification_scheduler:
+        if not services.notification_scheduler:
             raise HTTPException(status_code=503, detail="Notification scheduler not available")
         
-        result = await notification_scheduler.send_welcome_email_to_user(
+        result = await services.notification_scheduler.send_welcome_email_to_user(
             user_id="",  # User ID not required for welcome email
             user_email=request.user_email,
             user_name=request.user_name
         )
         
         if result["success"]:
-            return {"message": "Welcome email sent successfully", "status": "success", "email_id": result.get("message_id")}
+            return {"message": "Welcome email queued", "status": "success", "email_id": result.get("message_id"), "outbox_id": result.get("outbox_id"), "duplicate": result.get("duplicate", False)}
         else:
             raise HTTPException(status_code=500, detail=f"Failed to send welcome email: {result.get('error')}")
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to send welcome email: {str(e)}")
 
+@app.post("/api/email/welcome/bulk", status_code=202, dependencies=[Depends(rate_limit("email"))])
+async def send_bulk_welcome_emails(request: BulkWelcomeEmailRequest):
+    """
+    Send welcome emails to many new users in one call (e.g. onboarding imports)
+    """
+    if len(request.users) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ITEMS} users per request")
+    
+    try:
+        if not services.email_service or not services.email_service.enabled:
+            raise HTTPException(status_code=503, detail="Supabase email service not configured")
+        
+        if not services.notification_scheduler:
+            raise HTTPException(status_code=503, detail="Notification scheduler not available")
+        
+        result = await services.notification_scheduler.send_welcome_emails([user.dict() for user in request.users])
+        
+        if result["success"]:
+            return {"message": f"{result['queued']} welcome emails queued", "status": "success", "results": result["results"], "queued": result["queued"], "duplicates": result["duplicates"], "failed": result["failed"]}
+        else:
+            raise HTTPException(status_code=500, detail=f"Failed to send welcome emails: {result.get('error')}")
+            
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to send welcome emails: {str(e)}")
+
+@app.get("/api/email/jobs/{job_id}")
+async def get_email_job(job_id: str):
+    """
+    Get delivery state of a queued email
+    """
+    job = services.email_queue.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Email job not found")
+    return {"job": job, "status": "success"}
+
+@app.get("/api/email/outbox/{outbox_id}")
+async def get_outbox_notification(outbox_id: int):
+    """
+    Get delivery state of an outbox notification
+    """
+    notification = services.notification_outbox.get(outbox_id)
+    if notification is None:
+        raise HTTPException(status_code=404, detail="Notification not found")
+    return {"notification": notification, "status": "success"}
+
 @app.get("/api/email/status")
 async def get_email_service_status():
     """
@@ -554,12 +1118,16 @@ async def get_email_service_status():
     """
     try:
         status = {
-            "email_service_enabled": email_service.enabled if email_service else False,
+            "email_service_enabled": services.email_service.enabled if services.email_service else False,
             "email_service_type": "Supabase Integration",
-            "notification_scheduler_available": notification_scheduler is not None,
-            "supabase_connected": supabase is not None,
-            "from_email": email_service.from_email if email_service and email_service.enabled else "Not configured",
-            "app_url": email_service.app_url if email_service and email_service.enabled else "Not configured"
+            "notification_scheduler_available": services.notification_scheduler is not None,
+            "supabase_connected": services.supabase is not None,
+            "from_email": services.email_service.from_email if services.email_service and services.email_service.enabled else "Not configured",
+            "app_url": services.email_service.app_url if services.email_service and services.email_service.enabled else "Not configured",
+            "templates": services.email_templates.status(),
+            "queue": services.email_queue.metrics(),
+            "outbox": services.notification_outbox.status(),
+            "digest": services.notification_digest.status()
         }
         
         return {"status": status, "message": "Supabase email service status retrieved successfully"}
@@ -567,7 +1135,7 @@ async def get_email_service_status():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get email service status: {str(e)}")
 
-@app.post("/api/project-analysis")
+@app.post("/api/project-analysis", dependencies=[Depends(rate_limit("llm"))])
 async def analyze_project_decision(request: dict):
     """
     Analyze user's project history and provide AI-powered decision on taking new projects
@@ -578,6 +1146,29 @@ async def analyze_project_decision(request: dict):
         completion_rate = request.get('completion_rate', 0)
         current_workload = request.get('current_workload', 0)
         
+        # Capacity-aware schedule of the user's active projects drives the workload verdict
+        schedule = None
+        if user_id and services.supabase:
+            try:
+                schedule = schedule_optimizer.optimize(
+                    await get_active_projects(user_id),
+                    daily_capacity_hours=request.get('daily_capacity_hours'),
+                    new_project=request.get('new_project')
+                )
+            except Exception as schedule_error:
+                logger.warning("Schedule optimization failed: %s", schedule_error)
+        
+        schedule_context = ""
+        if schedule:
+            schedule_summary = schedule['summary']
+            schedule_context = f"""
+        SCHEDULE AT CURRENT CAPACITY ({schedule['daily_capacity_hours']} hours/day):
+        - Committed Work: {schedule_summary['total_effort_hours']} hours ({schedule_summary['makespan_days']} days)
+        - Projected Late Projects: {schedule_summary['late_projects']}
+        - Minimum Slack: {schedule_summary['min_slack_days']} days
+        - New Project Fits Without Extra Lateness: {'yes' if schedule_summary['can_take_new_project'] else 'no'}
+        """
+        
         # Build context for AI analysis
         context = f"""
         You are an AI business advisor helping a freelancer decide whether to take on a new project.
@@ -589,7 +1180,7 @@ async def analyze_project_decision(request: dict):
         - Completion Rate: {completion_rate:.1f}%
         - Average Payment: ${project_history.get('averagePayment', 0):,.2f}
         - Project Types: {', '.join(project_history.get('projectTypes', []))}
-        
+        {schedule_context}
         ANALYSIS REQUESTED:
         Provide a decision on whether this freelancer should take on a new project right now.
         
@@ -616,22 +1207,22 @@ async def analyze_project_decision(request: dict):
         Do not provide pricing suggestions.
         """
         
-        # Use Groq for intelligent analysis
+        # Use Groq for intelligent analysis; an open circuit falls back instantly
         try:
-            response = groq_client.client.chat.completions.create(
-                model="meta-llama/llama-4-scout-17b-16e-instruct",
-                messages=[
+            ai_response = await services.groq_client.complete_guarded(
+                "decision",
+                [
                     {"role": "system", "content": "You are a senior business advisor with expertise in freelance project management and business development. Provide structured, actionable advice."},
                     {"role": "user", "content": context}
                 ],
+                model="meta-llama/llama-4-scout-17b-16e-instruct",
                 temperature=0.3,
-                max_tokens=1000
+                max_tokens=1000,
+                top_p=1.0
             )
             
-            ai_response = response.choices[0].message.content
-            
             # Parse AI response to extract structured data
-            decision_data = parse_ai_decision(ai_response, project_history, completion_rate, current_workload)
+            decision_data = parse_ai_decision(ai_response, project_history, completion_rate, current_workload, schedule)
             
             return {
                 "success": True,
@@ -640,9 +1231,10 @@ async def analyze_project_decision(request: dict):
             }
             
         except Exception as groq_error:
-            print(f"Groq API error: {groq_error}")
+            logger.error("Groq API error: %s", groq_error)
+            FALLBACKS.inc(endpoint="project-analysis", reason="circuit_open" if isinstance(groq_error, CircuitOpenError) else "llm_error")
             # Fallback to local analysis
-            decision_data = generate_fallback_decision(project_history, completion_rate, current_workload)
+            decision_data = generate_fallback_decision(project_history, completion_rate, current_workload, schedule)
             return {
                 "success": True,
                 "decision": decision_data,
@@ -650,13 +1242,13 @@ async def analyze_project_decision(request: dict):
             }
             
     except Exception as e:
-        print(f"Error in project analysis: {e}")
+        logger.exception("Error in project analysis: %s", e)
         return {
             "success": False,
             "error": str(e)
         }
 
-def parse_ai_decision(ai_response: str, project_history: dict, completion_rate: float, current_workload: int):
+def parse_ai_decision(ai_response: str, project_history: dict, completion_rate: float, current_workload: int, schedule: dict = None):
     """
     Parse AI response and structure the decision data
     """
@@ -700,21 +1292,21 @@ def parse_ai_decision(ai_response: str, project_history: dict, completion_rate:
             "suggested": timeline,
             "reasoning": f"Recommended based on performance analysis"
         },
-        "workload": {
-            "currentLoad": current_workload,
-            "recommendation": f"Current workload: {current_workload} projects",
-            "status": "high" if current_workload >= 5 else "moderate" if current_workload >= 3 else "low"
-        },
+        "workload": build_workload_summary(current_workload, schedule),
         "insights": extract_insights_from_ai_response(ai_response, project_history, completion_rate)
     }
 
-def generate_fallback_decision(project_history: dict, completion_rate: float, current_workload: int):
+def generate_fallback_decision(project_history: dict, completion_rate: float, current_workload: int, schedule: dict = None):
     """
     Generate decision when AI service is unavailable
     """
     avg_payment = project_history.get('averagePayment', 1500)
     
-    if current_workload >= 5:
+    if schedule and not schedule['summary']['can_take_new_project']:
+        decision = "defer"
+        confidence = 90
+        reasoning = "A new project would not fit your schedule without making work late"
+    elif current_workload >= 5:
         decision = "defer"
         confidence = 90
         reasoning = "Workload at capacity - focus on completing current projects first"
@@ -737,11 +1329,7 @@ def generate_fallback_decision(project_history: dict, completion_rate: float, cu
             "suggested": 30,
             "reasoning": "Standard timeline recommendation"
         },
-        "workload": {
-            "currentLoad": current_workload,
-            "recommendation": f"Current workload: {current_workload} projects",
-            "status": "high" if current_workload >= 5 else "moderate" if current_workload >= 3 else "low"
-        },
+        "workload": build_workload_summary(current_workload, schedule),
         "insights": [
             f"Portfolio: {project_history.get('totalProjects', 0)} projects, {completion_rate:.1f}% completion rate",
             f"Performance: {len(project_history.get('completedProjects', []))} completed projects",
@@ -750,6 +1338,32 @@ def generate_fallback_decision(project_history: dict, completion_rate: float, cu
         ]
     }
 
+def build_workload_summary(current_workload: int, schedule: dict = None):
+    """
+    Describe workload from the optimized schedule, or from the project count alone
+    """
+    if not schedule:
+        return {
+            "currentLoad": current_workload,
+            "recommendation": f"Current workload: {current_workload} projects",
+            "status": "high" if current_workload >= 5 else "moderate" if current_workload >= 3 else "low"
+        }
+    
+    summary = schedule['summary']
+    recommendation = f"Current workload: {summary['project_count']} active projects, {summary['makespan_days']} days of work"
+    if summary['late_projects']:
+        recommendation += f", {summary['late_projects']} projected late"
+    
+    return {
+        "currentLoad": summary['project_count'],
+        "recommendation": recommendation,
+        "status": schedule_optimizer.workload_status(summary),
+        "canTakeNewProject": summary['can_take_new_project'],
+        "projectedLateProjects": summary['late_projects'],
+        "minSlackDays": summary['min_slack_days'],
+        "suggestedOrder": [entry['name'] for entry in schedule['schedule']]
+    }
+
 def extract_insights_from_ai_response(ai_response: str, project_history: dict, completion_rate: float):
     """
     Extract key insights from AI response
@@ -775,7 +1389,7 @@ def extract_insights_from_ai_response(ai_response: str, project_history: dict, c
     
     return insights[:4]  # Return max 4 insights
 
-@app.post("/api/dashboard-summary")
+@app.post("/api/dashboard-summary", dependencies=[Depends(rate_limit("llm"))])
 async def generate_dashboard_summary(request: dict):
     """
     Generate simple AI summary of dashboard data
@@ -801,19 +1415,19 @@ async def generate_dashboard_summary(request: dict):
         Don't give business advice or recommendations - just summarize the current state.
         """
         
-        # Use Groq for intelligent summary
+        # Use Groq for intelligent summary; an open circuit falls back instantly
         try:
-            response = groq_client.client.chat.completions.create(
-                model="meta-llama/llama-4-scout-17b-16e-instruct",
-                messages=[
+            ai_summary = (await services.groq_client.complete_guarded(
+                "summary",
+                [
                     {"role": "system", "content": "You are a helpful assistant that explains data in simple, friendly language. Keep responses concise and conversational."},
                     {"role": "user", "content": context}
                 ],
+                model="meta-llama/llama-4-scout-17b-16e-instruct",
                 temperature=0.3,
-                max_tokens=200
-            )
-            
-            ai_summary = response.choices[0].message.content.strip()
+                max_tokens=200,
+                top_p=1.0
+            )).strip()
             
             return {
                 "success": True,
@@ -821,7 +1435,8 @@ async def generate_dashboard_summary(request: dict):
             }
             
         except Exception as groq_error:
-            print(f"Groq API error: {groq_error}")
+            logger.error("Groq API error: %s", groq_error)
+            FALLBACKS.inc(endpoint="dashboard-summary", reason="circuit_open" if isinstance(groq_error, CircuitOpenError) else "llm_error")
             # Fallback to local summary
             local_summary = generate_simple_fallback(data)
             return {
@@ -831,7 +1446,7 @@ async def generate_dashboard_summary(request: dict):
             }
             
     except Exception as e:
-        print(f"Error in dashboard summary: {e}")
+        logger.exception("Error in dashboard summary: %s", e)
         return {
             "success": False,
             "error": str(e)
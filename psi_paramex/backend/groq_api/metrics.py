@@ -0,0 +1,331 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Stage name prefix -> Server-Timing metric name
+SERVER_TIMING_GROUPS = {"supabase": "db", "llm": "llm", "scoring": "scoring", "safety": "safety"}
+
+# Stages measured inside another stage of their group (first token falls within the
+# completion); they are kept as histograms but not added to Server-Timing twice
+NESTED_STAGES = frozenset({"llm.first_token"})
+
+# Per-request {group: [seconds, calls]}, set by the Server-Timing middleware; shared with to_thread calls
+request_timings: contextvars.ContextVar = contextvars.ContextVar("request_timings", default=None)
+
+# Seconds; covers in-process stages (~100µs) up to slow LLM completions
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self, lock: threading.Lock):
+        self.value = 0.0
+        self._lock = lock
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "total", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...], lock: threading.Lock):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.total = 0.0
+        self._lock = lock
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += value
+
+
+class _Metric:
+    """Labelled metric; labels() returns a bound child that hot paths can keep"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: Any):
+        child = self._children.get(values)
+        if child is not None:
+            return child
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[Any, ...]:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def _snapshot(self) -> List[Tuple[Tuple[str, ...], Any]]:
+        with self._lock:
+            return sorted(self._children.items())
+
+
+class Counter(_Metric):
+    """Monotonic counter with optional labels"""
+
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild(self._lock)
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        self.labels(*self._key(labels)).inc(amount)
+
+    def value(self, **labels: Any) -> float:
+        return self.labels(*self._key(labels)).value
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_label_text(self.labelnames, key)} {child.value:g}" for key, child in self._snapshot()]
+
+
+class Gauge(_Metric):
+    """Current value with optional labels"""
+
+    kind = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float, **labels: Any) -> None:
+        self.labels(*self._key(labels)).set(value)
+
+    def value(self, **labels: Any) -> float:
+        return self.labels(*self._key(labels)).value
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_label_text(self.labelnames, key)} {child.value:g}" for key, child in self._snapshot()]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram with optional labels"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets, self._lock)
+
+    def observe(self, value: float, **labels: Any) -> None:
+        self.labels(*self._key(labels)).observe(value)
+
+    def count(self, **labels: Any) -> int:
+        return sum(self.labels(*self._key(labels)).counts)
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, child in self._snapshot():
+            with self._lock:
+                counts, total = list(child.counts), child.total
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _label_text(self.labelnames, key, 'le="%g"' % bound)
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            cumulative += counts[-1]
+            labels = _label_text(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labelnames, key)} {total:.6f}")
+            lines.append(f"{self.name}_count{_label_text(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    In-process metrics rendered in the Prometheus text exposition format.
+
+    Recording into a bound child (metric.labels(...)) is a bisect and a
+    locked add, around a microsecond, so it stays on in every stage of a
+    request. Setting METRICS_ENABLED=false turns stage timers into no-ops;
+    SERVER_TIMING_ENABLED=false drops the Server-Timing response header.
+    """
+
+    def __init__(self, prefix: str = "paramex"):
+        self.prefix = prefix
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self.configure()
+
+    def configure(self) -> None:
+        """(Re)read settings; called again once the service container has loaded .env"""
+        self.enabled = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.server_timing = self.enabled and os.getenv("SERVER_TIMING_ENABLED", "true").lower() in ("1", "true", "yes")
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(f"{self.prefix}_{name}", documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(f"{self.prefix}_{name}", documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(f"{self.prefix}_{name}", documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class StageTimer:
+    """
+    Times a stage into the stage histogram; usable as a context manager
+    (``with timed("chat.safety_input"):``) or a decorator on sync and async
+    functions.
+    """
+
+    __slots__ = ("series", "group", "started")
+
+    def __init__(self, stage: str):
+        self.series = STAGE_SECONDS.labels(stage)
+        self.group = _stage_group(stage)
+        self.started = 0.0
+
+    def __enter__(self) -> "StageTimer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if metrics.enabled:
+            _record(self.series, self.group, time.perf_counter() - self.started)
+
+    def __call__(self, func: Callable) -> Callable:
+        series, group = self.series, self.group
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    if metrics.enabled:
+                        _record(series, group, time.perf_counter() - started)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                if metrics.enabled:
+                    _record(series, group, time.perf_counter() - started)
+        return wrapper
+
+
+# Global registry and the metrics shared across modules
+metrics = MetricsRegistry()
+
+STAGE_SECONDS = metrics.histogram("stage_duration_seconds", "Time spent in a processing stage", ("stage",))
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+)
+LLM_REQUESTS = metrics.counter("llm_requests_total", "LLM completions by outcome", ("model", "outcome"))
+LLM_TOKENS = metrics.counter("llm_tokens_total", "LLM tokens used", ("model", "kind"))
+CACHE_LOOKUPS = metrics.counter("cache_lookups_total", "Cache lookups by result", ("cache", "result"))
+FALLBACKS = metrics.counter("fallbacks_total", "Responses served without the LLM answer", ("endpoint", "reason"))
+CHAT_ANSWERS = metrics.counter("chat_answers_total", "Chat replies by source (local intent, llm or fallback)", ("source", "intent"))
+LLM_ROUTES = metrics.counter("llm_routes_total", "Chat requests by complexity class and routed model", ("tier", "model"))
+LLM_ROUTE_SECONDS = metrics.histogram("llm_route_duration_seconds", "Chat LLM latency by complexity class", ("tier",))
+LLM_ROUTE_TOKENS = metrics.counter("llm_route_tokens_total", "LLM tokens used by complexity class", ("tier", "kind"))
+CIRCUIT_STATE = metrics.gauge("llm_circuit_state", "LLM circuit breaker state (0 closed, 1 half-open, 2 open)", ("breaker",))
+CIRCUIT_TRANSITIONS = metrics.counter("llm_circuit_transitions_total", "LLM circuit breaker state changes", ("breaker", "state"))
+CIRCUIT_REJECTED = metrics.counter("llm_circuit_rejected_total", "LLM calls refused by an open circuit", ("breaker",))
+HEDGED_REQUESTS = metrics.counter("llm_hedged_requests_total", "Hedged LLM calls by which request answered", ("breaker", "winner"))
+
+
+def _stage_group(stage: str) -> Optional[str]:
+    if stage in NESTED_STAGES:
+        return None
+    return SERVER_TIMING_GROUPS.get(stage.split(".", 1)[0])
+
+
+def _record(series: _HistogramChild, group: Optional[str], seconds: float) -> None:
+    series.observe(seconds)
+    if group is not None:
+        timings = request_timings.get()
+        if timings is not None:
+            entry = timings.setdefault(group, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    if metrics.enabled:
+        _record(STAGE_SECONDS.labels(stage), _stage_group(stage), seconds)
+
+
+def server_timing_header(timings: Dict[str, List[float]], total_seconds: float) -> str:
+    """Render per-group stage totals as a Server-Timing header value"""
+    parts = [
+        f'{group};dur={seconds * 1000:.1f};desc="{calls} call{"s" if calls != 1 else ""}"'
+        for group, (seconds, calls) in timings.items()
+    ]
+    parts.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def timed(stage: str) -> StageTimer:
+    return StageTimer(stage)
+
+
+def record_llm_usage(model: str, usage: Optional[Any], tier: Optional[str] = None) -> None:
+    """Count prompt/completion tokens from a Groq usage object (if the response had one), per routing tier when given"""
+    if usage is None or not metrics.enabled:
+        return
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    LLM_TOKENS.labels(model, "prompt").inc(prompt_tokens)
+    LLM_TOKENS.labels(model, "completion").inc(completion_tokens)
+    if tier is not None:
+        LLM_ROUTE_TOKENS.labels(tier, "prompt").inc(prompt_tokens)
+        LLM_ROUTE_TOKENS.labels(tier, "completion").inc(completion_tokens)
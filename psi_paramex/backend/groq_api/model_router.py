@@ -0,0 +1,136 @@
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from metrics import LLM_ROUTES
+
+TIERS = ("simple", "standard", "complex")
+DEFAULT_TIER_PROFILES = "simple=fast,standard=balanced,complex=quality"
+
+# Acknowledgements and greetings; a short message made of these needs no reasoning
+SMALL_TALK = re.compile(
+    r"^\W*(thanks?( you)?|thank u|thx|ok(ay)?|cool|great|nice|got it|hi|hello|hey|bye|good (morning|night)|"
+    r"terima ?kasih|makasih|trims|oke|sip|siap|mantap|halo|hai|selamat (pagi|siang|malam))\b[\w\s!.,]*$"
+)
+
+# Requests that need multi-step reasoning over the user's data, with their score
+COMPLEX_INTENTS = [
+    ("prioritization", 2, re.compile(r"\b(prioriti[sz]\w*|priority|which (one|project) first|order of|prioritas|urutan|duluan)\b")),
+    ("planning", 2, re.compile(r"\b(plan|schedule|timeline|roadmap|allocate|capacity|workload|rencana|jadwal|alokasi|beban kerja)\b")),
+    ("comparison", 2, re.compile(r"\b(compare|versus|vs|trade ?offs?|pros and cons|better option|bandingkan|dibanding|kelebihan)\b")),
+    ("negotiation", 1, re.compile(r"\b(negotiat\w*|pricing|price|rate|scope creep|contract|nego\w*|harga|tarif|kontrak)\b")),
+    ("analysis", 1, re.compile(r"\b(analy[sz]\w*|assess|evaluate|risk|strategy|analisis|evaluasi|risiko|strategi)\b")),
+]
+
+
+@dataclass
+class RouteDecision:
+    tier: str
+    profile: Optional[str]
+    score: int
+    reasons: List[str] = field(default_factory=list)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"tier": self.tier, "profile": self.profile, "score": self.score, "reasons": self.reasons}
+
+
+class ModelRouter:
+    """
+    Picks the model profile for a chat request from its complexity.
+
+    The score adds up message length, complex intents found in the message
+    (prioritization, planning, comparison, ...), attached project data and
+    conversation depth. Short acknowledgements score zero. A score up to
+    simple_max is a simple turn, from complex_min a complex one, anything
+    in between standard. Each tier maps to a profile in GroqLlamaClient's
+    model table (LLM_ROUTER_PROFILES, default simple=fast,
+    standard=balanced, complex=quality). With LLM_ROUTER_ENABLED=false
+    every request uses the client's default profile.
+    """
+
+    def __init__(self):
+        self.counters: Dict[str, int] = {tier: 0 for tier in TIERS}
+        self.configure()
+
+    def configure(self) -> None:
+        """(Re)read settings; called again once the service container has loaded .env"""
+        self.enabled = os.getenv("LLM_ROUTER_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.simple_max = int(os.getenv("LLM_ROUTER_SIMPLE_MAX", "1"))
+        self.complex_min = int(os.getenv("LLM_ROUTER_COMPLEX_MIN", "4"))
+        self.tier_profiles = dict(
+            item.strip().split("=", 1)
+            for item in os.getenv("LLM_ROUTER_PROFILES", DEFAULT_TIER_PROFILES).split(",")
+            if "=" in item
+        )
+
+    def score(self, message: str, history_length: int = 0, project_count: int = 0) -> RouteDecision:
+        """
+        Score a chat request and pick its tier
+
+        Args:
+            message: The user's message, without the context the endpoint adds
+            history_length: Messages of conversation history sent along
+            project_count: Projects attached to the prompt (0 when none)
+
+        Returns:
+            RouteDecision with the tier, its profile and the reasons that scored
+        """
+        text = message.lower()
+        words = len(text.split())
+        if words <= 6 and SMALL_TALK.match(text):
+            return self._decide(0, ["small_talk"])
+
+        score, reasons = 0, []
+        if words > 60:
+            score, reasons = 3, ["long_message"]
+        elif words > 25:
+            score, reasons = 2, ["medium_message"]
+        elif words > 8:
+            score, reasons = 1, ["short_message"]
+
+        for name, points, pattern in COMPLEX_INTENTS:
+            if pattern.search(text):
+                score += points
+                reasons.append(name)
+        if text.count("?") > 1:
+            score += 1
+            reasons.append("multiple_questions")
+
+        if project_count:
+            score += 2 if project_count > 3 else 1
+            reasons.append(f"projects:{project_count}")
+        if history_length >= 4:
+            score += 2 if history_length >= 8 else 1
+            reasons.append(f"history:{history_length}")
+        return self._decide(score, reasons)
+
+    def _decide(self, score: int, reasons: List[str]) -> RouteDecision:
+        if score <= self.simple_max:
+            tier = "simple"
+        elif score >= self.complex_min:
+            tier = "complex"
+        else:
+            tier = "standard"
+        profile = self.tier_profiles.get(tier) if self.enabled else None
+        return RouteDecision(tier, profile, score, reasons)
+
+    def record(self, decision: RouteDecision, model: str) -> None:
+        """Count a routed request once the client has resolved its model"""
+        self.counters[decision.tier] += 1
+        LLM_ROUTES.labels(decision.tier, model).inc()
+
+    def status(self) -> Dict[str, Any]:
+        total = sum(self.counters.values())
+        return {
+            "enabled": self.enabled,
+            "simple_max": self.simple_max,
+            "complex_min": self.complex_min,
+            "tier_profiles": self.tier_profiles,
+            "requests": dict(self.counters),
+            "share": {tier: round(count / total, 4) for tier, count in self.counters.items()} if total else {},
+        }
+
+
+# Global router instance
+model_router = ModelRouter()
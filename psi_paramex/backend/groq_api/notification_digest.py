@@ -0,0 +1,271 @@
+import asyncio
+import hashlib
+import os
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import pytz
+
+from notification_outbox import NotificationOutbox, OutboxDrainer, project_update_key
+from notification_scheduler import project_update_message
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+DIGEST_TEMPLATE = "project_digest.html"
+PAGE_SIZE = 1000
+
+DIGEST_COLUMNS = """
+    project_id,
+    project_name,
+    client_name,
+    user_id,
+    users!inner ( email, name )
+"""
+
+
+class NotificationDigest:
+    """
+    Windowed digest of project status notifications.
+
+    Status changes are buffered per project in the notification outbox file
+    (repeated changes of one project collapse into a single chain such as
+    To Do → On-Process → Done), so they survive a crash or restart and are
+    shared by all worker processes. Each flush resolves every newly buffered
+    project and its owner with one in_() query, groups the entries by user
+    and, once a user's oldest entry is a window old, turns them into one
+    email in the same transaction that removes them from the buffer. A user
+    with a single change gets the regular project update email. Users over
+    the hourly send cap, which is also kept in the outbox file, keep
+    collecting changes until the cap frees up.
+    """
+
+    def __init__(
+        self,
+        supabase_client: "Client" = None,
+        outbox: NotificationOutbox = None,
+        drainer: OutboxDrainer = None,
+        window_seconds: Optional[float] = None,
+    ):
+        self.supabase = supabase_client
+        self.outbox = outbox
+        self.drainer = drainer
+        self.window_seconds = (
+            window_seconds if window_seconds is not None
+            else float(os.getenv("NOTIFICATION_DIGEST_WINDOW_SECONDS", "120"))
+        )
+        self.max_per_hour = int(os.getenv("NOTIFICATION_DIGEST_MAX_PER_HOUR", "6"))
+        self.max_items = int(os.getenv("NOTIFICATION_DIGEST_MAX_ITEMS", "25"))
+        self.max_pending = int(os.getenv("NOTIFICATION_DIGEST_MAX_PENDING", "10000"))
+        self.poll_interval = min(max(self.window_seconds / 4, 1.0), 15.0)
+        self.timezone = pytz.timezone("Asia/Jakarta")
+
+        self._flush_all = False
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.counters = {
+            "events": 0, "coalesced": 0, "duplicates": 0, "lookups": 0, "unknown_projects": 0,
+            "digests": 0, "single_updates": 0, "deferred_by_cap": 0, "stale": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.supabase is not None and self.window_seconds > 0
+
+    async def start(self) -> None:
+        if self._task is None and self.enabled:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+            print(f"✅ Notification digests enabled ({self.window_seconds:g}s window)")
+
+    async def stop(self) -> None:
+        # Buffered changes stay in the outbox file and are sent after the restart
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def add_project_update(
+        self, project_id: str, old_status: str, new_status: str, update_message: str = "",
+        now: Optional[float] = None, request_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Buffer a project status change for the owner's next digest
+
+        Args:
+            project_id: Changed project
+            old_status: Status before the change
+            new_status: Status after the change
+            update_message: Optional note shown with the change
+            now: Event time (defaults to the current time)
+            request_id: Client id of the change; retries with the same id are buffered once
+
+        Returns:
+            Buffering result with the number of pending events
+        """
+        self.counters["events"] += 1
+        outcome, pending = self.outbox.buffer_digest_event(
+            str(project_id), old_status, new_status, update_message or "", now, request_id
+        )
+        if outcome == "duplicate":
+            self.counters["duplicates"] += 1
+        elif outcome == "coalesced":
+            self.counters["coalesced"] += 1
+
+        if pending >= self.max_pending:
+            self._flush_all = True
+            if self._wakeup is not None:
+                self._wakeup.set()
+
+        return {
+            "success": True,
+            "duplicate": outcome == "duplicate",
+            "pending_events": pending,
+            "flush_after_seconds": self.window_seconds,
+        }
+
+    async def flush(self, now: Optional[float] = None, force: bool = False) -> int:
+        """
+        Write digests for every user whose window has closed
+
+        Args:
+            now: Flush time (defaults to the current time)
+            force: Flush every buffered event regardless of windows and caps
+
+        Returns:
+            Number of emails written to the outbox
+        """
+        now = now if now is not None else time.time()
+        force = force or self._flush_all
+        self._flush_all = False
+
+        events = await asyncio.to_thread(self.outbox.digest_events)
+        unresolved = [event["project_id"] for event in events if event["project"] is None]
+        if unresolved:
+            rows = await asyncio.to_thread(self._fetch_projects, unresolved)
+            self.counters["lookups"] += 1
+            found = {
+                project_id: row for project_id, row in rows.items()
+                if project_id in unresolved and (row.get("users") or {}).get("email")
+            }
+            unknown = [project_id for project_id in unresolved if project_id not in found]
+            self.counters["unknown_projects"] += len(unknown)
+            await asyncio.to_thread(self.outbox.resolve_digest_events, found, unknown)
+            for event in events:
+                if event["project_id"] in found:
+                    event["project"] = found[event["project_id"]]
+                    event["user"] = found[event["project_id"]]["users"]["email"].strip().lower()
+
+        by_user: Dict[str, List[Dict[str, Any]]] = {}
+        for event in events:
+            if event["project"] is not None:
+                by_user.setdefault(event["user"], []).append(event)
+
+        written = 0
+        for user, events in by_user.items():
+            if not force and now - events[0]["first_at"] < self.window_seconds:
+                continue
+
+            key, message = self._message(user, events, now)
+            outcome = await asyncio.to_thread(
+                self.outbox.commit_digest,
+                user,
+                [(event["project_id"], event["version"]) for event in events],
+                key,
+                message,
+                now,
+                None if force else self.max_per_hour,
+            )
+            if outcome == "capped":
+                self.counters["deferred_by_cap"] += 1
+            elif outcome == "stale":
+                # Changed or sent elsewhere since it was read; the next flush sees the current entries
+                self.counters["stale"] += 1
+            elif outcome == "written":
+                written += 1
+                self.counters["digests" if message["email_type"] == "project_digest" else "single_updates"] += 1
+
+        if written and self.drainer is not None:
+            self.drainer.wake()
+        return written
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "running": self._task is not None,
+            "window_seconds": self.window_seconds,
+            "max_per_hour": self.max_per_hour,
+            "pending_events": self.outbox.digest_pending_count(),
+            **self.counters,
+        }
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"❌ Notification digest flush failed: {str(e)}")
+
+    def _message(self, user: str, events: List[Dict[str, Any]], now: float):
+        if len(events) == 1 and len(events[0]["changes"]) == 1:
+            event = events[0]
+            old_status, new_status = event["changes"][0]
+            return (
+                project_update_key(event["project_id"], old_status, new_status, event["request_id"], event["first_at"]),
+                project_update_message(event["project"], old_status, new_status, event["update_message"]),
+            )
+
+        items = []
+        for event in events:
+            chain = [event["changes"][0][0]]
+            for old_status, new_status in event["changes"]:
+                if old_status != chain[-1]:
+                    chain.append(old_status)
+                chain.append(new_status)
+            items.append({
+                "project_name": event["project"]["project_name"],
+                "client_name": event["project"].get("client_name"),
+                "statuses": chain,
+                "update_message": event["update_message"],
+            })
+
+        digest_id = hashlib.blake2b(
+            "\n".join(
+                project_update_key(event["project_id"], old_status, new_status, now=event["first_at"])
+                for event in events for old_status, new_status in event["changes"]
+            ).encode(),
+            digest_size=12,
+        ).hexdigest()
+        owner = events[0]["project"]["users"]
+        change_count = sum(len(event["changes"]) for event in events)
+        return f"project_digest:{user}:{digest_id}", {
+            "to_email": owner["email"],
+            "to_name": owner.get("name") or "",
+            "subject": f"📊 Project Updates: {change_count} status changes across {len(events)} project{'s' if len(events) != 1 else ''}",
+            "template": DIGEST_TEMPLATE,
+            "template_data": {
+                "user_name": owner.get("name") or "there",
+                "items": items[:self.max_items],
+                "more_count": max(len(items) - self.max_items, 0),
+                "change_count": change_count,
+                "current_time": datetime.fromtimestamp(now, self.timezone).strftime('%Y-%m-%d %H:%M:%S'),
+            },
+            "email_type": "project_digest",
+        }
+
+    def _fetch_projects(self, project_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        rows = {}
+        for start in range(0, len(project_ids), PAGE_SIZE):
+            response = self.supabase.table("projects").select(DIGEST_COLUMNS).in_(
+                "project_id", project_ids[start:start + PAGE_SIZE]
+            ).execute()
+            for row in response.data or []:
+                rows[str(row["project_id"])] = row
+        return rows
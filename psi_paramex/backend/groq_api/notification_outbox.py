@@ -0,0 +1,491 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    to_email TEXT NOT NULL,
+    to_name TEXT,
+    subject TEXT NOT NULL,
+    template TEXT NOT NULL,
+    template_data TEXT NOT NULL,
+    email_type TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    lease_until REAL,
+    message_id TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (state, next_attempt_at);
+CREATE TABLE IF NOT EXISTS digest_pending (
+    project_id TEXT PRIMARY KEY,
+    changes TEXT NOT NULL,
+    update_message TEXT NOT NULL DEFAULT '',
+    first_at REAL NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1,
+    project TEXT,
+    user_key TEXT,
+    request_id TEXT
+);
+CREATE TABLE IF NOT EXISTS digest_requests (
+    request_key TEXT PRIMARY KEY,
+    seen_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS digest_sent (
+    user_key TEXT NOT NULL,
+    sent_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS digest_sent_user ON digest_sent (user_key, sent_at);
+"""
+
+COLUMNS = "id, idempotency_key, to_email, to_name, subject, template, template_data, email_type, attempts"
+
+# Window of the per-user digest send cap
+DIGEST_CAP_WINDOW_SECONDS = 3600.0
+
+
+# Without a client request id, a status change is deduplicated within this window only
+DEDUPE_BUCKET_SECONDS = float(os.getenv("NOTIFICATION_DEDUPE_BUCKET_SECONDS", "600"))
+
+
+def project_update_key(project_id: str, old_status: str, new_status: str,
+                       request_id: Optional[str] = None, now: Optional[float] = None) -> str:
+    """
+    Dedupe key of a status change notification
+
+    A client-supplied request id identifies the change, so retries of that
+    request send one email. Without one, repeats of the same transition are
+    merged within a DEDUPE_BUCKET_SECONDS time bucket, and a genuine repeat
+    later (To Do -> In Progress -> To Do -> In Progress) gets a new key.
+    """
+    if request_id:
+        return f"project_update:{project_id}:{old_status}:{new_status}:request:{request_id}"
+    bucket = int((now if now is not None else time.time()) // DEDUPE_BUCKET_SECONDS)
+    return f"project_update:{project_id}:{old_status}:{new_status}:{bucket}"
+
+
+def user_event_key(event: str, user: str) -> str:
+    return f"{event}:{user.strip().lower()}"
+
+
+class NotificationOutbox:
+    """
+    Transactional outbox for notification emails in a local SQLite file.
+
+    Every notification is written as a row keyed by an idempotency key; the
+    UNIQUE index makes a duplicate submit a single indexed lookup that inserts
+    nothing. Rows are claimed in batches under a lease, so a process that dies
+    mid-send leaves rows that are picked up again once the lease expires.
+    Delivered rows are kept for the retention window, which is also how long
+    a key deduplicates.
+
+    The same file buffers status changes waiting for a digest
+    (digest_pending) and the digest send times behind the per-user cap
+    (digest_sent), so buffered changes survive a crash and every worker
+    process shares one buffer and one cap.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("NOTIFICATION_OUTBOX_PATH", "notification_outbox.db")
+        self.max_attempts = int(os.getenv("NOTIFICATION_OUTBOX_MAX_ATTEMPTS", "6"))
+        self.backoff_base = float(os.getenv("NOTIFICATION_OUTBOX_BACKOFF_SECONDS", "5"))
+        self.backoff_max = float(os.getenv("NOTIFICATION_OUTBOX_BACKOFF_MAX_SECONDS", "900"))
+        self.retention_seconds = float(os.getenv("NOTIFICATION_OUTBOX_RETENTION_DAYS", "7")) * 86400
+        self._local = threading.local()
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def add(self, idempotency_key: str, message: Dict[str, Any]) -> Tuple[int, bool]:
+        """
+        Record a notification unless its idempotency key was seen before
+
+        Args:
+            idempotency_key: Dedupe key (see project_update_key / user_event_key)
+            message: to_email, to_name, subject, template, template_data, email_type
+
+        Returns:
+            Outbox row id and whether a new row was created
+        """
+        return self._insert(self._connection(), idempotency_key, message, time.time())
+
+    def add_many(self, items: List[Tuple[str, Dict[str, Any]]]) -> List[Tuple[int, bool]]:
+        """Record many (idempotency_key, message) notifications in one transaction, with add's semantics"""
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            added = [self._insert(conn, idempotency_key, message, now) for idempotency_key, message in items]
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return added
+
+    def _insert(self, conn: sqlite3.Connection, idempotency_key: str, message: Dict[str, Any], now: float) -> Tuple[int, bool]:
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO outbox (idempotency_key, to_email, to_name, subject, template, template_data, "
+            "email_type, next_attempt_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                idempotency_key,
+                message["to_email"],
+                message.get("to_name", ""),
+                message["subject"],
+                message["template"],
+                json.dumps(message.get("template_data", {}), default=str),
+                message.get("email_type", "notification"),
+                now, now, now,
+            ),
+        )
+        if cursor.rowcount:
+            return cursor.lastrowid, True
+
+        row = conn.execute("SELECT id FROM outbox WHERE idempotency_key = ?", (idempotency_key,)).fetchone()
+        return row[0], False
+
+    def claim_batch(self, limit: int, lease_seconds: float = 60.0) -> List[Dict[str, Any]]:
+        """Lease up to limit due rows, including rows whose previous lease expired"""
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                f"SELECT {COLUMNS} FROM outbox WHERE state = 'pending' AND next_attempt_at <= ? "
+                f"UNION ALL SELECT {COLUMNS} FROM outbox WHERE state = 'sending' AND next_attempt_at <= ? "
+                "ORDER BY id LIMIT ?",
+                (now, now, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE outbox SET state = 'sending', attempts = attempts + 1, lease_until = ?, "
+                "next_attempt_at = ?, updated_at = ? WHERE id = ?",
+                [(now + lease_seconds, now + lease_seconds, now, row[0]) for row in rows],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        return [
+            {
+                "id": row[0],
+                "idempotency_key": row[1],
+                "to_email": row[2],
+                "to_name": row[3],
+                "subject": row[4],
+                "template": row[5],
+                "template_data": json.loads(row[6]),
+                "email_type": row[7],
+                "attempts": row[8] + 1,
+            }
+            for row in rows
+        ]
+
+    def complete(self, results: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> None:
+        """Record transport results for claimed rows in one transaction"""
+        now = time.time()
+        sent, failed = [], []
+        for row, result in results:
+            if result.get("success"):
+                sent.append((result.get("message_id"), now, row["id"]))
+                continue
+
+            error = result.get("error", "Unknown error")
+            if result.get("retryable", True) and row["attempts"] < self.max_attempts:
+                delay = min(self.backoff_base * 2 ** (row["attempts"] - 1), self.backoff_max)
+                failed.append(("pending", error, now + delay * random.uniform(0.5, 1.0), now, row["id"]))
+            else:
+                failed.append(("dead", error, now, now, row["id"]))
+                logger.error("Outbox notification %s failed permanently: %s", row['idempotency_key'], error)
+
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "UPDATE outbox SET state = 'sent', message_id = ?, error = NULL, lease_until = NULL, "
+                "updated_at = ? WHERE id = ?",
+                sent,
+            )
+            conn.executemany(
+                "UPDATE outbox SET state = ?, error = ?, next_attempt_at = ?, lease_until = NULL, "
+                "updated_at = ? WHERE id = ?",
+                failed,
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def prune(self) -> int:
+        """Drop delivered and dead rows older than the retention window"""
+        now = time.time()
+        conn = self._connection()
+        conn.execute("DELETE FROM digest_sent WHERE sent_at < ?", (now - DIGEST_CAP_WINDOW_SECONDS,))
+        conn.execute("DELETE FROM digest_requests WHERE seen_at < ?", (now - self.retention_seconds,))
+        cursor = conn.execute(
+            "DELETE FROM outbox WHERE state IN ('sent', 'dead') AND updated_at < ?",
+            (now - self.retention_seconds,),
+        )
+        return cursor.rowcount
+
+    # Digest buffer
+
+    def buffer_digest_event(self, project_id: str, old_status: str, new_status: str, update_message: str = "",
+                            now: Optional[float] = None, request_id: Optional[str] = None) -> Tuple[str, int]:
+        """
+        Add a status change to its project's pending digest entry
+
+        A client request id is remembered for the retention window, so a
+        retry of the request is a duplicate even after its digest was sent,
+        while a new request repeating an earlier transition is a new change.
+        Without one, a transition already in the pending entry is a duplicate.
+
+        Returns:
+            "added", "coalesced" or "duplicate", and the number of buffered projects
+        """
+        now = now if now is not None else time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            retried = bool(request_id) and conn.execute(
+                "INSERT OR IGNORE INTO digest_requests (request_key, seen_at) VALUES (?, ?)",
+                (f"{project_id}:{request_id}", now),
+            ).rowcount == 0
+            row = conn.execute(
+                "SELECT changes, update_message FROM digest_pending WHERE project_id = ?", (project_id,)
+            ).fetchone()
+            if retried:
+                outcome = "duplicate"
+            elif row is None:
+                conn.execute(
+                    "INSERT INTO digest_pending (project_id, changes, update_message, first_at, request_id) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (project_id, json.dumps([[old_status, new_status]]), update_message or "", now, request_id),
+                )
+                outcome = "added"
+            else:
+                changes = json.loads(row[0])
+                if not request_id and [old_status, new_status] in changes:
+                    outcome = "duplicate"
+                else:
+                    changes.append([old_status, new_status])
+                    # The version tells a flush that read the entry earlier that it changed since
+                    conn.execute(
+                        "UPDATE digest_pending SET changes = ?, update_message = ?, version = version + 1 "
+                        "WHERE project_id = ?",
+                        (json.dumps(changes), update_message or row[1], project_id),
+                    )
+                    outcome = "coalesced"
+            pending = conn.execute("SELECT COUNT(*) FROM digest_pending").fetchone()[0]
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return outcome, pending
+
+    def digest_events(self) -> List[Dict[str, Any]]:
+        """Pending digest entries in arrival order; project and user are None until resolved"""
+        rows = self._connection().execute(
+            "SELECT project_id, changes, update_message, first_at, version, project, user_key, request_id "
+            "FROM digest_pending ORDER BY first_at"
+        ).fetchall()
+        return [
+            {
+                "project_id": row[0],
+                "changes": [tuple(change) for change in json.loads(row[1])],
+                "update_message": row[2],
+                "first_at": row[3],
+                "version": row[4],
+                "project": json.loads(row[5]) if row[5] else None,
+                "user": row[6],
+                "request_id": row[7],
+            }
+            for row in rows
+        ]
+
+    def resolve_digest_events(self, projects: Dict[str, Dict[str, Any]], unknown: List[str]) -> None:
+        """Store looked-up project + owner rows on pending entries and drop entries that cannot be sent"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "UPDATE digest_pending SET project = ?, user_key = ? WHERE project_id = ?",
+                [
+                    (json.dumps(row, default=str), row["users"]["email"].strip().lower(), project_id)
+                    for project_id, row in projects.items()
+                ],
+            )
+            conn.executemany("DELETE FROM digest_pending WHERE project_id = ?", [(project_id,) for project_id in unknown])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def commit_digest(self, user: str, entries: List[Tuple[str, int]], idempotency_key: str,
+                      message: Dict[str, Any], now: float, max_per_hour: Optional[int] = None) -> str:
+        """
+        Turn pending entries into one outbox email in a single transaction
+
+        Args:
+            user: Owner key (lower-cased email)
+            entries: (project_id, version) of the entries the message was built from
+            idempotency_key: Outbox key of the email
+            message: Outbox message
+            now: Send time
+            max_per_hour: Per-user cap checked against digest_sent; None skips it
+
+        Returns:
+            "written", "duplicate" (key seen before), "capped", or "stale" when an
+            entry changed or was sent by another worker since it was read
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            outcome = None
+            if max_per_hour is not None:
+                sent = conn.execute(
+                    "SELECT COUNT(*) FROM digest_sent WHERE user_key = ? AND sent_at > ?",
+                    (user, now - DIGEST_CAP_WINDOW_SECONDS),
+                ).fetchone()[0]
+                if sent >= max_per_hour:
+                    outcome = "capped"
+            if outcome is None:
+                removed = sum(
+                    conn.execute("DELETE FROM digest_pending WHERE project_id = ? AND version = ?", entry).rowcount
+                    for entry in entries
+                )
+                if removed != len(entries):
+                    outcome = "stale"
+            if outcome is not None:
+                conn.execute("ROLLBACK")
+                return outcome
+
+            _, created = self._insert(conn, idempotency_key, message, now)
+            conn.execute("INSERT INTO digest_sent (user_key, sent_at) VALUES (?, ?)", (user, now))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return "written" if created else "duplicate"
+
+    def digest_pending_count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM digest_pending").fetchone()[0]
+
+    def get(self, outbox_id: int) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            "SELECT id, idempotency_key, to_email, subject, state, attempts, message_id, error, created_at, updated_at "
+            "FROM outbox WHERE id = ?",
+            (outbox_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        keys = ("id", "idempotency_key", "to_email", "subject", "state", "attempts", "message_id", "error",
+                "created_at", "updated_at")
+        return dict(zip(keys, row))
+
+    def status(self) -> Dict[str, Any]:
+        counts = dict(self._connection().execute("SELECT state, COUNT(*) FROM outbox GROUP BY state").fetchall())
+        return {"path": self.path, **{state: counts.get(state, 0) for state in ("pending", "sending", "sent", "dead")}}
+
+
+class OutboxDrainer:
+    """
+    Background task that delivers outbox rows in batches through the email
+    queue's transport and records the outcome on each row.
+    """
+
+    def __init__(self, outbox: NotificationOutbox, transport_source, templates):
+        self.outbox = outbox
+        self.transport_source = transport_source
+        self.templates = templates
+        self.batch_size = int(os.getenv("NOTIFICATION_OUTBOX_BATCH_SIZE", "50"))
+        self.poll_interval = float(os.getenv("NOTIFICATION_OUTBOX_POLL_SECONDS", "2"))
+        self.prune_interval = 3600.0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.delivered = 0
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+            logger.info("Notification outbox drainer started (%s)", self.outbox.path)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def wake(self) -> None:
+        """Deliver new rows now instead of at the next poll"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def drain_once(self) -> int:
+        rows = await asyncio.to_thread(self.outbox.claim_batch, self.batch_size)
+        if not rows:
+            return 0
+
+        messages, ready, results = [], [], []
+        for row in rows:
+            try:
+                html_content = self.templates.render(row["template"], row["template_data"])
+            except Exception as e:
+                results.append((row, {"success": False, "error": f"Render failed: {str(e)}", "retryable": False}))
+                continue
+            messages.append({**row, "html_content": html_content})
+            ready.append(row)
+
+        if messages:
+            try:
+                sent = await self.transport_source.transport.send_batch(messages)
+            except Exception as e:
+                sent = [{"success": False, "error": str(e), "retryable": True}] * len(messages)
+            results.extend(zip(ready, sent))
+            # Rows the transport returned no result for are unconfirmed; retry them instead of
+            # leaving them in 'sending' until the lease expires
+            missing = {"success": False, "error": f"No delivery result ({len(sent)} of {len(ready)} returned)", "retryable": True}
+            results.extend((row, missing) for row in ready[len(sent):])
+            self.delivered += sum(1 for result in sent if result.get("success"))
+
+        await asyncio.to_thread(self.outbox.complete, results)
+        return len(rows)
+
+    async def _run(self) -> None:
+        last_prune = 0.0
+        while True:
+            try:
+                while await self.drain_once() == self.batch_size:
+                    pass
+                if time.monotonic() - last_prune > self.prune_interval:
+                    await asyncio.to_thread(self.outbox.prune)
+                    last_prune = time.monotonic()
+            except Exception as e:
+                logger.error("Outbox drain failed: %s", e)
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
@@ -1,16 +1,61 @@
+import asyncio
+import os
 from datetime import datetime
 import pytz
-from typing import Dict, Any
-from supabase_email_service import EmailData
-from supabase import Client
+from typing import TYPE_CHECKING, Dict, Any, List
+from supabase_email_service import EmailData, PROJECT_UPDATE_TEMPLATE, WELCOME_TEMPLATE
+from notification_outbox import NotificationOutbox, OutboxDrainer, project_update_key, user_event_key
+
+if TYPE_CHECKING:  # supabase is imported by the service container on first use
+    from supabase import Client
+
+PAGE_SIZE = 1000
+
+# Maximum items accepted by one bulk notification call
+BULK_MAX_ITEMS = int(os.getenv("NOTIFICATION_BULK_MAX_ITEMS", "500"))
+
+def project_update_message(project: Dict[str, Any], old_status: str, new_status: str, update_message: str = "") -> Dict[str, Any]:
+    """Outbox message for one status change of a project row joined with its user"""
+    return {
+        "to_email": project['users']['email'],
+        "to_name": project['users'].get('name') or "",
+        "subject": f"📊 Project Update: {project['project_name']} status changed",
+        "template": PROJECT_UPDATE_TEMPLATE,
+        "template_data": {
+            "user_name": project['users'].get('name') or "there",
+            "project_name": project['project_name'],
+            "client_name": project.get('client_name'),
+            "old_status": old_status,
+            "new_status": new_status,
+            "update_message": update_message,
+            "current_time": datetime.now(pytz.timezone('Asia/Jakarta')).strftime('%Y-%m-%d %H:%M:%S')
+        },
+        "email_type": "project_update"
+    }
 
 class NotificationScheduler:
-    def __init__(self, supabase_client: Client, email_service=None):
+    def __init__(self, supabase_client: "Client", email_service=None, outbox: NotificationOutbox = None,
+                 drainer: OutboxDrainer = None):
         self.supabase = supabase_client
         self.email_service = email_service
+        self.outbox = outbox
+        self.drainer = drainer
         print("✅ Notification scheduler initialized")
     
-    async def send_project_status_update(self, project_id: str, old_status: str, new_status: str, update_message: str = ""):
+    def _record(self, idempotency_key: str, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Write a notification to the outbox; a repeated key returns the original row"""
+        outbox_id, created = self.outbox.add(idempotency_key, message)
+        if created and self.drainer is not None:
+            self.drainer.wake()
+        return {
+            "success": True,
+            "message_id": f"outbox_{outbox_id}",
+            "outbox_id": outbox_id,
+            "duplicate": not created
+        }
+    
+    async def send_project_status_update(self, project_id: str, old_status: str, new_status: str, update_message: str = "",
+                                         request_id: str = None):
         """Send email notification when project status changes"""
         try:
             if not self.supabase:
@@ -34,20 +79,17 @@ class NotificationScheduler:
                 return {"success": False, "error": "Project not found"}
             
             project = response.data
-            subject = f"📊 Project Update: {project['project_name']} status changed"
+            result = self._record(
+                project_update_key(project_id, old_status, new_status, request_id),
+                project_update_message(project, old_status, new_status, update_message)
+            )
             
-            # For now, just log the update (actual email templates will be added later)
-            print(f"📧 Project update notification:")
+            print(f"📧 Project update notification {'already recorded' if result['duplicate'] else 'queued'}:")
             print(f"   To: {project['users']['email']}")
             print(f"   Project: {project['project_name']}")
             print(f"   Status: {old_status} → {new_status}")
-            print(f"   Message: {update_message}")
             
-            return {
-                "success": True,
-                "message_id": f"update_{datetime.now().timestamp()}",
-                "note": "Project update logged successfully"
-            }
+            return {**result, "note": "Project update email queued"}
             
         except Exception as e:
             print(f"❌ Error sending status update: {str(e)}")
@@ -59,20 +101,150 @@ class NotificationScheduler:
             if not self.email_service:
                 return {"success": False, "error": "Email service not available"}
             
-            print(f"🎉 Welcome email notification:")
+            result = self._record(user_event_key("welcome", user_id or user_email), {
+                "to_email": user_email,
+                "to_name": user_name,
+                "subject": "🎉 Welcome to ParameX!",
+                "template": WELCOME_TEMPLATE,
+                "template_data": {"user_name": user_name, "user_email": user_email},
+                "email_type": "welcome"
+            })
+            
+            print(f"🎉 Welcome email {'already recorded' if result['duplicate'] else 'queued'}:")
             print(f"   To: {user_email}")
             print(f"   Name: {user_name}")
-            print(f"   Message: Welcome to ParameX!")
             
-            return {
-                "success": True,
-                "message_id": f"welcome_{datetime.now().timestamp()}",
-                "note": "Welcome email logged successfully"
-            }
+            return {**result, "note": "Welcome email queued"}
             
         except Exception as e:
             print(f"❌ Error sending welcome email: {str(e)}")
             return {"success": False, "error": str(e)}
 
+    async def send_project_status_updates(self, updates: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Send status update emails for many projects with one project + user lookup
+        
+        Args:
+            updates: Items with project_id, old_status, new_status and optional update_message and request_id
+        
+        Returns:
+            Per-item results in request order plus queued/duplicate/failed counts
+        """
+        try:
+            if not self.supabase:
+                return {"success": False, "error": "Database not available"}
+            
+            if not self.email_service:
+                return {"success": False, "error": "Email service not available"}
+            
+            project_ids = list(dict.fromkeys(str(update["project_id"]) for update in updates))
+            projects = await asyncio.to_thread(self._fetch_projects, project_ids)
+            
+            results: List[Dict[str, Any]] = []
+            pending = []
+            for update in updates:
+                project = projects.get(str(update["project_id"]))
+                result = {"project_id": update["project_id"]}
+                results.append(result)
+                if project is None:
+                    result.update(success=False, error="Project not found")
+                    continue
+                
+                message = project_update_message(
+                    project, update["old_status"], update["new_status"], update.get("update_message") or ""
+                )
+                pending.append((result, project_update_key(update["project_id"], update["old_status"], update["new_status"], update.get("request_id")), message))
+            
+            return self._record_many(results, pending)
+            
+        except Exception as e:
+            print(f"❌ Error sending bulk status updates: {str(e)}")
+            return {"success": False, "error": str(e)}
+    
+    async def send_welcome_emails(self, users: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Send welcome emails to many users, looking up missing names with one query
+        
+        Args:
+            users: Items with user_email and optional user_name
+        
+        Returns:
+            Per-item results in request order plus queued/duplicate/failed counts
+        """
+        try:
+            if not self.email_service:
+                return {"success": False, "error": "Email service not available"}
+            
+            missing = list(dict.fromkeys(user["user_email"] for user in users if not user.get("user_name")))
+            names = await asyncio.to_thread(self._fetch_user_names, missing) if missing and self.supabase else {}
+            
+            results: List[Dict[str, Any]] = []
+            pending = []
+            for user in users:
+                user_email = user["user_email"]
+                user_name = user.get("user_name") or names.get(user_email.strip().lower()) or ""
+                result = {"user_email": user_email}
+                results.append(result)
+                pending.append((result, user_event_key("welcome", user_email), {
+                    "to_email": user_email,
+                    "to_name": user_name,
+                    "subject": "🎉 Welcome to ParameX!",
+                    "template": WELCOME_TEMPLATE,
+                    "template_data": {"user_name": user_name, "user_email": user_email},
+                    "email_type": "welcome"
+                }))
+            
+            return self._record_many(results, pending)
+            
+        except Exception as e:
+            print(f"❌ Error sending bulk welcome emails: {str(e)}")
+            return {"success": False, "error": str(e)}
+    
+    def _record_many(self, results: List[Dict[str, Any]], pending: List[tuple]) -> Dict[str, Any]:
+        """Write prepared notifications to the outbox in one transaction and fill in their results"""
+        added = self.outbox.add_many([(key, message) for _, key, message in pending]) if pending else []
+        for (result, _, _), (outbox_id, created) in zip(pending, added):
+            result.update(success=True, message_id=f"outbox_{outbox_id}", outbox_id=outbox_id, duplicate=not created)
+        
+        queued = sum(1 for _, created in added if created)
+        if queued and self.drainer is not None:
+            self.drainer.wake()
+        
+        print(f"📧 Bulk notifications: {queued} queued, {len(added) - queued} already recorded, {len(results) - len(added)} failed")
+        return {
+            "success": True,
+            "results": results,
+            "queued": queued,
+            "duplicates": len(added) - queued,
+            "failed": len(results) - len(added)
+        }
+    
+    def _fetch_projects(self, project_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        projects = {}
+        for start in range(0, len(project_ids), PAGE_SIZE):
+            response = self.supabase.table("projects").select(
+                """
+                project_id,
+                project_name,
+                client_name,
+                user_id,
+                users!inner ( email, name )
+                """
+            ).in_("project_id", project_ids[start:start + PAGE_SIZE]).execute()
+            for project in response.data or []:
+                projects[str(project["project_id"])] = project
+        return projects
+    
+    def _fetch_user_names(self, emails: List[str]) -> Dict[str, str]:
+        names = {}
+        for start in range(0, len(emails), PAGE_SIZE):
+            response = self.supabase.table("users").select("email, name").in_(
+                "email", emails[start:start + PAGE_SIZE]
+            ).execute()
+            for user in response.data or []:
+                if user.get("name"):
+                    names[user["email"].strip().lower()] = user["name"]
+        return names
+
 # Global scheduler instance
 notification_scheduler = None 
\ No newline at end of file
@@ -0,0 +1,375 @@
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import date
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+from scoring_config import ScoringConfigStore, scoring_config_store
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+DIFFICULTY_LEVELS = ("Medium", "High")  # "Low" is the baseline level
+TYPE_BUCKETS = 8
+DEFAULT_DURATION_MONTHS = 1.0
+FEATURE_COUNT = 1 + len(DIFFICULTY_LEVELS) + TYPE_BUCKETS + 1
+BATCH_CHUNK_ROWS = 20000
+PAGE_SIZE = 1000
+
+COMPLETED_PROJECT_COLUMNS = """
+    project_id,
+    user_id,
+    payment_amount,
+    difficulty_level,
+    start_date,
+    deadline,
+    type_id:type_id ( type_name ),
+    status_id!inner ( status_name )
+"""
+
+
+def project_features(project: Dict[str, Any], out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Build the regression feature vector for a project
+
+    Accepts raw Supabase rows, the formatted rows returned by
+    /api/user-projects and analyze-project request data. ``out`` may be a
+    zeroed row of a preallocated design matrix.
+    """
+    features = np.zeros(FEATURE_COUNT) if out is None else out
+    features[0] = 1.0  # Intercept
+
+    difficulty = _field(project, "difficulty_level", "difficulty")
+    if difficulty in DIFFICULTY_LEVELS:
+        features[1 + DIFFICULTY_LEVELS.index(difficulty)] = 1.0
+
+    project_type = _field(project, "type_id", "type", "project_type")
+    if isinstance(project_type, dict):
+        project_type = project_type.get("type_name")
+    if project_type and project_type != "Unknown":
+        bucket = zlib.crc32(str(project_type).lower().encode("utf-8")) % TYPE_BUCKETS
+        features[1 + len(DIFFICULTY_LEVELS) + bucket] = 1.0
+
+    features[-1] = _duration_months(project)
+    return features
+
+
+class UserPricingModel:
+    """
+    Ridge regression of payment on project features for one user.
+
+    Keeps the sufficient statistics (XᵀX, Xᵀy, yᵀy) so a newly completed
+    project is a rank-one update followed by a tiny solve.
+    """
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.xtx = np.zeros((FEATURE_COUNT, FEATURE_COUNT))
+        self.xty = np.zeros(FEATURE_COUNT)
+        self.yty = 0.0
+        self.samples = 0
+        self.project_ids: Set[str] = set()
+        self.coefficients: Optional[np.ndarray] = None
+        self.residual_std: Optional[float] = None
+        self.fitted_at: Optional[float] = None
+
+    def add(self, features: np.ndarray, payment: float, project_id: Optional[str] = None) -> bool:
+        """Accumulate one completed project; returns False for an already-seen project"""
+        if project_id is not None:
+            if project_id in self.project_ids:
+                return False
+            self.project_ids.add(project_id)
+
+        self.xtx += np.outer(features, features)
+        self.xty += features * payment
+        self.yty += payment * payment
+        self.samples += 1
+        return True
+
+    def solve(self, ridge_lambda: float) -> None:
+        """Refit coefficients from the accumulated statistics"""
+        if not self.samples:
+            self.coefficients = None
+            return
+
+        self.coefficients = np.linalg.solve(self.xtx + ridge_lambda * _ridge_penalty(), self.xty)
+        self._update_residual_std()
+        self.fitted_at = time.time()
+
+    def predict(self, features: np.ndarray) -> Optional[float]:
+        if self.coefficients is None:
+            return None
+        return float(features @ self.coefficients)
+
+    def _update_residual_std(self) -> None:
+        w = self.coefficients
+        rss = self.yty - 2 * w @ self.xty + w @ self.xtx @ w
+        self.residual_std = float(np.sqrt(max(rss, 0.0) / self.samples))
+
+
+class PricingCalibrator:
+    """
+    Per-user pricing calibration fitted from completed ("Done") projects.
+
+    Fitted models are kept in a bounded LRU cache. A user's history is loaded
+    from Supabase on first use, projects completing later are folded in
+    incrementally, and ``refit_all`` rebuilds every user in one vectorized pass.
+    """
+
+    def __init__(
+        self,
+        supabase_client: "Client" = None,
+        config_store: ScoringConfigStore = None,
+        max_users: Optional[int] = None,
+    ):
+        self.supabase = supabase_client
+        self.config_store = config_store or scoring_config_store
+        self.max_users = max_users or int(os.getenv("PRICING_CALIBRATION_CACHE_SIZE", "10000"))
+        self._models: "OrderedDict[str, UserPricingModel]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_model(self, user_id: str, load: bool = True) -> Optional[UserPricingModel]:
+        """Return the user's model, loading their history from Supabase on a cache miss"""
+        with self._lock:
+            model = self._models.get(user_id)
+            if model is not None:
+                self._models.move_to_end(user_id)
+                return model
+
+        if not load or not self.supabase:
+            return None
+
+        return self.refit_user(user_id)
+
+    def fit_user(self, user_id: str, projects: Iterable[Dict[str, Any]]) -> UserPricingModel:
+        """Fit a user's model from scratch from their completed projects"""
+        model = UserPricingModel(user_id)
+        for project in projects:
+            payment = _payment(project)
+            if payment is not None:
+                model.add(project_features(project), payment, _field(project, "project_id", "id"))
+
+        model.solve(self._ridge_lambda())
+        self._store(model)
+        return model
+
+    def refit_user(self, user_id: str) -> UserPricingModel:
+        """Reload a user's completed projects from Supabase and refit"""
+        if not self.supabase:
+            raise RuntimeError("Database connection not configured")
+        return self.fit_user(user_id, self._fetch_completed_projects(user_id=user_id))
+
+    def observe(self, user_id: str, project: Dict[str, Any]) -> Optional[UserPricingModel]:
+        """Fold a newly completed project into the user's model"""
+        payment = _payment(project)
+        if payment is None:
+            return None
+
+        model = self.get_model(user_id)
+        if model is None:
+            # No history loaded (or no database) - start from this project alone
+            model = UserPricingModel(user_id)
+        elif _field(project, "project_id", "id") in model.project_ids:
+            return model
+
+        with self._lock:
+            if model.add(project_features(project), payment, _field(project, "project_id", "id")):
+                model.solve(self._ridge_lambda())
+        self._store(model)
+        return model
+
+    def observe_completed_project(self, project_id: str) -> Optional[UserPricingModel]:
+        """Fetch a just-completed project and fold it into its owner's model"""
+        if not self.supabase:
+            return None
+
+        rows = self._fetch_completed_projects(project_id=project_id)
+        if not rows:
+            return None
+        return self.observe(rows[0]["user_id"], rows[0])
+
+    def observe_completed_projects(self, project_ids: List[str]) -> int:
+        """Fetch many just-completed projects with one query; returns how many were folded in"""
+        if not self.supabase or not project_ids:
+            return 0
+
+        rows = self._fetch_completed_projects(project_ids=list(dict.fromkeys(project_ids)))
+        return sum(1 for row in rows if self.observe(row["user_id"], row) is not None)
+
+    def predict(self, user_id: str, project_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Predict the payment for a new project from the user's calibrated model"""
+        if not user_id:
+            return None
+
+        model = self.get_model(user_id)
+        if model is None or model.coefficients is None:
+            return None
+
+        predicted = model.predict(project_features(project_data))
+        return {
+            "predicted_payment": predicted,
+            "samples": model.samples,
+            "residual_std": model.residual_std,
+            "fitted_at": model.fitted_at,
+        }
+
+    def fit_batch(self, projects: List[Dict[str, Any]]) -> Dict[str, UserPricingModel]:
+        """
+        Fit models for many users at once
+
+        Rows are grouped by user and the per-user XᵀX / Xᵀy sums are built with
+        chunked segment reductions, then every system is solved in a single
+        batched ``np.linalg.solve`` call.
+        """
+        rows = []
+        for project in projects:
+            payment = _payment(project)
+            if project.get("user_id") and payment is not None:
+                rows.append((project["user_id"], project, payment))
+        if not rows:
+            return {}
+
+        user_ids, user_index = np.unique([row[0] for row in rows], return_inverse=True)
+        X = np.zeros((len(rows), FEATURE_COUNT))
+        for i, (_, project, _) in enumerate(rows):
+            project_features(project, out=X[i])
+        y = np.array([row[2] for row in rows], dtype=float)
+
+        order = np.argsort(user_index, kind="stable")
+        X, y, user_index = X[order], y[order], user_index[order]
+
+        user_count = len(user_ids)
+        xtx = np.zeros((user_count, FEATURE_COUNT, FEATURE_COUNT))
+        xty = np.zeros((user_count, FEATURE_COUNT))
+        yty = np.zeros(user_count)
+        counts = np.zeros(user_count, dtype=np.int64)
+
+        for start in range(0, len(y), BATCH_CHUNK_ROWS):
+            Xc = X[start:start + BATCH_CHUNK_ROWS]
+            yc = y[start:start + BATCH_CHUNK_ROWS]
+            ic = user_index[start:start + BATCH_CHUNK_ROWS]
+
+            segments = np.flatnonzero(np.r_[True, ic[1:] != ic[:-1]])
+            chunk_users = ic[segments]
+            xtx[chunk_users] += np.add.reduceat(Xc[:, :, None] * Xc[:, None, :], segments, axis=0)
+            xty[chunk_users] += np.add.reduceat(Xc * yc[:, None], segments, axis=0)
+            yty[chunk_users] += np.add.reduceat(yc * yc, segments)
+            counts[chunk_users] += np.diff(np.r_[segments, len(ic)])
+
+        coefficients = np.linalg.solve(
+            xtx + self._ridge_lambda() * _ridge_penalty(), xty[..., None]
+        )[..., 0]
+
+        fitted_at = time.time()
+        models = {}
+        for i, user_id in enumerate(user_ids.tolist()):
+            model = UserPricingModel(user_id)
+            model.xtx, model.xty, model.yty = xtx[i], xty[i], float(yty[i])
+            model.samples = int(counts[i])
+            model.coefficients = coefficients[i]
+            model._update_residual_std()
+            model.fitted_at = fitted_at
+            models[user_id] = model
+
+        for row_user, project, _ in rows:
+            project_id = _field(project, "project_id", "id")
+            if project_id is not None:
+                models[row_user].project_ids.add(project_id)
+
+        for model in models.values():
+            self._store(model)
+        return models
+
+    def refit_all(self) -> Dict[str, Any]:
+        """Batch job: refit every user's model from all completed projects"""
+        if not self.supabase:
+            raise RuntimeError("Database connection not configured")
+
+        started = time.perf_counter()
+        projects = self._fetch_completed_projects()
+        fetched = time.perf_counter()
+        models = self.fit_batch(projects)
+        finished = time.perf_counter()
+
+        return {
+            "users": len(models),
+            "projects": len(projects),
+            "fetch_ms": round((fetched - started) * 1000, 1),
+            "fit_ms": round((finished - fetched) * 1000, 1),
+        }
+
+    def status(self) -> Dict[str, Any]:
+        return {"cached_users": len(self._models), "max_users": self.max_users}
+
+    def _fetch_completed_projects(
+        self, user_id: str = None, project_id: str = None, project_ids: List[str] = None
+    ) -> List[Dict[str, Any]]:
+        projects = []
+        offset = 0
+        while True:
+            query = self.supabase.table("projects").select(COMPLETED_PROJECT_COLUMNS).eq(
+                "status_id.status_name", "Done"
+            )
+            if user_id:
+                query = query.eq("user_id", user_id)
+            if project_id:
+                query = query.eq("project_id", project_id)
+            if project_ids:
+                query = query.in_("project_id", project_ids)
+
+            # Offset pages need a stable order, or rows can be skipped or repeated between pages
+            response = query.order("project_id").range(offset, offset + PAGE_SIZE - 1).execute()
+            page = response.data or []
+            projects.extend(page)
+            if len(page) < PAGE_SIZE:
+                return projects
+            offset += PAGE_SIZE
+
+    def _store(self, model: UserPricingModel) -> None:
+        with self._lock:
+            self._models[model.user_id] = model
+            self._models.move_to_end(model.user_id)
+            while len(self._models) > self.max_users:
+                self._models.popitem(last=False)
+
+    def _ridge_lambda(self) -> float:
+        return self.config_store.current().calibration_ridge_lambda
+
+
+def _ridge_penalty() -> np.ndarray:
+    # The intercept is not shrunk
+    penalty = np.eye(FEATURE_COUNT)
+    penalty[0, 0] = 0.0
+    return penalty
+
+
+def _field(project: Dict[str, Any], *names: str) -> Any:
+    for name in names:
+        value = project.get(name)
+        if value is not None:
+            return value
+    return None
+
+
+def _payment(project: Dict[str, Any]) -> Optional[float]:
+    payment = _field(project, "payment_amount", "payment")
+    try:
+        return float(payment) if payment is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _duration_months(project: Dict[str, Any]) -> float:
+    duration_days = project.get("duration_days")
+    if duration_days is None:
+        try:
+            start = date.fromisoformat(str(project["start_date"])[:10])
+            deadline = date.fromisoformat(str(project["deadline"])[:10])
+            duration_days = (deadline - start).days
+        except (KeyError, TypeError, ValueError):
+            return DEFAULT_DURATION_MONTHS
+    return max(float(duration_days), 0.0) / 30.0
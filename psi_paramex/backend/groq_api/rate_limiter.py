@@ -0,0 +1,250 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request
+
+# Endpoint classes: (requests per minute, burst) for each user_id; client IPs
+# get RATE_LIMIT_IP_MULTIPLIER times that since several users can share one
+DEFAULT_LIMITS = {
+    "llm": (20, 5),
+    "email": (10, 5),
+    "default": (120, 30),
+}
+
+
+class MemoryBucketStore:
+    """
+    Token buckets in a bounded in-process LRU.
+
+    A bucket that has been idle long enough to refill completely is the same
+    as a missing one, so idle buckets are evicted from the cold end as new
+    keys arrive, and max_buckets caps memory under a flood of distinct keys.
+    """
+
+    def __init__(self, max_buckets: int = 100000):
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[str, Tuple[float, float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, rate: float, burst: float, now: float, cost: float = 1.0) -> float:
+        """Take cost tokens; returns 0 on success or the seconds until they are available"""
+        with self._lock:
+            tokens, updated, _ = self._buckets.pop(key, (burst, now, 0.0))
+            tokens = min(burst, tokens + (now - updated) * rate)
+
+            if tokens >= cost:
+                tokens -= cost
+                wait = 0.0
+            else:
+                wait = (cost - tokens) / rate
+
+            # Third field: when the bucket will be full again (safe to evict)
+            self._buckets[key] = (tokens, now, now + (burst - tokens) / rate)
+            self._evict(now)
+            return wait
+
+    def refund(self, key: str, burst: float, cost: float = 1.0) -> None:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket:
+                self._buckets[key] = (min(burst, bucket[0] + cost), bucket[1], bucket[2])
+
+    def _evict(self, now: float) -> None:
+        while self._buckets:
+            key, (_, _, full_at) = next(iter(self._buckets.items()))
+            if full_at > now and len(self._buckets) <= self.max_buckets:
+                break
+            del self._buckets[key]
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class SQLiteBucketStore:
+    """
+    Token buckets in a SQLite file shared by all workers on the host.
+
+    Each acquire is one short IMMEDIATE transaction, so concurrent workers
+    serialize on the write lock instead of overspending a bucket; WAL mode
+    keeps readers from blocking. Refilled idle buckets are pruned periodically.
+    """
+
+    PRUNE_INTERVAL = 60.0
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._last_prune = 0.0
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_buckets ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, full_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS rate_buckets_full_at ON rate_buckets (full_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def acquire(self, key: str, rate: float, burst: float, now: float, cost: float = 1.0) -> float:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (burst, now)
+            tokens = min(burst, tokens + max(now - updated, 0) * rate)
+
+            if tokens >= cost:
+                tokens -= cost
+                wait = 0.0
+            else:
+                wait = (cost - tokens) / rate
+
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_buckets (key, tokens, updated, full_at) VALUES (?, ?, ?, ?)",
+                (key, tokens, now, now + (burst - tokens) / rate),
+            )
+            if now - self._last_prune > self.PRUNE_INTERVAL:
+                conn.execute("DELETE FROM rate_buckets WHERE full_at <= ?", (now,))
+                self._last_prune = now
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def refund(self, key: str, burst: float, cost: float = 1.0) -> None:
+        self._connection().execute(
+            "UPDATE rate_buckets SET tokens = MIN(?, tokens + ?) WHERE key = ?", (burst, cost, key)
+        )
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM rate_buckets").fetchone()[0]
+
+
+class RateLimiter:
+    """
+    Per-user and per-IP admission control by endpoint class.
+
+    Limits come from RATE_LIMIT_<CLASS>_PER_MINUTE / RATE_LIMIT_<CLASS>_BURST;
+    RATE_LIMIT_BACKEND=sqlite (with RATE_LIMIT_SQLITE_PATH) shares buckets
+    across worker processes, the default memory backend is per process.
+    """
+
+    def __init__(self, store=None):
+        self.enabled = os.getenv("RATE_LIMIT_ENABLED", "true").lower() != "false"
+        self.ip_multiplier = float(os.getenv("RATE_LIMIT_IP_MULTIPLIER", "3"))
+        self.trust_proxy = os.getenv("RATE_LIMIT_TRUST_PROXY", "false").lower() == "true"
+
+        self.limits: Dict[str, Tuple[float, float]] = {}
+        for endpoint_class, (per_minute, burst) in DEFAULT_LIMITS.items():
+            prefix = f"RATE_LIMIT_{endpoint_class.upper()}"
+            self.limits[endpoint_class] = (
+                float(os.getenv(f"{prefix}_PER_MINUTE", per_minute)) / 60.0,
+                float(os.getenv(f"{prefix}_BURST", burst)),
+            )
+
+        if store is None:
+            if os.getenv("RATE_LIMIT_BACKEND", "memory") == "sqlite":
+                store = SQLiteBucketStore(os.getenv("RATE_LIMIT_SQLITE_PATH", "rate_limits.db"))
+            else:
+                store = MemoryBucketStore(int(os.getenv("RATE_LIMIT_MAX_BUCKETS", "100000")))
+        self.store = store
+        self.rejected = 0
+
+    def check(self, endpoint_class: str, user_id: Optional[str], client_ip: Optional[str]) -> float:
+        """
+        Take one token from the user's and the client IP's bucket
+
+        Returns:
+            0 if the request is admitted, otherwise seconds until retry
+        """
+        if not self.enabled:
+            return 0.0
+
+        rate, burst = self.limits.get(endpoint_class, self.limits["default"])
+        now = time.time()
+
+        ip_key = None
+        if client_ip:
+            ip_key = f"{endpoint_class}:ip:{client_ip}"
+            wait = self.store.acquire(ip_key, rate * self.ip_multiplier, burst * self.ip_multiplier, now)
+            if wait:
+                self.rejected += 1
+                return wait
+
+        if user_id:
+            wait = self.store.acquire(f"{endpoint_class}:user:{user_id}", rate, burst, now)
+            if wait:
+                # Don't charge the IP for a request that was turned away
+                if ip_key:
+                    self.store.refund(ip_key, burst * self.ip_multiplier)
+                self.rejected += 1
+                return wait
+
+        return 0.0
+
+    def client_ip(self, request: Request) -> Optional[str]:
+        if self.trust_proxy:
+            forwarded = request.headers.get("x-forwarded-for")
+            if forwarded:
+                return forwarded.split(",")[0].strip()
+        return request.client.host if request.client else None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.store).__name__,
+            "buckets": len(self.store),
+            "rejected": self.rejected,
+            "limits": {
+                endpoint_class: {"per_minute": round(rate * 60, 2), "burst": burst}
+                for endpoint_class, (rate, burst) in self.limits.items()
+            },
+        }
+
+
+async def _request_user_id(request: Request) -> Optional[str]:
+    user_id = request.path_params.get("user_id") or request.query_params.get("user_id")
+    if user_id or request.method != "POST":
+        return user_id
+    try:
+        # FastAPI has already read the body for the endpoint, so this is cached
+        body = await request.json()
+    except ValueError:
+        return None
+    return body.get("user_id") if isinstance(body, dict) else None
+
+
+def rate_limit(endpoint_class: str):
+    """
+    FastAPI dependency enforcing the endpoint class limits
+
+    Usage:
+        @app.post("/api/chat", dependencies=[Depends(rate_limit("llm"))])
+    """
+    async def dependency(request: Request) -> None:
+        user_id = await _request_user_id(request)
+        wait = rate_limiter.check(endpoint_class, user_id, rate_limiter.client_ip(request))
+        if wait:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests, please slow down",
+                headers={"Retry-After": str(max(1, math.ceil(wait)))},
+            )
+
+    return dependency
+
+
+# Global instance
+rate_limiter = RateLimiter()
@@ -0,0 +1,175 @@
+import asyncio
+import cProfile
+import hmac
+import io
+import logging
+import os
+import pstats
+import random
+import re
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional
+
+try:
+    from pyinstrument import Profiler as SamplingProfiler
+except ImportError:  # optional; falls back to cProfile
+    SamplingProfiler = None
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"
+PROFILE_NAME = re.compile(r"^[0-9]{8}-[0-9]{6}-[0-9a-f]{8}\.(html|prof)$")
+
+
+class RequestProfiler:
+    """
+    Opt-in profiler for individual requests.
+
+    With PROFILER_ENABLED=true a request is profiled when it sends an
+    ``X-Profile: 1`` header (and PROFILER_TOKEN, if set, as
+    ``X-Profile-Token``) or when it is picked by PROFILER_SAMPLE_RATE. The
+    profile is kept only when the request took at least PROFILER_SLOW_MS
+    (header requests are always kept) and is written to PROFILER_DIR for
+    download from /api/profiles, which needs the same token.
+
+    Overhead is bounded: at most one request is profiled at a time (others
+    run unprofiled instead of waiting), and only PROFILER_MAX_FILES
+    profiles are kept on disk. pyinstrument is used when installed, giving
+    a low-overhead sampling profile of the awaited call stack as HTML;
+    otherwise cProfile writes a .prof file (pstats/snakeviz). cProfile
+    traces the whole event loop thread, so while a request is profiled the
+    other requests on that loop run slower and show up in its profile.
+    """
+
+    def __init__(self):
+        self._busy = threading.Lock()
+        self._stored: Deque[Dict[str, Any]] = deque()
+        self.counters = {"profiled": 0, "stored": 0, "discarded_fast": 0, "skipped_busy": 0}
+        self.configure()
+
+    def configure(self) -> None:
+        """(Re)read settings; called again once the service container has loaded .env"""
+        self.enabled = os.getenv("PROFILER_ENABLED", "false").lower() in ("1", "true", "yes")
+        self.token = os.getenv("PROFILER_TOKEN", "")
+        self.sample_rate = float(os.getenv("PROFILER_SAMPLE_RATE", "0"))
+        self.slow_ms = float(os.getenv("PROFILER_SLOW_MS", "500"))
+        self.max_files = int(os.getenv("PROFILER_MAX_FILES", "50"))
+        self.directory = Path(os.getenv("PROFILER_DIR", Path(tempfile.gettempdir()) / "paramex_profiles"))
+        self.engine = "pyinstrument" if SamplingProfiler is not None else "cprofile"
+
+    def authorized(self, headers) -> bool:
+        """Whether a request may trigger or read profiles; always true when PROFILER_TOKEN is unset"""
+        return not self.token or hmac.compare_digest(headers.get("x-profile-token", ""), self.token)
+
+    def wants_profile(self, headers) -> Optional[str]:
+        """
+        Decide whether to profile a request
+
+        Returns:
+            "header" or "sample" when the request should be profiled, else None
+        """
+        if not self.enabled:
+            return None
+        if headers.get(PROFILE_HEADER) == "1" and self.authorized(headers):
+            return "header"
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    async def profile(self, request, call_next, reason: str):
+        """Run the rest of the request under the profiler; the response gets X-Profile-Id when one was stored"""
+        if not self._busy.acquire(blocking=False):
+            self.counters["skipped_busy"] += 1
+            return await call_next(request)
+
+        self.counters["profiled"] += 1
+        profiler = SamplingProfiler(async_mode="enabled") if SamplingProfiler is not None else cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            if SamplingProfiler is not None:
+                profiler.start()
+            else:
+                profiler.enable()
+            try:
+                response = await call_next(request)
+            finally:
+                if SamplingProfiler is not None:
+                    profiler.stop()
+                else:
+                    profiler.disable()
+        finally:
+            self._busy.release()
+
+        duration_ms = (time.perf_counter() - started) * 1000
+        if reason != "header" and duration_ms < self.slow_ms:
+            self.counters["discarded_fast"] += 1
+            return response
+
+        try:
+            name = await asyncio.to_thread(self._store, profiler, request.method, request.url.path, duration_ms, reason)
+            response.headers["X-Profile-Id"] = name
+        except Exception as e:
+            logger.warning("Could not store request profile: %s", e)
+        return response
+
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        return list(reversed(self._stored))
+
+    def profile_path(self, name: str) -> Optional[Path]:
+        """Path of a stored profile, or None for unknown (or unsafe) names"""
+        if not PROFILE_NAME.match(name):
+            return None
+        path = self.directory / name
+        return path if path.exists() else None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "engine": self.engine,
+            "sample_rate": self.sample_rate,
+            "slow_ms": self.slow_ms,
+            "stored_profiles": len(self._stored),
+            **self.counters,
+        }
+
+    def _store(self, profiler, method: str, path: str, duration_ms: float, reason: str) -> str:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        if SamplingProfiler is not None:
+            name = f"{stamp}-{uuid.uuid4().hex[:8]}.html"
+            (self.directory / name).write_text(profiler.output_html(), encoding="utf-8")
+            summary = None
+        else:
+            name = f"{stamp}-{uuid.uuid4().hex[:8]}.prof"
+            stats = pstats.Stats(profiler)
+            stats.dump_stats(str(self.directory / name))
+            text = io.StringIO()
+            stats.stream = text
+            stats.sort_stats("cumulative").print_stats(15)
+            summary = text.getvalue()
+
+        self._stored.append({
+            "name": name,
+            "method": method,
+            "path": path,
+            "duration_ms": round(duration_ms, 1),
+            "reason": reason,
+            "created_at": datetime.now().isoformat(),
+            "summary": summary,
+        })
+        self.counters["stored"] += 1
+        while len(self._stored) > self.max_files:
+            old = self._stored.popleft()
+            (self.directory / old["name"]).unlink(missing_ok=True)
+        logger.info("Stored %s profile %s for %s %s (%.1f ms)", reason, name, method, path, duration_ms)
+        return name
+
+
+# Global profiler instance
+request_profiler = RequestProfiler()
@@ -0,0 +1,154 @@
+import time
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from scoring_config import CompiledScoringConfig
+from scoring_logic import ProjectScorer, project_scorer
+
+PERCENTILES = (50, 80, 95)
+
+
+class RiskSimulator:
+    """
+    Monte Carlo simulation of project cost and finish date.
+
+    The scorer's point estimates are used as distribution centres: hours are
+    lognormal around ``estimated_hours`` (wider for more complex projects), the
+    hourly rate is triangular around the recommended rate, and every assessed
+    risk independently triggers an overrun with a severity-based probability.
+    All scenarios are drawn as NumPy arrays in one pass.
+    """
+
+    def __init__(self, scorer: ProjectScorer = None):
+        self.scorer = scorer or project_scorer
+
+    def simulate(
+        self,
+        project_data: Dict[str, Any],
+        samples: Optional[int] = None,
+        seed: Optional[int] = None,
+        start_date: Optional[str] = None,
+        deadline: Optional[str] = None,
+        hours_per_day: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run the simulation for one project
+
+        Args:
+            project_data: Same fields as the analyze-project request
+            samples: Number of scenarios (clamped to the configured maximum)
+            seed: Fixed seed for reproducible results
+            start_date: ISO date work starts on (defaults to today)
+            deadline: Optional ISO deadline to compute the on-time probability
+            hours_per_day: Working hours per business day
+
+        Returns:
+            Percentiles for hours, cost and finish date plus the point estimate
+        """
+        started = time.perf_counter()
+        config = self.scorer.config
+
+        samples = self._clamp_samples(samples, config)
+        hours_per_day = hours_per_day or config.sim_hours_per_day
+        if hours_per_day <= 0:
+            raise ValueError("hours_per_day must be positive")
+        start = _parse_date(start_date) if start_date else date.today()
+
+        complexity = self.scorer.analyze_project_complexity(project_data, config)
+        risks = self.scorer.assess_project_risks(project_data, config)
+        pricing = self.scorer.generate_pricing_recommendation(
+            project_data, complexity['overall_complexity'], config
+        )
+
+        rng = np.random.default_rng(seed)
+        hours, cost = self._sample_scenarios(rng, samples, complexity, risks, pricing, config)
+
+        hour_percentiles = np.percentile(hours, PERCENTILES)
+        cost_percentiles = np.percentile(cost, PERCENTILES)
+        # Working days are monotone in hours, so their percentiles follow directly
+        day_percentiles = np.ceil(hour_percentiles / hours_per_day)
+        finish_dates = np.busday_offset(
+            np.datetime64(start, "D"), day_percentiles.astype(np.int64), roll="forward"
+        )
+
+        result = {
+            "samples": samples,
+            "seed": seed,
+            "start_date": start.isoformat(),
+            "hours_per_day": hours_per_day,
+            "point_estimate": {
+                "estimated_hours": pricing['estimated_hours'],
+                "total_project_estimate": pricing['total_project_estimate'],
+                "hourly_rate_recommendation": pricing['hourly_rate_recommendation'],
+                "risk_level": risks['risk_level'],
+            },
+            "hours": _percentile_dict(hour_percentiles, 1),
+            "cost": _percentile_dict(cost_percentiles, 0),
+            "working_days": _percentile_dict(day_percentiles, 0),
+            "finish_date": {
+                f"p{p}": str(finish_date) for p, finish_date in zip(PERCENTILES, finish_dates)
+            },
+            "config_version": config.version,
+        }
+
+        if deadline:
+            available_days = np.busday_count(np.datetime64(start, "D"), np.datetime64(_parse_date(deadline), "D"))
+            result["on_time_probability"] = round(float(np.mean(hours <= available_days * hours_per_day)), 4)
+
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return result
+
+    def _sample_scenarios(
+        self,
+        rng: np.random.Generator,
+        samples: int,
+        complexity: Dict[str, Any],
+        risks: Dict[str, Any],
+        pricing: Dict[str, Any],
+        config: CompiledScoringConfig,
+    ):
+        complexity_score = complexity['overall_complexity']
+        sigma = config.sim_hours_sigma_base + config.sim_hours_sigma_per_point * max(complexity_score - 1, 0)
+
+        # Median of the lognormal is the scorer's point estimate
+        hours = pricing['estimated_hours'] * rng.lognormal(0.0, sigma, samples)
+
+        spread = config.sim_rate_spread
+        rate = pricing['hourly_rate_recommendation'] * rng.triangular(1 - spread, 1, 1 + spread, samples)
+
+        delays = [config.sim_risk_delay[risk['severity']] for risk in risks['risks']
+                  if risk['severity'] in config.sim_risk_delay]
+        if delays:
+            probabilities = np.array([probability for probability, _ in delays])
+            overruns = np.array([overrun for _, overrun in delays])
+            triggered = rng.random((len(delays), samples)) < probabilities[:, None]
+            hours *= 1 + overruns @ triggered
+
+        return hours, hours * rate
+
+    def _clamp_samples(self, samples: Optional[int], config: CompiledScoringConfig) -> int:
+        if samples is None:
+            return config.sim_default_samples
+        if samples < 1:
+            raise ValueError("samples must be at least 1")
+        return min(samples, config.sim_max_samples)
+
+
+def _percentile_dict(values: np.ndarray, digits: int) -> Dict[str, float]:
+    return {
+        f"p{p}": round(float(value), digits) if digits else int(round(float(value)))
+        for p, value in zip(PERCENTILES, values)
+    }
+
+
+def _parse_date(value: str) -> date:
+    try:
+        return datetime.strptime(value[:10], '%Y-%m-%d').date()
+    except ValueError as e:
+        raise ValueError(f"Invalid date '{value}', expected YYYY-MM-DD") from e
+
+
+# Global instance
+risk_simulator = RiskSimulator()
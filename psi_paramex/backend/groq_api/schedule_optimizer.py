@@ -0,0 +1,229 @@
+import math
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+from scoring_config import CompiledScoringConfig, ScoringConfigStore, scoring_config_store
+
+# Id of the candidate project in a trial schedule; it cannot collide with a caller's id
+NEW_PROJECT_ID = object()
+
+
+class ScheduleOptimizer:
+    """
+    Capacity-aware priority schedule for a user's active projects.
+
+    Each project is a job whose processing time is its effort (from the
+    difficulty level) divided by the daily capacity, due at its deadline and
+    weighted by its payment. Jobs start in earliest-deadline-first order, which
+    minimizes maximum lateness, and adjacent swaps that lower the total
+    payment-weighted tardiness are then applied until no swap helps.
+    """
+
+    def __init__(self, config_store: ScoringConfigStore = None):
+        self.config_store = config_store or scoring_config_store
+
+    def optimize(
+        self,
+        projects: List[Dict[str, Any]],
+        daily_capacity_hours: Optional[float] = None,
+        today: Optional[date] = None,
+        new_project: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Build a schedule and capacity verdict for active projects
+
+        Args:
+            projects: Active projects (formatted rows from /api/user-projects or raw rows)
+            daily_capacity_hours: Working hours available per day
+            today: Scheduling start date (defaults to today)
+            new_project: Optional candidate project to test ("can I take one more?")
+
+        Returns:
+            Ordered schedule with projected lateness and slack, plus a summary
+        """
+        config = self.config_store.current()
+        capacity = daily_capacity_hours or config.daily_capacity_hours
+        if capacity <= 0:
+            raise ValueError("daily_capacity_hours must be positive")
+        today = today or date.today()
+
+        jobs = [self._job(project, config, capacity, today) for project in projects]
+        ordered = self._sequence(jobs, config.max_improvement_passes)
+        schedule = self._timeline(ordered, today)
+        summary = self._summarize(schedule, capacity, today)
+
+        candidate = new_project if new_project is not None else {}
+        summary["new_project"] = self._evaluate_new_project(
+            jobs, candidate, summary, config, capacity, today
+        )
+        summary["can_take_new_project"] = summary["new_project"]["fits"]
+
+        return {
+            "schedule": schedule,
+            "summary": summary,
+            "daily_capacity_hours": capacity,
+            "start_date": today.isoformat(),
+            "config_version": config.version,
+        }
+
+    def workload_status(self, summary: Dict[str, Any]) -> str:
+        """Classify workload as high / moderate / low from a schedule summary"""
+        if summary["late_projects"] or summary["utilization"] >= 0.9:
+            return "high"
+        if summary["utilization"] >= 0.6:
+            return "moderate"
+        return "low"
+
+    def _job(self, project: Dict[str, Any], config: CompiledScoringConfig, capacity: float, today: date) -> Dict[str, Any]:
+        difficulty = project.get("difficulty") or project.get("difficulty_level")
+        effort = project.get("effort_hours")
+        if effort is None:
+            effort = config.effort_hours.get(difficulty, config.default_effort_hours)
+        effort = float(effort)
+        if effort < 0:
+            raise ValueError("effort_hours must not be negative")
+
+        due = None
+        deadline = project.get("deadline")
+        if deadline:
+            try:
+                due = (date.fromisoformat(str(deadline)[:10]) - today).days
+            except ValueError:
+                due = None
+
+        payment = project.get("payment", project.get("payment_amount")) or 0
+        return {
+            "id": project.get("id", project.get("project_id")),
+            "name": project.get("name", project.get("project_name")),
+            "deadline": deadline,
+            "payment": payment,
+            "difficulty": difficulty,
+            "effort_hours": effort,
+            "duration": effort / capacity,
+            "due": due,
+            "weight": float(payment),
+        }
+
+    def _sequence(self, jobs: List[Dict[str, Any]], max_passes: int) -> List[Dict[str, Any]]:
+        if not jobs:
+            return []
+
+        # Payment weights relative to the mean; a floor keeps unpaid work from being ignored
+        mean_payment = sum(job["weight"] for job in jobs) / len(jobs) or 1.0
+        for job in jobs:
+            job["relative_weight"] = max(job["weight"] / mean_payment, 0.1)
+
+        ordered = sorted(
+            jobs,
+            key=lambda job: (job["due"] is None, job["due"] if job["due"] is not None else 0, -job["relative_weight"]),
+        )
+
+        for _ in range(max_passes):
+            improved = False
+            elapsed = 0.0
+            for i in range(len(ordered) - 1):
+                first, second = ordered[i], ordered[i + 1]
+                keep = (
+                    _weighted_tardiness(first, elapsed + first["duration"])
+                    + _weighted_tardiness(second, elapsed + first["duration"] + second["duration"])
+                )
+                swap = (
+                    _weighted_tardiness(second, elapsed + second["duration"])
+                    + _weighted_tardiness(first, elapsed + second["duration"] + first["duration"])
+                )
+                if swap < keep - 1e-9:
+                    ordered[i], ordered[i + 1] = second, first
+                    improved = True
+                elapsed += ordered[i]["duration"]
+            if not improved:
+                break
+
+        return ordered
+
+    def _timeline(self, ordered: List[Dict[str, Any]], today: date) -> List[Dict[str, Any]]:
+        schedule = []
+        elapsed = 0.0
+        for position, job in enumerate(ordered, 1):
+            start, elapsed = elapsed, elapsed + job["duration"]
+            finish_day = math.ceil(elapsed - 1e-9)
+            lateness = finish_day - job["due"] if job["due"] is not None else None
+
+            schedule.append({
+                "order": position,
+                "id": job["id"],
+                "name": job["name"],
+                "deadline": job["deadline"],
+                "payment": job["payment"],
+                "difficulty": job["difficulty"],
+                "effort_hours": round(job["effort_hours"], 1),
+                "start_date": (today + timedelta(days=math.floor(start))).isoformat(),
+                "finish_date": (today + timedelta(days=finish_day)).isoformat(),
+                "lateness_days": max(lateness, 0) if lateness is not None else 0,
+                "slack_days": max(-lateness, 0) if lateness is not None else None,
+                "on_time": lateness is None or lateness <= 0,
+            })
+        return schedule
+
+    def _summarize(self, schedule: List[Dict[str, Any]], capacity: float, today: date) -> Dict[str, Any]:
+        late = [entry for entry in schedule if not entry["on_time"]]
+        total_effort = sum(entry["effort_hours"] for entry in schedule)
+        slacks = [entry["slack_days"] for entry in schedule if entry["slack_days"] is not None]
+        makespan_days = total_effort / capacity
+
+        # Share of the capacity up to the latest deadline that is already committed
+        horizon_days = max(
+            (_days_until(entry["deadline"], today) for entry in schedule if entry["slack_days"] is not None),
+            default=0,
+        )
+
+        return {
+            "project_count": len(schedule),
+            "total_effort_hours": round(total_effort, 1),
+            "makespan_days": round(makespan_days, 1),
+            "late_projects": len(late),
+            "late_project_names": [entry["name"] for entry in late],
+            "max_lateness_days": max((entry["lateness_days"] for entry in schedule), default=0),
+            "min_slack_days": min(slacks) if slacks else None,
+            "utilization": round(makespan_days / horizon_days, 2) if horizon_days > 0 else (1.0 if schedule else 0.0),
+        }
+
+    def _evaluate_new_project(
+        self,
+        jobs: List[Dict[str, Any]],
+        candidate: Dict[str, Any],
+        summary: Dict[str, Any],
+        config: CompiledScoringConfig,
+        capacity: float,
+        today: date,
+    ) -> Dict[str, Any]:
+        candidate = dict(candidate, id=NEW_PROJECT_ID)
+        candidate.setdefault("name", "New project")
+        if not candidate.get("deadline"):
+            candidate["deadline"] = (today + timedelta(days=config.new_project_lead_days)).isoformat()
+
+        trial_jobs = [dict(job) for job in jobs] + [self._job(candidate, config, capacity, today)]
+        trial = self._timeline(self._sequence(trial_jobs, config.max_improvement_passes), today)
+        trial_late = sum(1 for entry in trial if not entry["on_time"])
+        new_entry = next(entry for entry in trial if entry["id"] is NEW_PROJECT_ID)
+
+        return {
+            "deadline": candidate["deadline"],
+            "effort_hours": new_entry["effort_hours"],
+            "projected_finish_date": new_entry["finish_date"],
+            "additional_late_projects": trial_late - summary["late_projects"],
+            "fits": new_entry["on_time"] and trial_late <= summary["late_projects"],
+        }
+
+
+def _weighted_tardiness(job: Dict[str, Any], completion: float) -> float:
+    if job["due"] is None:
+        return 0.0
+    return job["relative_weight"] * max(completion - job["due"], 0.0)
+
+
+def _days_until(deadline: str, today: date) -> int:
+    return (date.fromisoformat(str(deadline)[:10]) - today).days
+
+
+# Global instance
+schedule_optimizer = ScheduleOptimizer()
@@ -0,0 +1,328 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_right
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+DEFAULT_CONFIG_PATH = Path(__file__).parent / "scoring_config.json"
+
+REQUIRED_COMPLEXITY_FACTORS = (
+    "timeline", "budget", "technical_complexity", "client_experience", "team_size"
+)
+REQUIRED_RISK_KEYWORDS = ("tight_timeline", "low_budget", "scope_uncertainty", "new_technology")
+
+logger = logging.getLogger(__name__)
+
+
+class KeywordMatcher:
+    """
+    Substring matcher for a fixed keyword set, compiled into a single regex.
+
+    Gives the same answer as ``[kw for kw in keywords if kw in text]`` but scans
+    the text once instead of once per keyword.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: Tuple[str, ...] = tuple(dict.fromkeys(kw.lower() for kw in keywords if kw))
+
+        if not self.keywords:
+            self._pattern = None
+            self._implied: Dict[str, FrozenSet[str]] = {}
+            return
+
+        # Longest alternatives first so each start position reports the longest
+        # keyword; shorter keywords it contains are recovered via ``_implied``.
+        alternatives = sorted(self.keywords, key=len, reverse=True)
+        self._pattern = re.compile(
+            "(?=(" + "|".join(re.escape(kw) for kw in alternatives) + "))"
+        )
+        self._implied = {
+            kw: frozenset(other for other in self.keywords if other in kw)
+            for kw in self.keywords
+        }
+
+    def matches(self, text: str) -> FrozenSet[str]:
+        """Return every keyword that occurs in the (already lowercased) text"""
+        if not text or self._pattern is None:
+            return frozenset()
+
+        found = set()
+        for longest in set(self._pattern.findall(text)):
+            found.update(self._implied[longest])
+        return frozenset(found)
+
+    def any_in(self, text: str) -> bool:
+        """Return True if at least one keyword occurs in the text"""
+        return bool(text) and self._pattern is not None and self._pattern.search(text) is not None
+
+
+class CompiledScoringConfig:
+    """
+    Validated, precompiled scoring configuration.
+
+    Instances are never mutated after construction, so a reference obtained
+    from ``ScoringConfigStore.current()`` stays consistent for a whole request.
+    """
+
+    def __init__(self, raw: Dict[str, Any], source: str = "<memory>"):
+        self.source = source
+        self.raw = raw
+        self.version = str(_require(raw, "version", str))
+
+        weights = _require(raw, "complexity_weights", dict)
+        missing = [factor for factor in REQUIRED_COMPLEXITY_FACTORS if factor not in weights]
+        if missing:
+            raise ValueError(f"complexity_weights missing factors: {', '.join(missing)}")
+        self.complexity_weights: Dict[str, float] = {
+            factor: _number(weight, f"complexity_weights.{factor}")
+            for factor, weight in weights.items()
+        }
+        self.weight_items: Tuple[Tuple[str, float], ...] = tuple(self.complexity_weights.items())
+
+        risk_factors = _require(raw, "risk_factors", dict)
+        for name, factor in risk_factors.items():
+            if not isinstance(factor, dict) or "weight" not in factor:
+                raise ValueError(f"risk_factors.{name} must be an object with a weight")
+            _number(factor["weight"], f"risk_factors.{name}.weight")
+        self.risk_factors: Dict[str, Dict[str, Any]] = risk_factors
+
+        tech_keywords = _require(raw, "tech_keywords", dict)
+        self.tech_weights: Dict[str, float] = {
+            keyword.lower(): _number(weight, f"tech_keywords.{keyword}")
+            for keyword, weight in tech_keywords.items()
+        }
+        self.tech_matcher = KeywordMatcher(self.tech_weights)
+
+        budget = _require(raw, "budget_thresholds", dict)
+        bands = sorted(
+            (
+                _number(band.get("below"), "budget_thresholds.bands.below"),
+                _number(band.get("score"), "budget_thresholds.bands.score"),
+            )
+            for band in (_object(band, "budget_thresholds.bands[]") for band in _require(budget, "bands", list))
+        )
+        self.budget_band_limits: List[float] = [below for below, _ in bands]
+        self.budget_band_scores: List[float] = [score for _, score in bands]
+        self.budget_above_score = _number(budget.get("above_score"), "budget_thresholds.above_score")
+        self.budget_unknown_score = _number(budget.get("unknown_score"), "budget_thresholds.unknown_score")
+        self.low_budget_risk_below = _number(
+            budget.get("low_budget_risk_below"), "budget_thresholds.low_budget_risk_below"
+        )
+
+        risk_keywords = _require(raw, "risk_keywords", dict)
+        missing = [name for name in REQUIRED_RISK_KEYWORDS if name not in risk_keywords]
+        if missing:
+            raise ValueError(f"risk_keywords missing entries: {', '.join(missing)}")
+        self.risk_matchers: Dict[str, KeywordMatcher] = {
+            name: KeywordMatcher(_string_list(keywords, f"risk_keywords.{name}"))
+            for name, keywords in risk_keywords.items()
+        }
+
+        pricing = _require(raw, "pricing", dict)
+        self.base_hourly_rate = _number(pricing.get("base_hourly_rate"), "pricing.base_hourly_rate")
+        if self.base_hourly_rate <= 0:
+            raise ValueError("pricing.base_hourly_rate must be positive")
+        self.rate_multiplier_per_point = _number(
+            pricing.get("rate_multiplier_per_point"), "pricing.rate_multiplier_per_point"
+        )
+        self.hours_multiplier_per_point = _number(
+            pricing.get("hours_multiplier_per_point"), "pricing.hours_multiplier_per_point"
+        )
+        self.default_hours = _number(pricing.get("default_hours"), "pricing.default_hours")
+        self.simple_keyword = str(pricing.get("simple_keyword", "simple")).lower()
+
+        self.hour_table: Tuple[Tuple[str, float, float], ...] = tuple(
+            (
+                str(_require(row, "keyword", str)).lower(),
+                _number(row.get("simple_hours"), "pricing.hour_table.simple_hours"),
+                _number(row.get("hours"), "pricing.hour_table.hours"),
+            )
+            for row in _require(pricing, "hour_table", list)
+        )
+        self.hour_matcher = KeywordMatcher(keyword for keyword, _, _ in self.hour_table)
+
+        simulation = _require(raw, "simulation", dict)
+        self.sim_hours_sigma_base = _number(simulation.get("hours_sigma_base"), "simulation.hours_sigma_base")
+        self.sim_hours_sigma_per_point = _number(
+            simulation.get("hours_sigma_per_point"), "simulation.hours_sigma_per_point"
+        )
+        self.sim_rate_spread = _number(simulation.get("rate_spread"), "simulation.rate_spread")
+        if not 0 <= self.sim_rate_spread < 1:
+            raise ValueError("simulation.rate_spread must be in [0, 1)")
+        self.sim_hours_per_day = _number(simulation.get("hours_per_day"), "simulation.hours_per_day")
+        if self.sim_hours_per_day <= 0:
+            raise ValueError("simulation.hours_per_day must be positive")
+        self.sim_default_samples = int(_number(simulation.get("default_samples"), "simulation.default_samples"))
+        self.sim_max_samples = int(_number(simulation.get("max_samples"), "simulation.max_samples"))
+        self.sim_risk_delay: Dict[str, Tuple[float, float]] = {}
+        for severity, delay in _require(simulation, "risk_delay", dict).items():
+            delay = _object(delay, f"simulation.risk_delay.{severity}")
+            probability = _number(delay.get("probability"), f"simulation.risk_delay.{severity}.probability")
+            if not 0 <= probability <= 1:
+                raise ValueError(f"simulation.risk_delay.{severity}.probability must be in [0, 1]")
+            self.sim_risk_delay[severity] = (
+                probability,
+                _number(delay.get("overrun_fraction"), f"simulation.risk_delay.{severity}.overrun_fraction"),
+            )
+
+        calibration = _require(raw, "calibration", dict)
+        self.calibration_min_samples = int(_number(calibration.get("min_samples"), "calibration.min_samples"))
+        self.calibration_ridge_lambda = _number(calibration.get("ridge_lambda"), "calibration.ridge_lambda")
+        self.calibration_prior_strength = _number(
+            calibration.get("prior_strength"), "calibration.prior_strength"
+        )
+        if self.calibration_ridge_lambda <= 0 or self.calibration_prior_strength < 0:
+            raise ValueError("calibration.ridge_lambda must be positive and prior_strength non-negative")
+
+        schedule = _require(raw, "schedule", dict)
+        self.effort_hours: Dict[str, float] = {
+            level: _number(hours, f"schedule.effort_hours.{level}")
+            for level, hours in _require(schedule, "effort_hours", dict).items()
+        }
+        self.default_effort_hours = _number(schedule.get("default_effort_hours"), "schedule.default_effort_hours")
+        self.daily_capacity_hours = _number(schedule.get("daily_capacity_hours"), "schedule.daily_capacity_hours")
+        if self.daily_capacity_hours <= 0:
+            raise ValueError("schedule.daily_capacity_hours must be positive")
+        self.new_project_lead_days = _number(schedule.get("new_project_lead_days"), "schedule.new_project_lead_days")
+        self.max_improvement_passes = int(
+            _number(schedule.get("max_improvement_passes"), "schedule.max_improvement_passes")
+        )
+
+    def budget_score(self, budget_amount: float) -> float:
+        """Map an extracted budget amount to its complexity score"""
+        if not budget_amount:
+            return self.budget_unknown_score
+
+        index = bisect_right(self.budget_band_limits, budget_amount)
+        if index < len(self.budget_band_scores):
+            return self.budget_band_scores[index]
+        return self.budget_above_score
+
+    def tech_score(self, description: str) -> float:
+        """Sum the weights of every technical keyword found in the description"""
+        return sum(self.tech_weights[keyword] for keyword in self.tech_matcher.matches(description))
+
+    def base_hours(self, description: str) -> float:
+        """Look up base hours from the first matching hour-table row"""
+        matched = self.hour_matcher.matches(description)
+        if matched:
+            is_simple = self.simple_keyword in description
+            for keyword, simple_hours, hours in self.hour_table:
+                if keyword in matched:
+                    return simple_hours if is_simple else hours
+        return self.default_hours
+
+
+class ScoringConfigStore:
+    """
+    Holds the active scoring configuration and hot-reloads it from disk.
+
+    The file is stat'ed at most once per ``check_interval`` seconds. A changed
+    file is loaded, validated and compiled off to the side, then swapped in with
+    a single reference assignment; an invalid file keeps the previous config.
+    """
+
+    def __init__(self, path: Optional[str] = None, check_interval: Optional[float] = None):
+        self.path = Path(path or os.getenv("SCORING_CONFIG_PATH") or DEFAULT_CONFIG_PATH)
+        self.check_interval = (
+            check_interval if check_interval is not None
+            else float(os.getenv("SCORING_CONFIG_RELOAD_SECONDS", "2"))
+        )
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple[int, int]] = None
+        self._next_check = 0.0
+        self.last_error: Optional[str] = None
+        self.loaded_at: Optional[float] = None
+        self._config = self._load()
+
+    def current(self) -> CompiledScoringConfig:
+        """Return the active config, picking up on-disk changes when due"""
+        if self.check_interval >= 0 and time.monotonic() >= self._next_check:
+            self.reload()
+        return self._config
+
+    def reload(self, force: bool = False) -> bool:
+        """Reload the config file if it changed; returns True when a new config was installed"""
+        with self._lock:
+            self._next_check = time.monotonic() + max(self.check_interval, 0)
+            try:
+                signature = self._stat_signature()
+            except OSError as e:
+                self.last_error = f"Cannot stat scoring config: {e}"
+                return False
+
+            if not force and signature == self._signature:
+                return False
+
+            try:
+                self._config = self._load()
+                self.last_error = None
+                logger.info("Scoring config %s loaded from %s", self._config.version, self.path)
+                return True
+            except Exception as e:
+                # Shape errors come out as ValueError; anything else a bad edit trips over
+                # must not escape current() and break scoring either
+                self.last_error = str(e)
+                logger.warning("Scoring config reload failed, keeping %s: %s", self._config.version, e)
+                return False
+
+    def status(self) -> Dict[str, Any]:
+        """Describe the active config for diagnostics endpoints"""
+        return {
+            "version": self._config.version,
+            "path": str(self.path),
+            "loaded_at": self.loaded_at,
+            "last_error": self.last_error,
+        }
+
+    def _stat_signature(self) -> Tuple[int, int]:
+        stat = os.stat(self.path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _load(self) -> CompiledScoringConfig:
+        signature = self._stat_signature()
+        with open(self.path, "r", encoding="utf-8") as config_file:
+            try:
+                raw = json.load(config_file)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid scoring config JSON: {e}") from e
+
+        config = CompiledScoringConfig(raw, source=str(self.path))
+        self._signature = signature
+        self.loaded_at = time.time()
+        return config
+
+
+def _require(mapping: Dict[str, Any], key: str, expected_type: type) -> Any:
+    if not isinstance(mapping, dict) or key not in mapping:
+        raise ValueError(f"Scoring config is missing '{key}'")
+    value = mapping[key]
+    if not isinstance(value, expected_type):
+        raise ValueError(f"Scoring config '{key}' must be a {expected_type.__name__}")
+    return value
+
+
+def _number(value: Any, field: str) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"Scoring config '{field}' must be a number")
+    return value
+
+
+def _object(value: Any, field: str) -> Dict[str, Any]:
+    if not isinstance(value, dict):
+        raise ValueError(f"Scoring config '{field}' must be an object")
+    return value
+
+
+def _string_list(value: Any, field: str) -> List[str]:
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise ValueError(f"Scoring config '{field}' must be a list of strings")
+    return value
+
+
+# Global instance
+scoring_config_store = ScoringConfigStore()
@@ -1,34 +1,38 @@
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Tuple, Optional
 import re
 
+from scoring_config import CompiledScoringConfig, ScoringConfigStore, scoring_config_store
+from metrics import timed
+
 class ProjectScorer:
     """
     Advanced scoring logic for project analysis and recommendations
     """
     
-    def __init__(self):
-        # Complexity scoring weights
-        self.complexity_weights = {
-            "timeline": 0.25,
-            "budget": 0.20,
-            "technical_complexity": 0.30,
-            "client_experience": 0.15,
-            "team_size": 0.10
-        }
-        
-        # Risk factor mapping
-        self.risk_factors = {
-            "tight_timeline": {"weight": 0.3, "description": "Timeline pressure"},
-            "low_budget": {"weight": 0.25, "description": "Budget constraints"},
-            "new_technology": {"weight": 0.2, "description": "Technology learning curve"},
-            "difficult_client": {"weight": 0.15, "description": "Client management challenges"},
-            "scope_uncertainty": {"weight": 0.1, "description": "Unclear requirements"}
-        }
+    def __init__(self, config_store: ScoringConfigStore = None):
+        # Weights, keyword tables, budget bands and pricing constants live in
+        # scoring_config.json and are hot-reloaded by the config store
+        self.config_store = config_store or scoring_config_store
+    
+    @property
+    def config(self) -> CompiledScoringConfig:
+        """Currently active compiled scoring configuration"""
+        return self.config_store.current()
     
-    def analyze_project_complexity(self, project_data: Dict[str, Any]) -> Dict[str, Any]:
+    @property
+    def complexity_weights(self) -> Dict[str, float]:
+        return self.config.complexity_weights
+    
+    @property
+    def risk_factors(self) -> Dict[str, Dict[str, Any]]:
+        return self.config.risk_factors
+    
+    @timed("scoring.complexity")
+    def analyze_project_complexity(self, project_data: Dict[str, Any], config: Optional[CompiledScoringConfig] = None) -> Dict[str, Any]:
         """
         Analyze project complexity and return detailed scoring
         """
+        config = config or self.config
         scores = {}
         
         # Timeline complexity
@@ -46,30 +50,11 @@ class ProjectScorer:
         budget_str = project_data.get('budget', '').lower()
         budget_amount = self._extract_budget_amount(budget_str)
         
-        if budget_amount:
-            if budget_amount < 5000:
-                scores['budget'] = 8  # High complexity (tight budget)
-            elif budget_amount < 15000:
-                scores['budget'] = 6  # Medium
-            elif budget_amount < 50000:
-                scores['budget'] = 4  # Low-medium
-            else:
-                scores['budget'] = 2  # Low
-        else:
-            scores['budget'] = 5  # Unknown/medium
+        scores['budget'] = config.budget_score(budget_amount)
         
         # Technical complexity based on description
         description = project_data.get('description', '').lower()
-        tech_keywords = {
-            'ai': 3, 'machine learning': 3, 'blockchain': 3,
-            'real-time': 2, 'api': 2, 'database': 2,
-            'mobile app': 2, 'web app': 1, 'website': 1
-        }
-        
-        tech_score = 1
-        for keyword, weight in tech_keywords.items():
-            if keyword in description:
-                tech_score += weight
+        tech_score = 1 + config.tech_score(description)
         
         scores['technical_complexity'] = min(tech_score, 10)
         
@@ -87,26 +72,29 @@ class ProjectScorer:
         # Overall complexity score
         weighted_score = sum(
             scores.get(factor, 5) * weight 
-            for factor, weight in self.complexity_weights.items()
+            for factor, weight in config.weight_items
         )
         
         return {
             "individual_scores": scores,
             "overall_complexity": round(weighted_score, 1),
             "complexity_level": self._get_complexity_level(weighted_score),
-            "recommendations": self._get_complexity_recommendations(weighted_score, scores)
+            "recommendations": self._get_complexity_recommendations(weighted_score, scores),
+            "config_version": config.version
         }
     
-    def assess_project_risks(self, project_data: Dict[str, Any]) -> Dict[str, Any]:
+    @timed("scoring.risks")
+    def assess_project_risks(self, project_data: Dict[str, Any], config: Optional[CompiledScoringConfig] = None) -> Dict[str, Any]:
         """
         Assess potential risks in the project
         """
+        config = config or self.config
         risks = []
         risk_score = 0
         
         # Timeline risk
         timeline = project_data.get('timeline', '').lower()
-        if any(word in timeline for word in ['urgent', 'asap', 'week', '1 month']):
+        if config.risk_matchers['tight_timeline'].any_in(timeline):
             risks.append({
                 "type": "tight_timeline",
                 "severity": "high",
@@ -117,7 +105,8 @@ class ProjectScorer:
         
         # Budget risk
         budget_str = project_data.get('budget', '').lower()
-        if 'low' in budget_str or 'cheap' in budget_str or self._extract_budget_amount(budget_str) and self._extract_budget_amount(budget_str) < 3000:
+        budget_amount = self._extract_budget_amount(budget_str)
+        if config.risk_matchers['low_budget'].any_in(budget_str) or budget_amount and budget_amount < config.low_budget_risk_below:
             risks.append({
                 "type": "low_budget",
                 "severity": "medium",
@@ -128,7 +117,7 @@ class ProjectScorer:
         
         # Scope risk
         description = project_data.get('description', '').lower()
-        if len(description) < 50 or 'flexible' in description or 'we\'ll figure out' in description:
+        if len(description) < 50 or config.risk_matchers['scope_uncertainty'].any_in(description):
             risks.append({
                 "type": "scope_uncertainty",
                 "severity": "medium",
@@ -138,7 +127,7 @@ class ProjectScorer:
             risk_score += 2
         
         # Technology risk
-        if any(tech in description for tech in ['new technology', 'latest', 'cutting edge', 'experimental']):
+        if config.risk_matchers['new_technology'].any_in(description):
             risks.append({
                 "type": "new_technology",
                 "severity": "medium",
@@ -151,42 +140,71 @@ class ProjectScorer:
             "risks": risks,
             "overall_risk_score": risk_score,
             "risk_level": self._get_risk_level(risk_score),
-            "total_risks": len(risks)
+            "total_risks": len(risks),
+            "config_version": config.version
         }
     
-    def generate_pricing_recommendation(self, project_data: Dict[str, Any], complexity_score: float) -> Dict[str, Any]:
+    @timed("scoring.pricing")
+    def generate_pricing_recommendation(self, project_data: Dict[str, Any], complexity_score: float, config: Optional[CompiledScoringConfig] = None, calibration: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Generate pricing recommendations based on complexity and other factors
+        
+        When a per-user calibration (see pricing_calibration.py) with enough
+        completed projects is supplied, the heuristic total is shrunk towards
+        the user's own predicted payment.
         """
-        base_hourly_rate = 75  # Base rate in USD
+        config = config or self.config
+        base_hourly_rate = config.base_hourly_rate
         
         # Adjust rate based on complexity
-        complexity_multiplier = 1 + (complexity_score - 5) * 0.1
+        complexity_multiplier = 1 + (complexity_score - 5) * config.rate_multiplier_per_point
         adjusted_rate = base_hourly_rate * complexity_multiplier
         
         # Estimate hours based on project type and complexity
         description = project_data.get('description', '').lower()
-        
-        if 'website' in description:
-            base_hours = 40 if 'simple' in description else 80
-        elif 'web app' in description:
-            base_hours = 120 if 'simple' in description else 200
-        elif 'mobile app' in description:
-            base_hours = 160 if 'simple' in description else 300
-        else:
-            base_hours = 60  # Default
+        base_hours = config.base_hours(description)
         
         # Adjust hours based on complexity
-        estimated_hours = base_hours * (1 + (complexity_score - 5) * 0.15)
+        estimated_hours = base_hours * (1 + (complexity_score - 5) * config.hours_multiplier_per_point)
         
         total_estimate = adjusted_rate * estimated_hours
         
+        calibration_info = self._apply_calibration(calibration, total_estimate, config)
+        if calibration_info["applied"] and estimated_hours > 0:
+            total_estimate = calibration_info["calibrated_total"]
+            adjusted_rate = total_estimate / estimated_hours
+        
         return {
             "hourly_rate_recommendation": round(adjusted_rate, 2),
             "estimated_hours": round(estimated_hours),
             "total_project_estimate": round(total_estimate),
             "pricing_strategy": self._get_pricing_strategy(complexity_score),
-            "payment_terms": self._get_payment_terms(total_estimate)
+            "payment_terms": self._get_payment_terms(total_estimate),
+            "calibration": calibration_info,
+            "config_version": config.version
+        }
+    
+    def _apply_calibration(self, calibration: Optional[Dict[str, Any]], heuristic_total: float, config: CompiledScoringConfig) -> Dict[str, Any]:
+        """Blend the heuristic estimate with a per-user calibrated prediction"""
+        if not calibration:
+            return {"applied": False, "reason": "no calibration data"}
+        
+        samples = calibration.get("samples", 0)
+        predicted = calibration.get("predicted_payment")
+        if samples < config.calibration_min_samples:
+            return {"applied": False, "reason": f"only {samples} completed projects", "samples": samples}
+        if predicted is None or predicted <= 0:
+            return {"applied": False, "reason": "calibrated prediction not usable", "samples": samples}
+        
+        # More history -> more weight on the user's own pricing
+        weight = samples / (samples + config.calibration_prior_strength)
+        return {
+            "applied": True,
+            "samples": samples,
+            "weight": round(weight, 3),
+            "predicted_payment": round(predicted),
+            "heuristic_total": round(heuristic_total),
+            "calibrated_total": round(weight * predicted + (1 - weight) * heuristic_total)
         }
     
     def _extract_budget_amount(self, budget_str: str) -> float:
@@ -0,0 +1,343 @@
+import asyncio
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from local_intents import local_intent_router
+from metrics import metrics
+from model_router import model_router
+from request_profiler import request_profiler
+from structured_logging import logging_setup
+
+# Searched in order; relative paths are tried from the working directory and from this file's directory
+ENV_PATHS = [
+    "../../.env",  # psi_paramex/.env
+    "../../../.env",  # One level up
+    ".env",  # Current directory
+]
+
+# Services built in the background after startup so the first request does not pay for them
+WARMUP_SERVICES = ("supabase", "groq_client", "ux_safety_checker", "pricing_calibrator", "similarity_index")
+
+DATABASE_CHECK_TTL = 10.0
+
+
+class ServiceContainer:
+    """
+    Application services, each built once on first use.
+
+    Importing main.py only defines routes: the .env file is read, the
+    Supabase and Groq clients are created and the numpy-backed modules are
+    imported the first time something asks for them (or by the optional
+    warm-up after startup), each under its own lock so concurrent requests
+    build a service exactly once. The FastAPI lifespan starts and stops the
+    background workers and records how long the cold start took.
+    """
+
+    def __init__(self):
+        self.created_at = time.perf_counter()
+        self.env_loaded_from: Optional[str] = None
+        self.cold_start_ms: Optional[float] = None
+        self.started = False
+        self.init_ms: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+
+        self._services: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._env_lock = threading.Lock()
+        self._env_loaded = False
+        self._database_check = (0.0, False, None)
+        self._background: List[asyncio.Task] = []
+
+    def load_environment(self) -> None:
+        """Load the first .env file found (once); existing variables are not overridden"""
+        if self._env_loaded:
+            return
+        with self._env_lock:
+            if self._env_loaded:
+                return
+            here = Path(__file__).resolve().parent
+            for env_path in ENV_PATHS:
+                for candidate in (Path(env_path), here / env_path):
+                    if candidate.exists():
+                        load_dotenv(dotenv_path=candidate)
+                        self.env_loaded_from = str(candidate)
+                        print(f"✅ Environment variables loaded from: {candidate}")
+                        break
+                if self.env_loaded_from:
+                    break
+            else:
+                print("⚠️ Warning: .env file not found in any expected location")
+                print("   Please make sure .env file exists with required variables:")
+                print("   - GROQ_API_KEY")
+                print("   - VITE_SUPABASE_URL")
+                print("   - VITE_SUPABASE_ANON_KEY")
+            self._env_loaded = True
+
+    def _get(self, name: str, factory: Callable[[], Any]) -> Any:
+        if name in self._services:
+            return self._services[name]
+
+        with self._locks_guard:
+            lock = self._locks.setdefault(name, threading.Lock())
+        with lock:
+            if name in self._services:
+                return self._services[name]
+
+            self.load_environment()
+            started = time.perf_counter()
+            try:
+                service = factory()
+            except Exception as e:
+                # A missing dependency or credential disables the feature instead of failing requests
+                print(f"⚠️ Warning: Could not initialize {name}: {e}")
+                self.errors[name] = str(e)
+                service = None
+            self.init_ms[name] = round((time.perf_counter() - started) * 1000, 1)
+            self._services[name] = service
+            return service
+
+    # Clients
+
+    @property
+    def supabase(self):
+        return self._get("supabase", self._create_supabase)
+
+    @property
+    def groq_client(self):
+        return self._get("groq_client", self._create_groq_client)
+
+    @staticmethod
+    def _create_supabase():
+        supabase_url = os.getenv("VITE_SUPABASE_URL")
+        supabase_key = os.getenv("VITE_SUPABASE_ANON_KEY")
+        if not (supabase_url and supabase_key):
+            print("❌ Supabase credentials missing - project context features will be disabled")
+            return None
+
+        from supabase import create_client
+
+        client = create_client(supabase_url, supabase_key)
+        print("✅ Supabase client initialized successfully")
+        return client
+
+    @staticmethod
+    def _create_groq_client():
+        from llm_cassettes import cassette_mode
+
+        if not os.getenv("GROQ_API_KEY") and cassette_mode() != "replay":
+            print("❌ GROQ_API_KEY missing - AI features will be disabled")
+            return None
+
+        from groq_client import GroqLlamaClient
+
+        client = GroqLlamaClient(performance_mode="balanced")  # Better for project context analysis
+        print("✅ Groq AI client initialized successfully")
+        return client
+
+    # Email delivery
+
+    @property
+    def email_templates(self):
+        def create():
+            from template_registry import EmailTemplateRegistry
+            return EmailTemplateRegistry()
+        return self._get("email_templates", create)
+
+    @property
+    def email_queue(self):
+        def create():
+            from email_queue import EmailQueue
+            # Started with the application; the transport is chosen from the environment on start
+            return EmailQueue(self.email_templates)
+        return self._get("email_queue", create)
+
+    @property
+    def notification_outbox(self):
+        def create():
+            from notification_outbox import NotificationOutbox
+            # Opens (and creates) the SQLite file at NOTIFICATION_OUTBOX_PATH
+            return NotificationOutbox()
+        return self._get("notification_outbox", create)
+
+    @property
+    def outbox_drainer(self):
+        def create():
+            from notification_outbox import OutboxDrainer
+            return OutboxDrainer(self.notification_outbox, self.email_queue, self.email_templates)
+        return self._get("outbox_drainer", create)
+
+    # Database-backed services
+
+    @property
+    def email_service(self):
+        def create():
+            if not self.supabase:
+                return None
+            from supabase_email_service import SupabaseEmailService
+            return SupabaseEmailService(self.supabase, self.email_templates, self.email_queue)
+        return self._get("email_service", create)
+
+    @property
+    def notification_scheduler(self):
+        def create():
+            if not self.supabase:
+                return None
+            from notification_scheduler import NotificationScheduler
+            return NotificationScheduler(self.supabase, self.email_service, self.notification_outbox, self.outbox_drainer)
+        return self._get("notification_scheduler", create)
+
+    @property
+    def pricing_calibrator(self):
+        def create():
+            from pricing_calibration import PricingCalibrator
+            # Per-user pricing calibration loads completed project history lazily
+            return PricingCalibrator(self.supabase)
+        return self._get("pricing_calibrator", create)
+
+    @property
+    def similarity_index(self):
+        def create():
+            from similarity_index import SimilarityIndex
+            # Similar-project retrieval indexes each user's history on first use
+            return SimilarityIndex(self.supabase)
+        return self._get("similarity_index", create)
+
+    @property
+    def deadline_reminders(self):
+        def create():
+            from deadline_reminders import DeadlineReminderEngine
+            return DeadlineReminderEngine(self.supabase, self.notification_outbox, self.outbox_drainer)
+        return self._get("deadline_reminders", create)
+
+    @property
+    def notification_digest(self):
+        def create():
+            from notification_digest import NotificationDigest
+            # Project status emails are coalesced into per-user digests
+            return NotificationDigest(self.supabase, self.notification_outbox, self.outbox_drainer)
+        return self._get("notification_digest", create)
+
+    # Optional numpy / process-pool backed modules
+
+    @property
+    def risk_simulator(self):
+        def create():
+            from risk_simulation import risk_simulator
+            return risk_simulator
+        return self._get("risk_simulator", create)
+
+    @property
+    def ux_safety_checker(self):
+        def create():
+            from ux_safety_check import ux_safety_checker
+            return ux_safety_checker
+        return self._get("ux_safety_checker", create)
+
+    @property
+    def bulk_moderation_jobs(self):
+        def create():
+            from bulk_moderation import bulk_moderation_jobs
+            return bulk_moderation_jobs
+        return self._get("bulk_moderation_jobs", create)
+
+    # Lifecycle
+
+    @asynccontextmanager
+    async def lifespan(self, app):
+        await self.startup()
+        try:
+            yield
+        finally:
+            await self.shutdown()
+
+    async def startup(self) -> None:
+        self.load_environment()
+        logging_setup.configure()
+        metrics.configure()
+        request_profiler.configure()
+        local_intent_router.configure()
+        model_router.configure()
+        # The email service binds app_url for the templates the outbox drainer renders
+        await asyncio.to_thread(lambda: (self.email_service, self.deadline_reminders, self.notification_digest))
+        await self.email_queue.start()
+        await self.outbox_drainer.start()
+        # Loading open projects needs the database; it runs in the background instead of delaying startup
+        self._background.append(asyncio.create_task(self._start_deadline_reminders()))
+        await self.notification_digest.start()
+
+        if os.getenv("SERVICES_WARMUP", "true").lower() in ("1", "true", "yes"):
+            self._background.append(asyncio.create_task(self._warm_up()))
+
+        self.started = True
+        self.cold_start_ms = round((time.perf_counter() - self.created_at) * 1000, 1)
+        print(f"✅ Services started ({self.cold_start_ms:g} ms since import)")
+
+    async def shutdown(self) -> None:
+        for task in self._background:
+            task.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+        self._background = []
+        await self.notification_digest.stop()
+        await self.deadline_reminders.stop()
+        await self.outbox_drainer.stop()
+        await self.email_queue.stop()
+        self.started = False
+        logging_setup.stop()
+
+    async def _start_deadline_reminders(self) -> None:
+        try:
+            await self.deadline_reminders.start()
+        except Exception as e:
+            print(f"⚠️ Warning: Could not load deadline reminders: {e}")
+            self.errors["deadline_reminders"] = str(e)
+
+    async def _warm_up(self) -> None:
+        for name in WARMUP_SERVICES:
+            await asyncio.to_thread(getattr, self, name)
+
+    # Probes
+
+    async def readiness(self) -> Dict[str, Any]:
+        """Whether the app can serve requests: started and, when configured, the database answers"""
+        checks = {"started": self.started}
+        if self.supabase is not None:
+            checks["database"] = await self._check_database()
+        checks["groq_configured"] = bool(os.getenv("GROQ_API_KEY"))
+        return {
+            "ready": checks["started"] and checks.get("database", True),
+            "checks": checks,
+            "cold_start_ms": self.cold_start_ms,
+            "initialized": dict(self.init_ms),
+            "errors": dict(self.errors),
+        }
+
+    async def _check_database(self) -> bool:
+        checked_at, ok, _ = self._database_check
+        if time.monotonic() - checked_at < DATABASE_CHECK_TTL:
+            return ok
+
+        def query():
+            self.supabase.table("projects").select("count", count="exact").limit(1).execute()
+
+        try:
+            await asyncio.to_thread(query)
+            ok, error = True, None
+        except Exception as e:
+            print(f"⚠️ Database readiness check failed: {e}")
+            ok, error = False, str(e)
+        self._database_check = (time.monotonic(), ok, error)
+        return ok
+
+    def liveness(self) -> Dict[str, Any]:
+        return {"alive": True, "uptime_seconds": round(time.perf_counter() - self.created_at, 1)}
+
+
+# Global container (routes in main.py reach every service through it)
+services = ServiceContainer()
@@ -0,0 +1,341 @@
+import math
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import date
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+TYPE_BUCKETS = 8
+NGRAM_BUCKETS = 64
+NGRAM_SIZE = 3
+DIFFICULTY_SCALE = {"Low": 0.0, "Medium": 0.5, "High": 1.0}
+
+# Relative importance of each feature block in the distance
+TYPE_WEIGHT = 1.0
+DIFFICULTY_WEIGHT = 0.8
+PAYMENT_WEIGHT = 0.8
+DURATION_WEIGHT = 0.6
+TEXT_WEIGHT = 0.7
+
+TYPE_OFFSET = 0
+NUMERIC_OFFSET = TYPE_BUCKETS
+TEXT_OFFSET = NUMERIC_OFFSET + 3
+VECTOR_SIZE = TEXT_OFFSET + NGRAM_BUCKETS
+INITIAL_CAPACITY = 16
+
+PROJECT_COLUMNS = """
+    project_id,
+    project_name,
+    client_name,
+    start_date,
+    deadline,
+    payment_amount,
+    difficulty_level,
+    type_id:type_id ( type_name ),
+    status_id:status_id ( status_name )
+"""
+
+
+def project_vector(project: Dict[str, Any]) -> np.ndarray:
+    """
+    Embed a project as a fixed-size float32 vector
+
+    Blocks: hashed project type, scaled difficulty / log payment / log
+    duration, and hashed character trigrams of the name and description.
+    """
+    return _embed(project)[0]
+
+
+def query_vector(project: Dict[str, Any]):
+    """
+    Embed a query project together with a mask of the dimensions it defines,
+    so fields missing from the query don't count as mismatches
+    """
+    return _embed(project)
+
+
+def _embed(project: Dict[str, Any]):
+    vector = np.zeros(VECTOR_SIZE, dtype=np.float32)
+    mask = np.zeros(VECTOR_SIZE, dtype=np.float32)
+
+    project_type = _project_type(project)
+    if project_type:
+        vector[TYPE_OFFSET + _bucket(project_type, TYPE_BUCKETS)] = TYPE_WEIGHT
+        mask[TYPE_OFFSET:NUMERIC_OFFSET] = 1
+
+    difficulty = project.get("difficulty") or project.get("difficulty_level")
+    vector[NUMERIC_OFFSET] = DIFFICULTY_WEIGHT * DIFFICULTY_SCALE.get(difficulty, 0.5)
+    mask[NUMERIC_OFFSET] = difficulty in DIFFICULTY_SCALE
+
+    payment = _payment(project)
+    vector[NUMERIC_OFFSET + 1] = PAYMENT_WEIGHT * math.log10(max(payment, 0) + 1) / 6
+    mask[NUMERIC_OFFSET + 1] = payment > 0
+
+    duration = _duration_days(project)
+    if duration is not None:
+        vector[NUMERIC_OFFSET + 2] = DURATION_WEIGHT * math.log1p(max(duration, 0)) / math.log(366)
+        mask[NUMERIC_OFFSET + 2] = 1
+
+    text = " ".join(
+        str(project.get(field) or "") for field in ("name", "project_name", "title", "description")
+    ).lower()
+    if len(text.strip()) >= NGRAM_SIZE:
+        grams = np.zeros(NGRAM_BUCKETS, dtype=np.float32)
+        padded = f" {text} "
+        for i in range(len(padded) - NGRAM_SIZE + 1):
+            grams[_bucket(padded[i:i + NGRAM_SIZE], NGRAM_BUCKETS)] += 1
+        vector[TEXT_OFFSET:] = TEXT_WEIGHT * grams / np.linalg.norm(grams)
+        mask[TEXT_OFFSET:] = 1
+
+    return vector, mask
+
+
+class UserProjectIndex:
+    """
+    In-memory index of one user's projects for nearest-neighbour lookup.
+
+    Vectors live in a preallocated float32 matrix that doubles when full;
+    upserts overwrite a row in place and removals swap in the last row, so
+    every update is O(1) amortized.
+    """
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.vectors = np.zeros((INITIAL_CAPACITY, VECTOR_SIZE), dtype=np.float32)
+        self.squares = np.zeros((INITIAL_CAPACITY, VECTOR_SIZE), dtype=np.float32)
+        self.records: List[Dict[str, Any]] = []
+        self.rows: Dict[str, int] = {}
+        # Fingerprint of the project list the index was last synced from
+        self.version: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def upsert(self, project: Dict[str, Any]) -> None:
+        project_id = str(project.get("id", project.get("project_id")))
+        vector = project_vector(project)
+        record = _outcome(project)
+
+        row = self.rows.get(project_id)
+        if row is None:
+            row = len(self.records)
+            if row == len(self.vectors):
+                self._grow()
+            self.rows[project_id] = row
+            self.records.append(record)
+        else:
+            self.records[row] = record
+
+        self.vectors[row] = vector
+        self.squares[row] = vector * vector
+
+    def remove(self, project_id: str) -> bool:
+        row = self.rows.pop(str(project_id), None)
+        if row is None:
+            return False
+
+        last = len(self.records) - 1
+        if row != last:
+            self.vectors[row] = self.vectors[last]
+            self.squares[row] = self.squares[last]
+            self.records[row] = self.records[last]
+            self.rows[str(self.records[row]["id"])] = row
+        self.records.pop()
+        return True
+
+    def query(self, vector: np.ndarray, mask: np.ndarray, k: int, exclude_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        count = len(self.records)
+        if not count:
+            return []
+
+        # Squared euclidean distance over the query's defined dimensions,
+        # expanded into two matrix-vector products
+        vector = vector * mask
+        distances = self.squares[:count] @ mask - 2 * (self.vectors[:count] @ vector) + vector @ vector
+        if exclude_id is not None and str(exclude_id) in self.rows:
+            distances[self.rows[str(exclude_id)]] = np.inf
+
+        k = min(k, count)
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest])]
+
+        return [
+            {**self.records[row], "similarity": round(float(1 / (1 + max(distances[row], 0))), 4)}
+            for row in nearest if np.isfinite(distances[row])
+        ]
+
+    def _grow(self) -> None:
+        capacity = len(self.vectors) * 2
+        vectors = np.zeros((capacity, VECTOR_SIZE), dtype=np.float32)
+        squares = np.zeros((capacity, VECTOR_SIZE), dtype=np.float32)
+        vectors[:len(self.vectors)] = self.vectors
+        squares[:len(self.squares)] = self.squares
+        self.vectors, self.squares = vectors, squares
+
+
+class SimilarityIndex:
+    """
+    Per-user similar-project retrieval over historical projects.
+
+    A user's projects are loaded from Supabase with one query on first use and
+    kept in a bounded LRU of ``UserProjectIndex`` objects; new or changed
+    projects are applied incrementally through ``upsert_project``.
+    """
+
+    def __init__(self, supabase_client: "Client" = None, max_users: Optional[int] = None):
+        self.supabase = supabase_client
+        self.max_users = max_users or int(os.getenv("SIMILARITY_INDEX_MAX_USERS", "5000"))
+        self._indexes: "OrderedDict[str, UserProjectIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_index(self, user_id: str, load: bool = True) -> Optional[UserProjectIndex]:
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None:
+                self._indexes.move_to_end(user_id)
+                return index
+
+        if not load or not self.supabase:
+            return None
+
+        response = self.supabase.table("projects").select(PROJECT_COLUMNS).eq("user_id", user_id).execute()
+        return self.build(user_id, response.data or [])
+
+    def build(self, user_id: str, projects: List[Dict[str, Any]]) -> UserProjectIndex:
+        """Replace a user's index with the given projects"""
+        index = UserProjectIndex(user_id)
+        for project in projects:
+            index.upsert(project)
+
+        with self._lock:
+            self._indexes[user_id] = index
+            self._indexes.move_to_end(user_id)
+            while len(self._indexes) > self.max_users:
+                self._indexes.popitem(last=False)
+        return index
+
+    def sync(self, user_id: str, projects: List[Dict[str, Any]]) -> UserProjectIndex:
+        """
+        Bring a user's index in line with a freshly fetched project list
+
+        The list is fingerprinted and the index is only rebuilt when it is
+        missing or the list changed since the last sync; repeated fetches of
+        an unchanged portfolio cost one hash instead of a re-vectorization.
+        """
+        version = hash(repr(projects))
+        index = self.get_index(user_id, load=False)
+        if index is not None and index.version == version:
+            return index
+        index = self.build(user_id, projects)
+        index.version = version
+        return index
+
+    def upsert_project(self, user_id: str, project: Dict[str, Any]) -> None:
+        """Add or update one project in an already-loaded index"""
+        index = self.get_index(user_id, load=False)
+        if index is not None:
+            with self._lock:
+                index.upsert(project)
+
+    def remove_project(self, user_id: str, project_id: str) -> bool:
+        index = self.get_index(user_id, load=False)
+        if index is None:
+            return False
+        with self._lock:
+            return index.remove(project_id)
+
+    def find_similar(self, user_id: str, project_data: Dict[str, Any], k: int = 3) -> List[Dict[str, Any]]:
+        """Return the k most similar past projects of the user with their outcomes"""
+        index = self.get_index(user_id)
+        if index is None:
+            return []
+
+        vector, mask = query_vector(project_data)
+        with self._lock:
+            return index.query(vector, mask, k, exclude_id=project_data.get("project_id"))
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "indexed_users": len(self._indexes),
+            "indexed_projects": sum(len(index) for index in self._indexes.values()),
+            "max_users": self.max_users,
+        }
+
+
+def _bucket(token: str, buckets: int) -> int:
+    return zlib.crc32(token.encode("utf-8")) % buckets
+
+
+def _type_name(project: Dict[str, Any]) -> Optional[str]:
+    project_type = project.get("type") or project.get("type_id") or project.get("project_type")
+    if isinstance(project_type, dict):
+        project_type = project_type.get("type_name")
+    if not project_type or project_type == "Unknown":
+        return None
+    return str(project_type)
+
+
+def _project_type(project: Dict[str, Any]) -> Optional[str]:
+    type_name = _type_name(project)
+    return type_name.lower() if type_name else None
+
+
+def _payment(project: Dict[str, Any]) -> float:
+    payment = project.get("payment", project.get("payment_amount"))
+    if payment is None and project.get("budget"):
+        # Free-text budget from analyze-project, e.g. "$5,000"
+        numbers = re.findall(r'\d+(?:\.\d+)?', str(project["budget"]).replace(',', ''))
+        payment = numbers[0] if numbers else None
+    try:
+        return float(payment) if payment is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _duration_days(project: Dict[str, Any]) -> Optional[int]:
+    if project.get("duration_days") is not None:
+        return int(project["duration_days"])
+    try:
+        start = date.fromisoformat(str(project["start_date"])[:10])
+        deadline = date.fromisoformat(str(project["deadline"])[:10])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return (deadline - start).days
+
+
+def _status(project: Dict[str, Any]) -> str:
+    status = project.get("status") or project.get("status_id")
+    if isinstance(status, dict):
+        status = status.get("status_name")
+    return status or "Unknown"
+
+
+def _outcome(project: Dict[str, Any]) -> Dict[str, Any]:
+    status = _status(project)
+    deadline = project.get("deadline")
+    overdue = False
+    if deadline and status != "Done":
+        try:
+            overdue = date.fromisoformat(str(deadline)[:10]) < date.today()
+        except ValueError:
+            overdue = False
+
+    return {
+        "id": project.get("id", project.get("project_id")),
+        "name": project.get("name", project.get("project_name")),
+        "client": project.get("client", project.get("client_name")),
+        "type": _type_name(project),
+        "difficulty": project.get("difficulty") or project.get("difficulty_level"),
+        "payment": project.get("payment", project.get("payment_amount")),
+        "duration_days": _duration_days(project),
+        "deadline": deadline,
+        "status": status,
+        "overdue": overdue,
+    }
@@ -0,0 +1,125 @@
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+# Set per request by the middleware in main.py; copied into asyncio tasks and to_thread calls
+request_id_var: contextvars.ContextVar = contextvars.ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else on a record came in through extra={...}
+_RECORD_ATTRIBUTES = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime", "request_id"}
+
+# httpx logs every outbound request (each Supabase query) at INFO; LOG_LEVELS can override
+DEFAULT_LEVELS = {"httpx": "WARNING", "httpcore": "WARNING"}
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the request id and any extra={...} fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that leaves formatting to the listener thread
+
+    The stock QueueHandler formats the message before enqueueing, which
+    would keep the %-formatting and JSON encoding on the event loop. Here the
+    calling thread only captures the request id; the listener thread builds
+    the message. Log arguments should therefore be values that are not
+    mutated after the call (numbers, strings, tuples).
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.request_id = request_id_var.get()
+        return record
+
+
+class LoggingSetup:
+    """
+    Process-wide logging configuration.
+
+    Environment:
+        LOG_LEVEL: root level (default INFO)
+        LOG_LEVELS: per-module overrides, e.g. "main=DEBUG,email_queue=WARNING"
+        LOG_FORMAT: "json" (default) or "text"
+
+    Records go through a ContextQueueHandler on the root logger to a single
+    listener thread that writes them to stdout, so logging from a request
+    handler never blocks on the terminal or a log collector's pipe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._handler: Optional[ContextQueueHandler] = None
+        self._listener: Optional[logging.handlers.QueueListener] = None
+
+    @property
+    def configured(self) -> bool:
+        return self._listener is not None
+
+    def configure(self) -> None:
+        with self._lock:
+            if self._listener is not None:
+                return
+
+            root = logging.getLogger()
+            root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+            levels = dict(DEFAULT_LEVELS)
+            for item in os.getenv("LOG_LEVELS", "").split(","):
+                name, _, level = item.partition("=")
+                if name.strip() and level.strip():
+                    levels[name.strip()] = level.strip().upper()
+            for name, level in levels.items():
+                logging.getLogger(name).setLevel(level)
+
+            output = logging.StreamHandler(sys.stdout)
+            if os.getenv("LOG_FORMAT", "json").lower() == "text":
+                output.setFormatter(logging.Formatter(TEXT_FORMAT))
+            else:
+                output.setFormatter(JsonFormatter())
+
+            log_queue: queue.SimpleQueue = queue.SimpleQueue()
+            self._handler = ContextQueueHandler(log_queue)
+            root.addHandler(self._handler)
+            self._listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+            self._listener.start()
+            atexit.register(self.stop)
+
+    def stop(self) -> None:
+        """Write out everything still queued and detach the handler"""
+        with self._lock:
+            if self._listener is None:
+                return
+            logging.getLogger().removeHandler(self._handler)
+            self._listener.stop()
+            self._listener = None
+            self._handler = None
+
+
+# Global logging setup (configured by the service container at startup)
+logging_setup = LoggingSetup()
@@ -1,53 +1,16 @@
 import os
-from typing import Dict, Any
+from typing import TYPE_CHECKING, Dict, Any
 from datetime import datetime
 import pytz
-from jinja2 import Environment, BaseLoader
 from pydantic import BaseModel
-from supabase import Client
 
-# Email templates
-TEST_EMAIL_TEMPLATE = """
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="utf-8">
-    <title>Test Email - ParameX</title>
-</head>
-<body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
-    <div style="background: #667eea; color: white; padding: 20px; text-align: center; border-radius: 8px;">
-        <h1>✅ Email Test Successful!</h1>
-        <p>ParameX Email Service (Supabase)</p>
-    </div>
-    
-    <div style="padding: 20px; border: 1px solid #e0e0e0; border-top: none;">
-        <h2>Hi {{ user_name }},</h2>
-        <p>This is a test email to verify that your email notifications are working correctly with Supabase.</p>
-        
-        <div style="background: #f8f9fa; padding: 15px; border-radius: 6px; margin: 15px 0;">
-            <p><strong>Test Details:</strong></p>
-            <ul style="margin: 0;">
-                <li>Email service: Active ✅</li>
-                <li>Time sent: {{ current_time }} (Jakarta Time)</li>
-                <li>Recipient: {{ user_email }}</li>
-                <li>Service: Supabase Email System</li>
-            </ul>
-        </div>
-        
-        <p>Your email notifications are now configured and working properly!</p>
-        
-        <div style="text-align: center; margin: 20px 0;">
-            <a href="{{ app_url }}/settings" style="background: #667eea; color: white; padding: 10px 20px; text-decoration: none; border-radius: 4px;">Manage Notifications</a>
-        </div>
-        
-        <hr style="margin: 20px 0; border: none; border-top: 1px solid #e0e0e0;">
-        <p style="font-size: 12px; color: #666; text-align: center;">
-            This was a test email from ParameX Project Management System using Supabase.
-        </p>
-    </div>
-</body>
-</html>
-"""
+if TYPE_CHECKING:
+    from supabase import Client
+
+# Email templates (files in email_templates/)
+TEST_EMAIL_TEMPLATE = "test_email.html"
+PROJECT_UPDATE_TEMPLATE = "project_update.html"
+WELCOME_TEMPLATE = "welcome.html"
 
 class EmailData(BaseModel):
     to_email: str
@@ -56,7 +19,7 @@ class EmailData(BaseModel):
     template_data: Dict[str, Any]
 
 class SupabaseEmailService:
-    def __init__(self, supabase_client: Client):
+    def __init__(self, supabase_client: "Client", templates, queue):
         self.supabase = supabase_client
         self.app_url = os.getenv("APP_URL", "http://localhost:5173")
         self.from_email = os.getenv("FROM_EMAIL", "ParameX <notifications@paramex.dev>")
@@ -68,12 +31,34 @@ class SupabaseEmailService:
             self.enabled = True
             print("✅ Supabase email service initialized successfully")
         
-        self.env = Environment(loader=BaseLoader())
+        self.templates = templates
+        self.templates.set_globals(app_url=self.app_url)
+        self.queue = queue
+    
+    def render(self, template_name: str, data: Dict[str, Any]) -> str:
+        """Render a registered email template with data"""
+        return self.templates.render(template_name, data)
     
     def render_template(self, template_string: str, data: Dict[str, Any]) -> str:
-        """Render email template with data"""
-        template = self.env.from_string(template_string)
-        return template.render(**data)
+        """Render an inline email template with data"""
+        return self.templates.render_string(template_string, data)
+    
+    def send_email(self, to_email: str, subject: str, template: str, template_data: Dict[str, Any],
+                   to_name: str = "", email_type: str = "notification") -> str:
+        """
+        Queue an email for asynchronous rendering and delivery
+        
+        Returns:
+            Job id of the queued email
+        """
+        return self.queue.enqueue({
+            "to_email": to_email,
+            "to_name": to_name,
+            "subject": subject,
+            "template": template,
+            "template_data": template_data,
+            "email_type": email_type
+        })
     
     async def send_test_email(self, to_email: str, user_name: str) -> Dict[str, Any]:
         """Send test email to verify email functionality"""
@@ -91,23 +76,19 @@ class SupabaseEmailService:
                 "app_url": self.app_url
             }
             
-            html_content = self.render_template(TEST_EMAIL_TEMPLATE, template_data)
-            
-            # For now, simulate email sending by logging
-            print(f"📧 Test email would be sent to: {to_email}")
-            print(f"📧 Subject: ParameX Email Test - Supabase Integration Working!")
-            print(f"📧 Content preview: Email test for {user_name} at {current_time}")
+            subject = "ParameX Email Test - Supabase Integration Working!"
+            job_id = self.send_email(to_email, subject, TEST_EMAIL_TEMPLATE, template_data, user_name, "test")
+            print(f"📧 Test email queued for: {to_email} (job {job_id})")
             
-            # Log to console (in production, this would send actual email)
             return {
                 "success": True,
-                "message_id": f"supabase_test_{datetime.now().timestamp()}",
+                "message_id": job_id,
+                "job_id": job_id,
                 "response": {
-                    "status": "simulated_sent",
+                    "status": "queued",
                     "to": to_email,
-                    "subject": "ParameX Email Test - Supabase Integration Working!",
-                    "service": "supabase_simulation",
-                    "note": "Email simulated successfully - integrate with actual email service for production"
+                    "subject": subject,
+                    "transport": self.queue.transport.name if self.queue.transport else None
                 }
             }
         
@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template, select_autoescape
+
+DEFAULT_TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "email_templates")
+
+
+class EmailTemplateRegistry:
+    """
+    Compiled email templates loaded from a directory.
+
+    Each template is parsed and compiled once (compiled code is also kept in a
+    filesystem bytecode cache, so new worker processes skip compilation) and
+    the Template object is reused for every send. Jinja compiles the static
+    markup into constant strings, and values shared by every email (app_url)
+    are bound once as globals, so a send only pays for rendering. Template
+    files are checked for changes at most every ``check_interval`` seconds.
+    HTML templates and inline templates are autoescaped, so project, client
+    and user fields cannot inject markup; mark a value ``|safe`` only when it
+    is meant to contain HTML.
+    """
+
+    def __init__(
+        self,
+        template_dir: Optional[str] = None,
+        cache_dir: Optional[str] = None,
+        check_interval: Optional[float] = None,
+        max_string_templates: int = 64,
+    ):
+        self.template_dir = template_dir or os.getenv("EMAIL_TEMPLATE_DIR", DEFAULT_TEMPLATE_DIR)
+        self.check_interval = (
+            check_interval if check_interval is not None
+            else float(os.getenv("EMAIL_TEMPLATE_RELOAD_SECONDS", "2"))
+        )
+        self.max_string_templates = max_string_templates
+
+        cache_dir = cache_dir or os.getenv("EMAIL_TEMPLATE_CACHE_DIR") or None
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+        self.env = Environment(
+            loader=FileSystemLoader(self.template_dir),
+            bytecode_cache=FileSystemBytecodeCache(cache_dir),
+            autoescape=select_autoescape(["html"]),
+            auto_reload=True,
+        )
+        self._templates: Dict[str, Tuple[Template, float]] = {}
+        self._string_templates: "OrderedDict[str, Template]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def set_globals(self, **values: Any) -> None:
+        """Bind values shared by every email (e.g. app_url) once"""
+        self.env.globals.update(values)
+
+    def get(self, name: str) -> Template:
+        """
+        Get a compiled template, reloading it if its file changed
+
+        Args:
+            name: Template file name relative to the template directory
+
+        Returns:
+            Compiled Jinja2 template
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._templates.get(name)
+            if cached is not None:
+                template, checked_at = cached
+                if now - checked_at < self.check_interval:
+                    return template
+                if template.is_up_to_date:
+                    self._templates[name] = (template, now)
+                    return template
+                self.reloads += 1
+                print(f"🔄 Email template changed, reloading: {name}")
+
+            template = self.env.get_template(name)
+            self._templates[name] = (template, now)
+            return template
+
+    def render(self, name: str, data: Dict[str, Any]) -> str:
+        return self.get(name).render(**data)
+
+    def from_string(self, source: str) -> Template:
+        """Compile an inline template once and reuse it for the same source"""
+        with self._lock:
+            template = self._string_templates.get(source)
+            if template is not None:
+                self._string_templates.move_to_end(source)
+                return template
+
+        template = self.env.from_string(source)
+        with self._lock:
+            self._string_templates[source] = template
+            while len(self._string_templates) > self.max_string_templates:
+                self._string_templates.popitem(last=False)
+        return template
+
+    def render_string(self, source: str, data: Dict[str, Any]) -> str:
+        return self.from_string(source).render(**data)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "template_dir": self.template_dir,
+            "available": self.env.list_templates(extensions=["html", "txt"]),
+            "loaded": sorted(self._templates),
+            "inline_templates": len(self._string_templates),
+            "reloads": self.reloads,
+        }
+
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The API modules import each other by bare name (the server runs from groq_api/)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
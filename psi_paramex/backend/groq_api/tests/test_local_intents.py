@@ -0,0 +1,86 @@
+from datetime import datetime
+
+import pytest
+
+from local_intents import LocalIntentRouter
+
+NOW = datetime(2026, 3, 10, 14, 30)
+
+PROJECTS = [
+    {"name": "Website", "client": "Acme", "deadline": "2026-03-05", "status": "On-Process"},
+    {"name": "Mobile App", "client": "Globex", "deadline": "2026-03-12", "status": "On-Process"},
+    {"name": "Logo", "client": "Initech", "deadline": "2026-02-01", "status": "Done"},
+]
+
+
+@pytest.fixture
+def router(monkeypatch):
+    monkeypatch.delenv("CHAT_LOCAL_INTENTS_ENABLED", raising=False)
+    return LocalIntentRouter()
+
+
+@pytest.mark.parametrize("message, name, language", [
+    ("What time is it?", "current_time", "en"),
+    ("jam berapa sekarang?", "current_time", "id"),
+    ("What's the date today?", "current_date", "en"),
+    ("tanggal berapa hari ini?", "current_date", "id"),
+    ("How many overdue projects do I have?", "overdue_count", "en"),
+    ("Which of my projects are overdue?", "overdue_count", "en"),
+    ("Do I have any late projects?", "overdue_count", "en"),
+    ("Any of my projects past due?", "overdue_count", "en"),
+    ("Berapa project saya yang terlambat?", "overdue_count", "id"),
+    ("Ada proyek aku yang telat?", "overdue_count", "id"),
+    ("ada project saya yang melewati deadline?", "overdue_count", "id"),
+    ("When is my next deadline?", "next_deadline", "en"),
+    ("kapan deadline saya berikutnya?", "next_deadline", "id"),
+    ("How many projects do I have?", "project_count", "en"),
+    ("How many active projects am I working on?", "project_count", "en"),
+    ("Berapa project saya?", "project_count", "id"),
+    ("berapa proyek yang aku punya?", "project_count", "id"),
+    ("berapa projectku sekarang?", "project_count", "id"),
+])
+def test_classifies_factual_questions(router, message, name, language):
+    intent = router.classify(message)
+    assert intent is not None
+    assert (intent.name, intent.language) == (name, language)
+
+
+@pytest.mark.parametrize("message", [
+    # Prices, effort and durations of projects in general
+    "berapa harga project website?",
+    "berapa lama project mobile app biasanya?",
+    "how many hours does a website project take?",
+    "how many projects does a freelancer usually have?",
+    "berapa project yang ideal untuk freelancer?",
+    # Payments and fees are not overdue projects
+    "do I have a late fee clause?",
+    "ada klien yang telat bayar",
+    "which invoice is overdue from the client?",
+    "which client pays late on my projects?",
+    # Advice and long messages go to the model
+    "how many projects should I take on at once?",
+    "how many overdue projects do I have and how should I handle them?",
+    "I have a few overdue projects and a client who keeps adding scope, what now?",
+])
+def test_leaves_other_questions_to_the_llm(router, message):
+    assert router.classify(message) is None
+
+
+def test_disabled_router_answers_nothing(monkeypatch):
+    monkeypatch.setenv("CHAT_LOCAL_INTENTS_ENABLED", "false")
+    assert LocalIntentRouter().classify("What time is it?") is None
+
+
+def test_portfolio_answers_use_active_projects(router):
+    overdue = router.answer(router.classify("How many overdue projects do I have?"), NOW, PROJECTS)
+    assert overdue == "You have 1 overdue project: Website (5 days)."
+
+    count = router.answer(router.classify("Berapa project saya?"), NOW, PROJECTS)
+    assert count == "Kamu punya 3 project: 2 aktif dan 1 selesai."
+
+    upcoming = router.answer(router.classify("When is my next deadline?"), NOW, PROJECTS)
+    assert upcoming.startswith("Your next deadline is Mobile App for Globex")
+
+
+def test_portfolio_intent_without_projects_falls_back(router):
+    assert router.answer(router.classify("How many projects do I have?"), NOW, None) is None
@@ -1,5 +1,302 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, FrozenSet, Iterable, Tuple
+from collections import Counter, OrderedDict, deque
+import hashlib
+import os
 import re
+import string
+import threading
+
+import numpy as np
+
+from metrics import CACHE_LOOKUPS, timed
+
+_VERDICT_CACHE_HITS = CACHE_LOOKUPS.labels("ux_verdict", "hit")
+_VERDICT_CACHE_MISSES = CACHE_LOOKUPS.labels("ux_verdict", "miss")
+
+# Below this length the spam regexes beat the numpy run-length checks, whose
+# array setup costs ~40us regardless of input size
+SPAM_VECTOR_MIN_LENGTH = 600
+
+def _longest_run(mask: np.ndarray) -> int:
+    """Length of the longest run of True values in a boolean array"""
+    if not mask.any():
+        return 0
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.view(np.int8), [0]))))
+    return int((edges[1::2] - edges[::2]).max())
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over a fixed set of tagged keywords.
+    
+    Transitions are precomputed into a DFA, so scanning costs one dict lookup
+    per character regardless of how many keywords there are. ``scan`` takes and
+    returns the automaton state, which lets callers feed text in chunks.
+    """
+    
+    def __init__(self, tagged_keywords: Iterable[Tuple[str, str]]):
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[set] = [set()]
+        
+        for tag, keyword in tagged_keywords:
+            state = 0
+            for ch in keyword:
+                if ch not in goto[state]:
+                    goto.append({})
+                    outputs.append(set())
+                    goto[state][ch] = len(goto) - 1
+                state = goto[state][ch]
+            outputs[state].add((tag, keyword))
+        
+        # Breadth-first pass: failure links, inherited outputs and full transitions
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(goto[0])]
+        delta.extend({} for _ in range(len(goto) - 1))
+        queue = list(goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            outputs[state] |= outputs[fail[state]]
+            
+            transitions = dict(delta[fail[state]])
+            for ch, child in goto[state].items():
+                fail[child] = delta[fail[state]].get(ch, 0) if state else 0
+                transitions[ch] = child
+                queue.append(child)
+            delta[state] = transitions
+        
+        self._delta = delta
+        self._outputs: List[FrozenSet[Tuple[str, str]]] = [frozenset(out) for out in outputs]
+    
+    def scan(self, text: str, state: int = 0) -> Tuple[int, set]:
+        """Scan text from the given state; returns the end state and the (tag, keyword) hits"""
+        delta = self._delta
+        outputs = self._outputs
+        found = set()
+        
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if outputs[state]:
+                found |= outputs[state]
+        
+        return state, found
+
+class RepetitionDetector:
+    """
+    Rolling-hash word n-gram repetition detector.
+    
+    Each word is hashed once and the hash of the last ``n`` words is updated
+    in O(1) per word (polynomial rolling hash), so text is scanned in one
+    linear pass and can be fed in chunks. Paraphrased loops that only swap a
+    word or two still repeat most of their n-grams, which whole-sentence
+    comparison misses.
+    """
+    
+    MODULUS = (1 << 61) - 1
+    BASE = 1_000_003
+    
+    def __init__(self, n: int = 3, max_repeat_ratio: float = 0.5, min_ngrams: int = 20):
+        self.n = n
+        self.max_repeat_ratio = max_repeat_ratio
+        self.min_ngrams = min_ngrams
+        
+        self.ngram_count = 0
+        self.repeat_count = 0
+        self._window: deque = deque(maxlen=n)
+        self._hash = 0
+        self._oldest_factor = pow(self.BASE, n - 1, self.MODULUS)
+        self._seen: set = set()
+        self._tail = ""
+    
+    @property
+    def repeat_ratio(self) -> float:
+        return self.repeat_count / self.ngram_count if self.ngram_count else 0.0
+    
+    def feed(self, text: str) -> None:
+        """Consume more text; a word cut off at the end is held until the next chunk"""
+        text = self._tail + text
+        words = text.split()
+        self._tail = words.pop() if words and not text[-1].isspace() else ""
+        for word in words:
+            self._add_word(word)
+    
+    def finish(self) -> None:
+        if self._tail:
+            self._add_word(self._tail)
+            self._tail = ""
+    
+    def is_repetitive(self) -> bool:
+        return self.ngram_count >= self.min_ngrams and self.repeat_ratio > self.max_repeat_ratio
+    
+    def _add_word(self, word: str) -> None:
+        token = word.strip(string.punctuation).lower()
+        if not token:
+            return
+        
+        value = hash(token) % self.MODULUS
+        if len(self._window) == self.n:
+            self._hash = (self._hash - self._window[0] * self._oldest_factor) % self.MODULUS
+        self._window.append(value)
+        self._hash = (self._hash * self.BASE + value) % self.MODULUS
+        
+        if len(self._window) == self.n:
+            self.ngram_count += 1
+            if self._hash in self._seen:
+                self.repeat_count += 1
+            else:
+                self._seen.add(self._hash)
+
+class ConversationModerationState:
+    """
+    Running moderation state for one conversation.
+    
+    Each message updates the counts, a digest set of distinct user messages and
+    a topic histogram over the last 10 user messages in O(1), so moderation
+    doesn't rescan the history on every turn.
+    """
+    
+    TOPIC_KEYWORDS = {
+        'timeline': ['timeline', 'deadline', 'schedule'],
+        'budget': ['budget', 'cost', 'price', 'money'],
+        'client': ['client', 'customer', 'communication'],
+    }
+    RECENT_MESSAGES = 10
+    
+    def __init__(self):
+        self.message_count = 0
+        self.user_message_count = 0
+        self._content_digests: set = set()
+        self._recent_topics: deque = deque(maxlen=self.RECENT_MESSAGES)
+        self._topic_counts: Counter = Counter()
+    
+    def add_message(self, message: Dict) -> None:
+        self.message_count += 1
+        if message.get('type') != 'user':
+            return
+        
+        self.user_message_count += 1
+        content = message.get('content', '').lower()
+        self._content_digests.add(hashlib.blake2b(content.encode("utf-8", "surrogatepass"), digest_size=8).digest())
+        
+        topics = tuple(
+            topic for topic, keywords in self.TOPIC_KEYWORDS.items()
+            if any(keyword in content for keyword in keywords)
+        )
+        if len(self._recent_topics) == self.RECENT_MESSAGES:
+            self._topic_counts.subtract(self._recent_topics[0])
+        self._recent_topics.append(topics)
+        self._topic_counts.update(topics)
+    
+    def result(self) -> Dict[str, Any]:
+        """Moderation verdict for the conversation so far"""
+        if not self.message_count:
+            return {"is_safe": True, "issues": [], "recommendations": []}
+        
+        issues = []
+        
+        # Check for excessive messaging frequency
+        if self.user_message_count > 50:
+            issues.append("excessive_messaging")
+        
+        # Check for repetitive questions
+        if len(self._content_digests) < self.user_message_count * 0.7:  # Less than 70% unique
+            issues.append("repetitive_questions")
+        
+        return {
+            "is_safe": len(issues) == 0,
+            "issues": issues,
+            "recommendations": self._recommendations(),
+            "conversation_length": self.message_count,
+            "user_message_count": self.user_message_count
+        }
+    
+    def _recommendations(self) -> List[str]:
+        recommendations = []
+        
+        if self.user_message_count > 20:
+            recommendations.append("Consider summarizing your main project challenges for more focused advice")
+        
+        if self.message_count > 30:
+            recommendations.append("You might want to start a new conversation for fresh context")
+        
+        # Check if user is asking varied questions
+        unique_topics = sum(1 for count in self._topic_counts.values() if count > 0)
+        if unique_topics > 3:
+            recommendations.append("You're covering many topics - consider focusing on one challenge at a time")
+        
+        return recommendations
+
+class StreamingResponseChecker:
+    """
+    Incremental version of UXSafetyChecker.check_ai_response for streamed
+    completions.
+    
+    Chunks are fed as they arrive while the checker keeps the keyword automaton
+    state. ``feed`` returns True once a violation is certain, i.e. the final
+    check on the cleaned response is bound to fail, so the caller can cancel
+    the generation early. Only inappropriate keywords abort the stream: the
+    final check runs after markdown cleanup, which shortens the text and
+    changes its sentences, so length and repetition are left to it. A keyword
+    stays in the cleaned text unless it sits in a code block or link target,
+    so once the stream contains ``` or ]( keyword hits no longer abort either.
+    """
+    
+    def __init__(self, checker: "UXSafetyChecker"):
+        self.checker = checker
+        
+        self.length = 0
+        self.issues: List[str] = []
+        self.aborted = False
+        self._state = 0
+        self._tail = ""
+        self._removable_text = False
+    
+    @property
+    def abort_reason(self) -> str:
+        return self.issues[0] if self.aborted else ""
+    
+    def feed(self, chunk: str) -> bool:
+        """
+        Consume the next chunk of the response
+        
+        Args:
+            chunk: Text delta from the stream
+            
+        Returns:
+            True if the response is certain to fail and should be aborted
+        """
+        if self.aborted or not chunk:
+            return self.aborted
+        
+        self.length += len(chunk)
+        
+        # Code blocks and link targets are dropped by the markdown cleanup; the
+        # last two characters are kept so markers split across chunks are seen
+        window = self._tail + chunk
+        if "```" in window or "](" in window:
+            self._removable_text = True
+        self._tail = window[-2:]
+        
+        # Keyword matches may span chunk boundaries, so the automaton state carries over
+        self._state, hits = self.checker.keyword_automaton.scan(chunk.lower(), self._state)
+        if self._removable_text:
+            return False
+        for keyword in self.checker.inappropriate_keywords:
+            if ("inappropriate", keyword) in hits:
+                self.issues.append(f"inappropriate_content: {keyword}")
+        
+        self.aborted = bool(self.issues)
+        return self.aborted
+    
+    def result(self) -> Dict[str, Any]:
+        """Verdict so far, in the same shape as check_ai_response"""
+        return {
+            "is_safe": not self.issues,
+            "issues": list(self.issues),
+            "severity": self.checker._get_severity_level(self.issues),
+            "aborted": self.aborted,
+            "streamed_length": self.length
+        }
 
 class UXSafetyChecker:
     """
@@ -35,7 +332,65 @@ class UXSafetyChecker:
             r'[A-Z]{20,}',  # Excessive caps
             r'[!?]{5,}',    # Excessive punctuation
         ]
+        
+        # Compiled matchers: one automaton pass covers all keyword lists, and the
+        # spam indicators above run as regexes on short text and as vectorized
+        # run-length checks on long text (see _has_spam_pattern)
+        self.spam_patterns = [re.compile(pattern) for pattern in self.spam_indicators]
+        self.keyword_automaton = KeywordAutomaton(
+            [("inappropriate", kw) for kw in self.inappropriate_keywords] +
+            [("off_topic", kw) for kw in self.off_topic_keywords] +
+            [("project", kw) for kw in self.project_keywords]
+        )
+        
+        # LRU of user-input verdicts keyed by message digest
+        self.verdict_cache_size = int(os.getenv("UX_SAFETY_CACHE_SIZE", "4096"))
+        self._verdict_cache: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        
+        # Incremental moderation state per conversation (LRU)
+        self.max_conversations = int(os.getenv("UX_MODERATION_MAX_CONVERSATIONS", "10000"))
+        self._conversations: "OrderedDict[str, ConversationModerationState]" = OrderedDict()
     
+    def _has_spam_pattern(self, text: str) -> bool:
+        """
+        The spam_indicators checks: a run of 11 identical characters (newlines
+        excluded, as with '.'), 20 capitals or 5 of '!' / '?'. Short text uses
+        the compiled regexes; from SPAM_VECTOR_MIN_LENGTH on, linear-time
+        numpy run-length checks with the same verdicts
+        """
+        if len(text) < 5:
+            return False
+        if len(text) < SPAM_VECTOR_MIN_LENGTH:
+            return any(pattern.search(text) for pattern in self.spam_patterns)
+        
+        codes = np.frombuffer(text.encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+        repeated = (codes[1:] == codes[:-1]) & (codes[1:] != 10)
+        capitals = (codes >= 65) & (codes <= 90)
+        punctuation = (codes == 33) | (codes == 63)
+        
+        return (
+            _longest_run(repeated) >= 10 or
+            _longest_run(capitals) >= 20 or
+            _longest_run(punctuation) >= 5
+        )
+    
+    def _match_keywords(self, text_lower: str) -> Dict[str, List[str]]:
+        """Return matched keywords per category, in the configured list order"""
+        _, hits = self.keyword_automaton.scan(text_lower)
+        matched = {"inappropriate": set(), "off_topic": set(), "project": set()}
+        for tag, keyword in hits:
+            matched[tag].add(keyword)
+        
+        return {
+            "inappropriate": [kw for kw in self.inappropriate_keywords if kw in matched["inappropriate"]],
+            "off_topic": [kw for kw in self.off_topic_keywords if kw in matched["off_topic"]],
+            "project": [kw for kw in self.project_keywords if kw in matched["project"]],
+        }
+    
+    @timed("safety.check_user_input")
     def check_user_input(self, user_message: str) -> Dict[str, Any]:
         """
         Check user input for safety and appropriateness
@@ -46,24 +401,43 @@ class UXSafetyChecker:
         Returns:
             Dictionary with safety check results
         """
+        cache_key = hashlib.blake2b(user_message.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        with self._cache_lock:
+            cached = self._verdict_cache.get(cache_key)
+            if cached is not None:
+                self._verdict_cache.move_to_end(cache_key)
+                self.cache_hits += 1
+                _VERDICT_CACHE_HITS.inc()
+                return {**cached, "issues": list(cached["issues"])}
+            self.cache_misses += 1
+            _VERDICT_CACHE_MISSES.inc()
+        
+        verdict = self._check_user_input_uncached(user_message)
+        
+        with self._cache_lock:
+            self._verdict_cache[cache_key] = verdict
+            while len(self._verdict_cache) > self.verdict_cache_size:
+                self._verdict_cache.popitem(last=False)
+        
+        return {**verdict, "issues": list(verdict["issues"])}
+    
+    def _check_user_input_uncached(self, user_message: str) -> Dict[str, Any]:
         message_lower = user_message.lower()
         issues = []
+        matched = self._match_keywords(message_lower)
         
         # Check for inappropriate content
-        for keyword in self.inappropriate_keywords:
-            if keyword in message_lower:
-                issues.append(f"inappropriate_content: {keyword}")
+        for keyword in matched["inappropriate"]:
+            issues.append(f"inappropriate_content: {keyword}")
         
         # Check for off-topic content
-        off_topic_matches = [kw for kw in self.off_topic_keywords if kw in message_lower]
-        if off_topic_matches and not any(pm in message_lower for pm in self.project_keywords):
+        off_topic_matches = matched["off_topic"]
+        if off_topic_matches and not matched["project"]:
             issues.append(f"off_topic: {', '.join(off_topic_matches)}")
         
         # Check for spam indicators
-        for pattern in self.spam_indicators:
-            if re.search(pattern, user_message):
-                issues.append("spam_pattern")
-                break
+        if self._has_spam_pattern(user_message):
+            issues.append("spam_pattern")
         
         # Check message length
         if len(user_message) > 2000:
@@ -84,6 +458,7 @@ class UXSafetyChecker:
             "severity": self._get_severity_level(issues)
         }
     
+    @timed("safety.check_ai_response")
     def check_ai_response(self, ai_response: str) -> Dict[str, Any]:
         """
         Check AI response for potential issues
@@ -98,9 +473,8 @@ class UXSafetyChecker:
         
         # Check for inappropriate content in response
         response_lower = ai_response.lower()
-        for keyword in self.inappropriate_keywords:
-            if keyword in response_lower:
-                issues.append(f"inappropriate_content: {keyword}")
+        for keyword in self._match_keywords(response_lower)["inappropriate"]:
+            issues.append(f"inappropriate_content: {keyword}")
         
         # Check for extremely long responses (might be hallucination)
         if len(ai_response) > 3000:
@@ -122,6 +496,10 @@ class UXSafetyChecker:
             "severity": self._get_severity_level(issues)
         }
     
+    def streaming_response_checker(self) -> StreamingResponseChecker:
+        """Create an incremental checker for one streamed AI response"""
+        return StreamingResponseChecker(self)
+    
     def moderate_conversation(self, conversation_history: List[Dict]) -> Dict[str, Any]:
         """
         Check entire conversation for patterns or issues
@@ -132,31 +510,36 @@ class UXSafetyChecker:
         Returns:
             Dictionary with moderation results
         """
-        issues = []
-        
-        if not conversation_history:
-            return {"is_safe": True, "issues": [], "recommendations": []}
-        
-        user_messages = [msg for msg in conversation_history if msg.get('type') == 'user']
-        
-        # Check for excessive messaging frequency
-        if len(user_messages) > 50:
-            issues.append("excessive_messaging")
-        
-        # Check for repetitive questions
-        user_contents = [msg.get('content', '').lower() for msg in user_messages]
-        if len(set(user_contents)) < len(user_contents) * 0.7:  # Less than 70% unique
-            issues.append("repetitive_questions")
-        
-        recommendations = self._generate_conversation_recommendations(conversation_history)
+        state = ConversationModerationState()
+        for msg in conversation_history or []:
+            state.add_message(msg)
+        return state.result()
+    
+    def observe_conversation_message(self, conversation_id: str, message: Dict) -> Dict[str, Any]:
+        """
+        Add one message to a tracked conversation and return its moderation result
         
-        return {
-            "is_safe": len(issues) == 0,
-            "issues": issues,
-            "recommendations": recommendations,
-            "conversation_length": len(conversation_history),
-            "user_message_count": len(user_messages)
-        }
+        Args:
+            conversation_id: Client-side conversation identifier
+            message: Message dict with 'type' and 'content'
+            
+        Returns:
+            Dictionary with moderation results
+        """
+        with self._cache_lock:
+            state = self._conversations.get(conversation_id)
+            if state is None:
+                state = self._conversations[conversation_id] = ConversationModerationState()
+                while len(self._conversations) > self.max_conversations:
+                    self._conversations.popitem(last=False)
+            else:
+                self._conversations.move_to_end(conversation_id)
+            state.add_message(message)
+            return state.result()
+    
+    def reset_conversation(self, conversation_id: str) -> None:
+        with self._cache_lock:
+            self._conversations.pop(conversation_id, None)
     
     def _generate_safety_suggestion(self, issues: List[str]) -> str:
         """Generate appropriate suggestion based on issues found"""
@@ -195,6 +578,13 @@ class UXSafetyChecker:
     
     def _has_excessive_repetition(self, text: str) -> bool:
         """Check for excessive repetition in text"""
+        # Repeated word n-grams catch paraphrased loops
+        detector = RepetitionDetector()
+        detector.feed(text)
+        detector.finish()
+        if detector.is_repetitive():
+            return True
+        
         sentences = text.split('.')
         if len(sentences) < 3:
             return False
@@ -204,35 +594,6 @@ class UXSafetyChecker:
         repetition_ratio = len(unique_sentences) / len([s for s in sentences if s.strip()])
         
         return repetition_ratio < 0.7  # Less than 70% unique sentences
-    
-    def _generate_conversation_recommendations(self, conversation_history: List[Dict]) -> List[str]:
-        """Generate recommendations for improving conversation"""
-        recommendations = []
-        
-        user_messages = [msg for msg in conversation_history if msg.get('type') == 'user']
-        
-        if len(user_messages) > 20:
-            recommendations.append("Consider summarizing your main project challenges for more focused advice")
-        
-        if len(conversation_history) > 30:
-            recommendations.append("You might want to start a new conversation for fresh context")
-        
-        # Check if user is asking varied questions
-        topics = []
-        for msg in user_messages[-10:]:  # Last 10 messages
-            content = msg.get('content', '').lower()
-            if any(keyword in content for keyword in ['timeline', 'deadline', 'schedule']):
-                topics.append('timeline')
-            if any(keyword in content for keyword in ['budget', 'cost', 'price', 'money']):
-                topics.append('budget')
-            if any(keyword in content for keyword in ['client', 'customer', 'communication']):
-                topics.append('client')
-        
-        unique_topics = set(topics)
-        if len(unique_topics) > 3:
-            recommendations.append("You're covering many topics - consider focusing on one challenge at a time")
-        
-        return recommendations
 
 # Global instance
 ux_safety_checker = UXSafetyChecker()